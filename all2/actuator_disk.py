@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+CPACS rotors/propellers -> actuator disks.
+
+Blades are not lofted or resolved; each rotor becomes a thin disk
+(center, axis, radius, nominal RPM) that the mesher cuts out of the fluid
+domain and tags as <uid>_in (upstream face), <uid>_out (downstream face)
+and <uid>_rim (edge, slip wall). run_su2.py turns the tags into
+MARKER_ACTDISK entries with a pressure jump from an assumed thrust
+coefficient.
+
+The converter writes the disks next to the BREP (plane.disks.json):
+
+    python actuator_disk.py plane.cpacs.xml
+"""
+
+import sys
+import json
+import math
+
+import numpy as np
+from lxml import etree
+
+# ------------------ USER SETTINGS ------------------
+THICKNESS_REL = 0.02       # disk thickness relative to its radius
+# ---------------------------------------------------
+
+_MIRROR = {
+    "x": 0, "y-z-plane": 0, "yz-plane": 0,
+    "y": 1, "x-z-plane": 1, "xz-plane": 1,
+    "z": 2, "x-y-plane": 2, "xy-plane": 2,
+}
+
+
+def _xyz(el, default):
+    if el is None:
+        return np.array(default, dtype=float)
+    return np.array([float(el.findtext(c) or d) for c, d in zip("xyz", default)])
+
+
+def rotation_matrix(deg) -> np.ndarray:
+    """CPACS rotation (degrees about x, then y, then z) as a 3x3 matrix."""
+    ax, ay, az = np.radians(deg)
+    rx = np.array([[1, 0, 0], [0, math.cos(ax), -math.sin(ax)], [0, math.sin(ax), math.cos(ax)]])
+    ry = np.array([[math.cos(ay), 0, math.sin(ay)], [0, 1, 0], [-math.sin(ay), 0, math.cos(ay)]])
+    rz = np.array([[math.cos(az), -math.sin(az), 0], [math.sin(az), math.cos(az), 0], [0, 0, 1]])
+    return rz @ ry @ rx
+
+
+def rotor_radius(root, rotor) -> float:
+    """
+    Unscaled tip radius: hinge offset of the first blade attachment plus the
+    summed positioning lengths of its blade.
+    """
+    att = rotor.find("./rotorHub/rotorBladeAttachments/rotorBladeAttachment")
+    if att is None:
+        return 0.0
+    hinge = att.find("./hinges/hinge/transformation/translation")
+    r = float(_xyz(hinge, (0, 0, 0))[0])
+    blade_uid = (att.findtext("rotorBladeUID") or "").strip()
+    blade = root.find(f"./vehicles/rotorcraft/model/rotorBlades/rotorBlade[@uID='{blade_uid}']")
+    if blade is None:
+        blade = root.find(f".//rotorBlade[@uID='{blade_uid}']")
+    if blade is not None:
+        r += sum(float(p.findtext("length") or 0) for p in blade.findall("./positionings/positioning"))
+        r *= float(_xyz(blade.find("./transformation/scaling"), (1, 1, 1))[1])
+    return r
+
+
+def rotor_disks(cpacs_root, cfg_uid=None, half_model=False):
+    """
+    Actuator disks of the rotors of model cfg_uid (all vehicle models if None;
+    rotors often live in a separate rotorcraft model). Symmetric rotors are
+    mirrored; half models drop disks on the negative-y side.
+    Returns [{"uid", "center", "axis", "radius", "thickness", "rpm", "blades"}].
+    """
+    root = cpacs_root
+    models = root.findall("./vehicles/*/model")
+    if cfg_uid:
+        models = [m for m in models if m.get("uID") == cfg_uid]
+
+    disks = []
+    for model in models:
+        for rotor in model.findall("./rotors/rotor"):
+            uid = rotor.get("uID")
+            trafo = rotor.find("transformation")
+            scale = _xyz(trafo.find("scaling") if trafo is not None else None, (1, 1, 1))
+            R = rotation_matrix(_xyz(trafo.find("rotation") if trafo is not None else None, (0, 0, 0)))
+            center = _xyz(trafo.find("translation") if trafo is not None else None, (0, 0, 0))
+            radius = rotor_radius(root, rotor) * 0.5 * (scale[0] + scale[1])
+            if not uid or radius <= 0:
+                continue
+            disk = {
+                "uid": uid,
+                "center": center.tolist(),
+                "axis": (R @ np.array([0.0, 0.0, 1.0])).tolist(),  # rotor shaft = local z
+                "radius": radius,
+                "thickness": THICKNESS_REL * radius,
+                "rpm": float(rotor.findtext("nominalRotationsPerMinute") or 0),
+                "blades": int(rotor.findtext(".//numberOfBlades") or 0),
+            }
+            found = [disk]
+            i = _MIRROR.get((rotor.get("symmetry") or "").strip().lower())
+            if i is not None:
+                mir = dict(disk, uid=f"{uid}_mirror")
+                mir["center"] = [0.0 - v if k == i else v for k, v in enumerate(disk["center"])]
+                mir["axis"] = [0.0 - v if k == i else v for k, v in enumerate(disk["axis"])]
+                found.append(mir)
+            disks.extend(d for d in found if not (half_model and d["center"][1] < 0))
+    return disks
+
+
+def write_disks(disks, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"disks": disks}, f, indent=2)
+
+
+def load_disks(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["disks"]
+
+
+def pressure_jump(disk: dict, ct: float, rho: float) -> float:
+    """Mean pressure jump T/A [Pa] for thrust T = CT * rho * n^2 * D^4 (n in rev/s)."""
+    n = disk["rpm"] / 60.0
+    d = 2.0 * disk["radius"]
+    thrust = ct * rho * n ** 2 * d ** 4
+    return thrust / (math.pi * disk["radius"] ** 2)
+
+
+# ----- tiny CLI -----
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        raise SystemExit("usage: python actuator_disk.py <cpacs.xml>")
+    for d in rotor_disks(etree.parse(sys.argv[1]).getroot()):
+        print(f"{d['uid']}: center {np.round(d['center'], 3).tolist()}  axis {np.round(d['axis'], 3).tolist()}  "
+              f"R {d['radius']:.3f}  {d['rpm']:.0f} rpm  {d['blades']} blades")
@@ -3,9 +3,18 @@ import sys
 import json
 import argparse
 import xml.etree.ElementTree as ET
+import numpy as np
 from dotenv import load_dotenv
 from openai import OpenAI
 
+import llm_ledger
+import cst_airfoil
+
+# Send airfoils to the model (and write them out) as CST coefficients
+# (<cst2D>) instead of point lists: smaller prompts, editable shape parameters.
+# Off until the cst2D round trip through TiGL lofting has been validated.
+COMPACT_PROFILES = False
+
 
 def build_system_prompt() -> str:
     """
@@ -32,12 +41,41 @@ def build_system_prompt() -> str:
         "      \"xpath\": \"<XPath to element>\",\n"
         "      \"attribute\": \"<attribute_name>\",\n"
         "      \"value\": \"<new attribute value>\"\n"
+        "    },\n"
+        "    {\n"
+        "      \"action\": \"scale\",\n"
+        "      \"xpath\": \"<XPath matching one or more numeric nodes>\",\n"
+        "      \"value\": <factor, e.g. 1.1>\n"
+        "    },\n"
+        "    {\n"
+        "      \"action\": \"offset\",\n"
+        "      \"xpath\": \"<XPath matching one or more numeric nodes>\",\n"
+        "      \"value\": <amount added, e.g. -0.2>\n"
+        "    },\n"
+        "    {\n"
+        "      \"action\": \"linear_ramp\",\n"
+        "      \"xpath\": \"<XPath matching several numeric nodes, e.g. all section twist angles>\",\n"
+        "      \"start\": <value for the first match>,\n"
+        "      \"end\": <value for the last match>,\n"
+        "      \"mode\": \"set\" | \"add\" | \"scale\"\n"
+        "    },\n"
+        "    {\n"
+        "      \"action\": \"copy_from\",\n"
+        "      \"xpath\": \"<XPath to target element(s)>\",\n"
+        "      \"source\": \"<XPath to source element(s)>\"\n"
         "    }\n"
         "  ]\n"
         "}\n\n"
         "Rules:\n"
         "1. NEVER output XML in your response, only the JSON object.\n"
-        "2. Use only actions \"set_text\" and \"set_attribute\".\n"
+        "2. Use only actions \"set_text\", \"set_attribute\", \"scale\", \"offset\", \"linear_ramp\" and \"copy_from\".\n"
+        "   - \"scale\"/\"offset\" multiply/add to every matched number (also ';'-separated vectors).\n"
+        "   - \"linear_ramp\" spreads values linearly from \"start\" to \"end\" over the matches in document order\n"
+        "     (mode \"set\" replaces, \"add\" adds, \"scale\" multiplies; default \"set\").\n"
+        "   - \"copy_from\" copies the text of the \"source\" match(es) to the target match(es): one source\n"
+        "     to every target, or as many sources as targets (pairwise, in document order).\n"
+        "   - All actions accept an optional \"attribute\" to act on an attribute instead of the text.\n"
+        "   Prefer one numeric action over many literal \"set_text\" edits when changing several nodes.\n"
         "3. Use simple XPaths that work with Python's xml.etree.ElementTree, e.g.:\n"
         "   - .//rotor[@uID='Propeller']/nominalRotationsPerMinute\n"
         "   - .//wing[@uID='Wing']/componentSegments/componentSegment[@uID='Wing_CompSeg']/structure/upperShell/skin/material/thickness\n"
@@ -46,6 +84,10 @@ def build_system_prompt() -> str:
         "   - Add multiple edit objects.\n"
         "5. Always include the top-level key \"edits\" (it can be an empty list if nothing should change).\n"
         "6. Do NOT wrap the JSON in ```json or any other markdown.\n"
+        "7. Airfoils given as <cst2D> are CST profiles: upperB/lowerB are shape coefficients from leading\n"
+        "   to trailing edge (lowerB negative). Scale both by the same factor to change thickness,\n"
+        "   offset both to add camber; edit the leading entries for the nose, the last ones for the aft part,\n"
+        "   changing neighbouring entries gradually (a single changed entry gives a wavy surface).\n"
     )
 
 
@@ -65,8 +107,10 @@ def call_openai_for_patch(cpacs_xml: str, user_edit_prompt: str) -> dict:
         f"{cpacs_xml}"
     )
 
-    response = client.responses.create(
-        model="gpt-5",  # or another suitable model name
+    response = llm_ledger.timed_call(
+        "app2.call_openai_for_patch",
+        "gpt-5",  # or another suitable model name
+        client.responses.with_raw_response.create,  # raw: llm_ledger records the SDK's retries
         input=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_message},
@@ -104,21 +148,106 @@ def call_openai_for_patch(cpacs_xml: str, user_edit_prompt: str) -> dict:
     return patch
 
 
-def apply_patch_to_xml(cpacs_xml: str, patch: dict) -> str:
+NUMERIC_ACTIONS = ("scale", "offset", "linear_ramp")
+
+
+def _get_value(el, attr_name):
+    return el.get(attr_name) if attr_name else el.text
+
+
+def _set_value(el, attr_name, value):
+    if attr_name:
+        el.set(attr_name, value)
+    else:
+        el.text = value
+
+
+def _parse_numbers(text) -> np.ndarray:
+    """Parse a scalar or a CPACS ';'-separated vector into a float array."""
+    parts = [p for p in (text or "").strip().split(";") if p.strip()]
+    if not parts:
+        raise ValueError("empty value")
+    return np.array([float(p) for p in parts], dtype=float)
+
+
+def _format_numbers(values: np.ndarray) -> str:
+    return ";".join(f"{v:.10g}" for v in values)
+
+
+def _apply_numeric_edit(elements, edit: dict) -> None:
     """
-    Apply the JSON patch to the CPACS XML string using ElementTree.
-    Returns the modified XML string.
+    Apply scale/offset/linear_ramp to all matched nodes in one vectorized pass.
+
+    Values of all matched nodes are concatenated into a single array (vectors
+    included), transformed at once and split back into their nodes.
     """
-    # Parse original XML
+    action = edit["action"]
+    attr_name = edit.get("attribute")
+
     try:
-        root = ET.fromstring(cpacs_xml)
-    except ET.ParseError as e:
-        raise RuntimeError(f"Input CPACS is not well-formed XML: {e}")
+        arrays = [_parse_numbers(_get_value(el, attr_name)) for el in elements]
+    except ValueError:
+        print(f"Warning: '{action}' edit matched non-numeric values: {edit}", file=sys.stderr)
+        return
+
+    sizes = np.array([a.size for a in arrays])
+    flat = np.concatenate(arrays)
+
+    try:
+        if action == "scale":
+            flat = flat * float(edit.get("value", 1.0))
+        elif action == "offset":
+            flat = flat + float(edit.get("value", 0.0))
+        else:  # linear_ramp
+            start = float(edit["start"])
+            end = float(edit["end"])
+            ramp = np.linspace(start, end, len(elements))
+            ramp = np.repeat(ramp, sizes)  # one ramp value per node, broadcast to its vector
+            mode = edit.get("mode", "set")
+            if mode == "set":
+                flat = ramp
+            elif mode == "add":
+                flat = flat + ramp
+            elif mode == "scale":
+                flat = flat * ramp
+            else:
+                print(f"Warning: Unknown linear_ramp mode '{mode}' in edit: {edit}", file=sys.stderr)
+                return
+    except (KeyError, TypeError, ValueError):
+        print(f"Warning: Malformed '{action}' edit: {edit}", file=sys.stderr)
+        return
+
+    for el, values in zip(elements, np.split(flat, np.cumsum(sizes)[:-1])):
+        _set_value(el, attr_name, _format_numbers(values))
+
+
+def _apply_copy_edit(root, elements, edit: dict) -> None:
+    """Copy source value(s) to the targets: one source to all, or pairwise if the counts match."""
+    source = edit.get("source")
+    attr_name = edit.get("attribute")
+    sources = root.findall(source) if source else []
+    if not sources:
+        print(f"Warning: 'copy_from' source did not match any elements: {source}", file=sys.stderr)
+        return
+    if len(sources) not in (1, len(elements)):
+        print(f"Warning: 'copy_from' edit skipped: {len(sources)} sources for {len(elements)} targets "
+              f"(need 1 or {len(elements)}): {edit}", file=sys.stderr)
+        return
+
+    src_attr = edit.get("source_attribute", attr_name)
+    values = [_get_value(el, src_attr) for el in sources]
+    if len(values) == 1:
+        values = values * len(elements)
+    for el, value in zip(elements, values):
+        if value is None:
+            what = f"attribute '{src_attr}'" if src_attr else "text"
+            print(f"Warning: 'copy_from' source has no {what}; target left unchanged: {edit}", file=sys.stderr)
+            continue
+        _set_value(el, attr_name, value)
 
-    # Optional: register xsi namespace to keep prefix
-    ET.register_namespace("xsi", "http://www.w3.org/2001/XMLSchema-instance")
 
-    edits = patch.get("edits", [])
+def apply_edits(root, edits) -> None:
+    """Apply a list of patch edits in place to a parsed CPACS root element."""
     for edit in edits:
         action = edit.get("action")
         xpath = edit.get("xpath")
@@ -143,9 +272,30 @@ def apply_patch_to_xml(cpacs_xml: str, patch: dict) -> str:
                 continue
             for el in elements:
                 el.set(attr_name, value)
+        elif action in NUMERIC_ACTIONS:
+            _apply_numeric_edit(elements, edit)
+        elif action == "copy_from":
+            _apply_copy_edit(root, elements, edit)
         else:
             print(f"Warning: Unknown action '{action}' in edit: {edit}", file=sys.stderr)
 
+
+def apply_patch_to_xml(cpacs_xml: str, patch: dict) -> str:
+    """
+    Apply the JSON patch to the CPACS XML string using ElementTree.
+    Returns the modified XML string.
+    """
+    # Parse original XML
+    try:
+        root = ET.fromstring(cpacs_xml)
+    except ET.ParseError as e:
+        raise RuntimeError(f"Input CPACS is not well-formed XML: {e}")
+
+    # Optional: register xsi namespace to keep prefix
+    ET.register_namespace("xsi", "http://www.w3.org/2001/XMLSchema-instance")
+
+    apply_edits(root, patch.get("edits", []))
+
     # Build new XML string
     tree = ET.ElementTree(root)
     from io import BytesIO
@@ -154,6 +304,15 @@ def apply_patch_to_xml(cpacs_xml: str, patch: dict) -> str:
     return buf.getvalue().decode("utf-8")
 
 
+def compact_profiles_xml(cpacs_xml: str) -> str:
+    """Replace airfoil point lists by fitted cst2D elements (see cst_airfoil.py)."""
+    ET.register_namespace("xsi", "http://www.w3.org/2001/XMLSchema-instance")
+    root = ET.fromstring(cpacs_xml)
+    if not cst_airfoil.compact_profiles(root):
+        return cpacs_xml
+    return ET.tostring(root, encoding="utf-8", xml_declaration=True).decode("utf-8")
+
+
 def main(input_path: str, output_path: str, edit_prompt: str) -> str:
     """
     Safely edit a CPACS XML file using a natural-language prompt via the OpenAI API.
@@ -162,8 +321,9 @@ def main(input_path: str, output_path: str, edit_prompt: str) -> str:
     ----------
     input_path : str
         Path to input CPACS XML file.
-    output_path : str
-        Path where the edited CPACS XML file will be written.
+    output_path : str or None
+        Path where the edited CPACS XML file will be written
+        (None: only return it, e.g. to hand it to cpacs_to_step3.convert).
     edit_prompt : str
         Natural-language description of edits to apply.
 
@@ -187,6 +347,9 @@ def main(input_path: str, output_path: str, edit_prompt: str) -> str:
     except OSError as e:
         raise RuntimeError(f"Failed to read input file '{input_path}': {e}") from e
 
+    if COMPACT_PROFILES:
+        cpacs_xml = compact_profiles_xml(cpacs_xml)
+
     # 1) Ask OpenAI for a JSON patch
     patch = call_openai_for_patch(cpacs_xml, edit_prompt)
 
@@ -200,6 +363,8 @@ def main(input_path: str, output_path: str, edit_prompt: str) -> str:
         raise RuntimeError(f"Edited XML is NOT well-formed (this should not happen): {e}") from e
 
     # 4) Write output CPACS
+    if output_path is None:
+        return edited_xml
     try:
         with open(output_path, "w", encoding="utf-8") as f:
             f.write(edited_xml)
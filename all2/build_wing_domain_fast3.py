@@ -1,24 +1,91 @@
 #!/usr/bin/env python3
 """
-STEP solid -> farfield box -> boolean cut (fluid domain)
--> tag inlet / outlet / farfield / walls
--> size by distance-to-wing
--> fast tet mesh
--> export SU2 (and optional .msh)
+BREP/STEP solid -> farfield box -> optional defeaturing of tiny faces / short edges / slivers
+-> boolean cut (fluid domain, minus thin rotor actuator disks)
+-> tag inlet / outlet / farfield / walls (/ symmetry for half models)
+   (/ <rotor>_in, <rotor>_out, <rotor>_rim per actuator disk)
+-> size by distance-to-wing (and distance-to-disks), optional wake / tip-vortex
+   zones and wall curvature, optionally tuned to a tet budget,
+   or by a solution-adapted background mesh (mesh_adapt.py)
+-> optional prism boundary layer on the walls (first cell from Re and y+)
+-> fast tet mesh, then local optimization of the bad tets only
+   (+ plane.quality.json: gamma / SICN / dihedral angle histograms)
+-> optional graph partitioning (METIS / coordinate bisection) as a load-balance
+   preview for an MPI rank count (+ plane.partition.json for run_su2.py)
+-> export CGNS (binary) or SU2 (ASCII) (and optional .msh)
+   + plane.mesh.json: which mesh run_su2.py should read
+
+With INCREMENTAL, the fluid is split into a near-field box and a fixed outer
+region (stitched at the box faces), and the meshes of all unchanged curves,
+faces and volumes are taken from the previous run (mesh_cache.py).
+
+With MORPH, an existing SU2 mesh is morphed onto the new geometry instead
+(mesh_morph.py); it is remeshed only if the morphed mesh is not valid.
 
 Requires: gmsh-python
 """
 
 import gmsh
+import hashlib
+import json
+import math
 import multiprocessing
 import os
+import tempfile
+import time
+
+import numpy as np
+
+import mesh_cache
+import mesh_partition
 
 # ---------- USER SETTINGS ----------
-STEP_PATH    = "plane.stp"   # solid STEP file (closed B-Rep)
+BREP_PATH    = "plane.brep"  # solid BREP from the converter (preferred: no STEP translation)
+STEP_PATH    = "plane.stp"   # solid STEP file (closed B-Rep), used if BREP_PATH is missing
 FLOW_AXIS    = "x"                       # 'x' | 'y' | 'z'
 PRESET       = "TINY_~0p5_1p2M"             # mesh & box size preset
-SU2_FILENAME = "plane.su2"  # SU2 mesh output
-MSH_FILENAME = "plane.msh"  # optional: gmsh .msh
+NUM_THREADS  = None         # gmsh threads (None = all cores but one; mesh_service.py sets its share)
+TARGET_CELLS = None         # e.g. 800_000: scale the preset LC_*/D_* to this tet count (None = preset as is)
+SIZING_CALIBRATION = ".mesh_sizing.json"  # learned actual/predicted tet ratio (None = no learning)
+MESH_FORMAT  = "CGNS"       # mesh read by SU2: "CGNS" (binary) | "SU2" (ASCII)
+CGNS_FILENAME = "plane.cgns"  # CGNS mesh output
+SU2_FILENAME = "plane.su2"  # SU2 mesh output (also written with MORPH, which edits it)
+MSH_FILENAME = None         # optional: gmsh .msh (v2.2), e.g. "plane.msh"
+MESH_MANIFEST = "plane.mesh.json"  # format/file of the current mesh, read by run_su2.py
+HALF_MODEL   = None         # cut the domain at the symmetry plane (None = as the converter built it, COMPONENTS_PATH)
+SYM_AXIS     = "y"          # normal of the symmetry plane: 'x' | 'y' | 'z'
+SYM_POS      = 0.0          # position of the symmetry plane along SYM_AXIS
+DISKS_PATH   = "plane.disks.json"  # actuator disks from the converter (None / missing file = no disks)
+DISK_LC_REL  = 0.05         # mesh size on the disks relative to the disk radius
+COMPONENTS_PATH = "plane.components.json"  # wing outlines (REFINEMENT_ZONES) and half-model flag from the converter
+BOUNDARY_LAYER = False      # prism layers on the walls (full models only)
+BL_YPLUS     = 1.0          # target y+ of the first cell
+BL_GROWTH    = 1.2          # layer height growth ratio
+BL_LAYERS    = 20           # number of prism layers
+RUN_CFG      = "run.cfg"    # REYNOLDS_NUMBER / REYNOLDS_LENGTH for the first cell height
+GRID_LEVELS  = 1            # >1: nested family of meshes (L0 = finest) from one geometry pass
+GRID_RATIO   = 1.5          # constant refinement ratio between levels (element sizes)
+REFINEMENT_ZONES = False    # wake boxes + tip-vortex cylinders behind each wing (COMPONENTS_PATH), along the run.cfg AOA
+WAKE_LENGTH_REL = 1.0       # wake / tip-vortex zone length downstream of the trailing edge (x Lref)
+WAKE_THICKNESS_REL = 0.1    # wake sheet half thickness beyond the wing (x mean chord)
+WAKE_SEGMENTS = 4           # wake boxes stepped along the deflected flow (Box fields are axis-aligned)
+WAKE_LC_NEAR = 3.0          # mesh size in the wake (x LC_NEAR size)
+TIP_RADIUS_REL = 0.1        # tip-vortex cylinder radius (x tip chord)
+TIP_LC_NEAR = 1.5           # mesh size in the tip-vortex cylinders (x LC_NEAR size)
+CURVATURE_ELEMENTS = 0      # wall faces only: elements per 2*pi of surface curvature (0 = off)
+CURVATURE_MIN_REL = 0.25    # curvature sizing floor (x LC_NEAR size; sharp trailing edges)
+BACKGROUND_POS = None       # size view from mesh_adapt.py (e.g. "plane.adapt.pos"), replaces the distance sizing
+INCREMENTAL  = False        # reuse cached meshes of unchanged faces / the outer region (mesh_cache.py)
+MESH_CACHE   = ".mesh_cache.npz"  # per-entity meshes of the last INCREMENTAL run
+NEAR_MARGIN_REL = 0.25      # INCREMENTAL: near-field box around the aircraft (margin x Lref)
+SNAP_REL     = 0.1          # INCREMENTAL: box planes snapped outwards to this x the decade of Lref
+MORPH        = False        # small design changes: morph the existing SU2_FILENAME instead of remeshing
+DEFEATURE    = False        # heal + remove features smaller than DEFEATURE_REL * Lref (can remove blunt TEs)
+DEFEATURE_REL = 2e-4        # size threshold relative to Lref (well below LC_NEAR)
+OPTIMIZE_THRESHOLD = 0.3    # optimize only tets with gamma below this (Mesh.OptimizeThreshold; 0 = no optimization)
+QUALITY_FILE = "plane.quality.json"  # gamma / SICN / dihedral histograms of the tets (None = no report)
+PARTITIONS   = None         # MPI ranks for mpirun SU2: load-balance / interface preview (None = serial)
+PARTITION_FILE = "plane.partition.json"  # ranks / load-balance report, read by run_su2.py
 # -----------------------------------
 
 PRESETS = {
@@ -37,6 +104,10 @@ PRESETS = {
 }
 
 
+def num_threads() -> int:
+    return NUM_THREADS or max(1, multiprocessing.cpu_count() - 1)
+
+
 def bb(dim, tag):
     return gmsh.model.occ.getBoundingBox(dim, tag)
 
@@ -48,193 +119,1086 @@ def on_plane(face_tag, axis, pos, tol):
     return abs(b[i] - pos) <= tol and abs(b[i+3] - pos) <= tol
 
 
-def main():
-    if PRESET not in PRESETS:
-        raise KeyError(f"Unknown PRESET={PRESET}. Valid: {list(PRESETS)}")
+def load_disks():
+    """Actuator disks written by the converter, [] if there are none."""
+    if not DISKS_PATH or not os.path.isfile(DISKS_PATH):
+        return []
+    with open(DISKS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f).get("disks", [])
 
-    if not os.path.isfile(STEP_PATH):
-        raise FileNotFoundError(f"STEP_PATH not found: {STEP_PATH}")
 
-    gmsh.initialize()
-    gmsh.model.add("wing_ext")
+def geometry_half_model() -> bool:
+    """HALF_MODEL if set, else whether the converter built a half model (COMPONENTS_PATH)."""
+    if HALF_MODEL is not None:
+        return bool(HALF_MODEL)
+    if COMPONENTS_PATH and os.path.isfile(COMPONENTS_PATH):
+        with open(COMPONENTS_PATH, "r", encoding="utf-8") as f:
+            return bool(json.load(f).get("half_model", False))
+    return False
+
+
+def load_wings():
+    """Wing outlines written by the converter (per wing part), None without the file."""
+    if not COMPONENTS_PATH or not os.path.isfile(COMPONENTS_PATH):
+        return None
+    with open(COMPONENTS_PATH, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("flow_axis", "x") != FLOW_AXIS:
+        print(f"WARNING: {COMPONENTS_PATH} is for flow along {data.get('flow_axis')}, not FLOW_AXIS={FLOW_AXIS}")
+        return None
+    return data.get("wings", [])
+
+
+def add_disk(d):
+    """Thin cylinder for one actuator disk, centred on the disk plane. Returns the volume tag."""
+    n = math.sqrt(sum(v * v for v in d["axis"])) or 1.0
+    a = [v / n for v in d["axis"]]
+    t = d["thickness"]
+    base = [c - 0.5 * t * v for c, v in zip(d["center"], a)]
+    return gmsh.model.occ.addCylinder(*base, *(t * v for v in a), d["radius"])
+
+
+def disk_face(face_tag, disks, flow):
+    """
+    (uid, 'in' | 'out' | 'rim') if the face belongs to an actuator disk, else None.
+    'in' is the upstream cap (along the flow axis), 'rim' the lateral surface.
+    """
+    p = gmsh.model.occ.getCenterOfMass(2, face_tag)
+    for d in disks:
+        n = math.sqrt(sum(v * v for v in d["axis"])) or 1.0
+        a = [v / n for v in d["axis"]]
+        rel = [pi - ci for pi, ci in zip(p, d["center"])]
+        ax = sum(r * v for r, v in zip(rel, a))
+        rad = math.sqrt(max(sum(r * r for r in rel) - ax * ax, 0.0))
+        t = d["thickness"]
+        if abs(ax) > 0.75 * t or rad > d["radius"] * 1.001:
+            continue
+        if abs(ax) < 0.25 * t:
+            return d["uid"], "rim"
+        upstream = rel[flow] < 0 if abs(a[flow]) > 1e-6 else ax < 0
+        return d["uid"], "in" if upstream else "out"
+    return None
+
+
+TET_VOLUME = 1.0 / (6.0 * math.sqrt(2.0))  # regular tet of edge h: 0.1179 h^3
+DISTANCE_SAMPLING = 20  # Distance field: sample points per face direction (gmsh default)
+CALIBRATION_MODEL = 2   # bump when estimate_tets changes: stored factors of older models are dropped
+
+
+def sampling_gap(faces):
+    """
+    Area-weighted spacing (long, short face direction) of the points the
+    Distance field samples on the faces.
+    """
+    total, gap_a, gap_b = 0.0, 0.0, 0.0
+    for f in faces:
+        b = gmsh.model.occ.getBoundingBox(2, f)
+        e = sorted((b[3] - b[0], b[4] - b[1], b[5] - b[2]), reverse=True)
+        area = gmsh.model.occ.getMass(2, f)
+        total += area
+        gap_a += area * e[0]
+        gap_b += area * e[1]
+    if total <= 0:
+        return 0.0, 0.0
+    n = max(DISTANCE_SAMPLING - 1, 1)
+    return gap_a / (total * n), gap_b / (total * n)
+
+
+def estimate_tets(area, volume, h_near, h_far, d_near, d_far, gap=(0.0, 0.0), n=400) -> float:
+    """
+    Tet count of the Distance/Threshold sizing before meshing: sum of
+    dV / (0.1179 h^3) over distance shells around the walls. Shell areas
+    grow like offsets of a sphere with the wall area, until the shells hold
+    the fluid volume.
+
+    gmsh measures the distance to sample points on the walls (spacing `gap`,
+    see sampling_gap), so between them sizes are coarser than h(d): h^-3 is
+    averaged over the lateral offset to the nearest point.
+    """
+    rc = math.sqrt(area / (4.0 * math.pi))
+    d_max = rc * ((3.0 * volume / (area * rc) + 1.0) ** (1.0 / 3.0) - 1.0)
+    edges = np.concatenate([[0.0], np.geomspace(min(d_near, d_max) * 1e-3, d_max, n)])
+    shell = area * rc / 3.0 * ((1.0 + edges[1:] / rc) ** 3 - (1.0 + edges[:-1] / rc) ** 3)
+    d = 0.5 * (edges[1:] + edges[:-1])
+    q = (np.arange(4) + 0.5) / 8.0  # offsets in [0, 1/2] of the sample spacing
+    r2 = ((q[:, None] * gap[0]) ** 2 + (q[None, :] * gap[1]) ** 2).ravel()
+    h = np.interp(np.sqrt(d[:, None] ** 2 + r2[None, :]), [d_near, d_far], [h_near, h_far])
+    return float(np.sum(shell * np.mean(h ** -3.0, axis=1)) / TET_VOLUME)
+
+
+def count_tets(vols) -> int:
+    """Tets in the given volumes (the fluid; not the aircraft interior or BL prisms)."""
+    return sum(len(gmsh.model.mesh.getElementsByType(4, v)[0]) for v in vols)
+
+
+def load_calibration() -> float:
+    if SIZING_CALIBRATION and os.path.isfile(SIZING_CALIBRATION):
+        with open(SIZING_CALIBRATION, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("model") == CALIBRATION_MODEL:
+            return float(data.get("factor", 1.0))
+    return 1.0
+
+
+def update_calibration(raw_estimate: float, actual: int) -> None:
+    """Blend the new actual/estimated ratio into the stored factor (geometric running mean)."""
+    if not SIZING_CALIBRATION or raw_estimate <= 0 or actual <= 0:
+        return
+    data = {"factor": 1.0, "runs": 0}
+    if os.path.isfile(SIZING_CALIBRATION):
+        with open(SIZING_CALIBRATION, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        if stored.get("model") == CALIBRATION_MODEL:  # else: learned with another estimate / tet count
+            data.update(stored)
+    runs = int(data["runs"]) + 1
+    log_f = (math.log(data["factor"]) * (runs - 1) + math.log(actual / raw_estimate)) / runs
+    with open(SIZING_CALIBRATION, "w", encoding="utf-8") as f:
+        json.dump({"factor": math.exp(log_f), "runs": min(runs, 20), "model": CALIBRATION_MODEL}, f, indent=2)
+
+
+def tune_sizing(area, volume, sizes, target, factor, gap=(0.0, 0.0)):
+    """
+    Common scale s for (h_near, h_far, d_near, d_far) so that the calibrated
+    estimate hits the target tet count (count ~ s^-3, bisection on log s).
+    Returns (scaled sizes, s).
+    """
+    def count(s):
+        return factor * estimate_tets(area, volume, *(s * v for v in sizes), gap=gap)
+
+    lo, hi = math.log(1.0 / 64.0), math.log(64.0)
+    for _ in range(60):
+        mid = 0.5 * (lo + hi)
+        if count(math.exp(mid)) > target:
+            lo = mid
+        else:
+            hi = mid
+    s = math.exp(0.5 * (lo + hi))
+    return tuple(s * v for v in sizes), s
+
+
+def small_features(vols, min_size):
+    """
+    Small faces (area < min_size^2), sliver faces (mean width 2*A/P < min_size)
+    and short edges (length < min_size) on the boundary of the volumes.
+    """
+    occ = gmsh.model.occ
+    faces = sorted({t for d, t in gmsh.model.getBoundary(vols, oriented=False, recursive=False) if d == 2})
+    small, slivers, short = [], [], set()
+    for f in faces:
+        area = occ.getMass(2, f)
+        curves = [t for d, t in gmsh.model.getBoundary([(2, f)], oriented=False, recursive=False) if d == 1]
+        lengths = [occ.getMass(1, c) for c in curves]
+        short.update(c for c, l in zip(curves, lengths) if l < min_size)
+        if area < min_size ** 2:
+            small.append(f)
+        elif lengths and 2.0 * area / sum(lengths) < min_size:
+            slivers.append(f)
+    return small, slivers, sorted(short)
+
+
+def _face_info(vols):
+    """(tag, area, center) of the boundary faces of the volumes."""
+    occ = gmsh.model.occ
+    faces = sorted({t for d, t in gmsh.model.getBoundary(vols, oriented=False, recursive=False) if d == 2})
+    return [(f, occ.getMass(2, f), occ.getCenterOfMass(2, f)) for f in faces]
+
+
+def defeature(vols, Lref):
+    """
+    Heal and defeature the imported solids in place: OCC shape healing
+    (small edges/faces, degenerated entities), then removal of the remaining
+    small and sliver faces. Each step is skipped if OCC fails on it.
+    Returns the new volume dimTags.
+    """
+    occ = gmsh.model.occ
+    min_size = DEFEATURE_REL * Lref
+    small, slivers, short = small_features(vols, min_size)
+    print(f"Defeature (< {min_size:.3g}): {len(small)} small faces, "
+          f"{len(slivers)} slivers, {len(short)} short edges")
+    if not (small or slivers or short):
+        return vols
+    before = _face_info(vols)
 
     try:
-        # ----------------- Speed / memory options -----------------------
-        gmsh.option.setNumber(
-            "General.NumThreads", max(1, multiprocessing.cpu_count() - 1)
-        )
-        gmsh.option.setNumber("Mesh.Algorithm3D", 10)  # HXT if available
-        gmsh.option.setNumber("Mesh.Optimize", 0)
-        gmsh.option.setNumber("Mesh.OptimizeNetgen", 0)
-        gmsh.option.setNumber("Mesh.ElementOrder", 1)
-        gmsh.option.setNumber("Mesh.CharacteristicLengthFromCurvature", 0)
-        gmsh.option.setNumber("Mesh.CharacteristicLengthFromPoints", 0)
-        gmsh.option.setNumber("Mesh.CharacteristicLengthExtendFromBoundary", 0)
-        gmsh.option.setNumber("Mesh.SaveAll", 0)
-        gmsh.option.setNumber("Mesh.MshFileVersion", 2.2)  # safer for converters
-
-        # --------------------- Import wing solid ------------------------
-        gmsh.model.occ.importShapes(STEP_PATH)
-        gmsh.model.occ.synchronize()
+        healed = occ.healShapes(vols, tolerance=min_size, fixDegenerated=True,
+                                fixSmallEdges=True, fixSmallFaces=True,
+                                sewFaces=True, makeSolids=True)
+        occ.synchronize()
+        vols = [dt for dt in healed if dt[0] == 3] or occ.getEntities(3)
+    except Exception as e:
+        print(f"  healShapes failed, skipped: {e}")
+
+    small2, slivers2, _ = small_features(vols, min_size)
+    if small2 or slivers2:
+        try:
+            out = occ.defeature([t for _, t in vols], small2 + slivers2, removeVolume=True)
+            occ.synchronize()
+            vols = [dt for dt in out if dt[0] == 3] or occ.getEntities(3)
+        except Exception as e:
+            print(f"  defeature failed, skipped: {e}")
+
+    # Every original face without a counterpart (same area and center) afterwards
+    after = _face_info(vols)
+    kind = {**{f: "small" for f in small}, **{f: "sliver" for f in slivers}}
+    for f, area, c in before:
+        if not any(abs(a - area) <= 1e-3 * area and math.dist(c, c2) <= min_size for _, a, c2 in after):
+            print(f"  removed/changed {kind.get(f, 'face')} {f}: area {area:.3g} "
+                  f"at ({c[0]:.4g}, {c[1]:.4g}, {c[2]:.4g})")
+
+    small3, slivers3, short3 = small_features(vols, min_size)
+    print(f"  removed: {len(small) - len(small3)} small faces, "
+          f"{len(slivers) - len(slivers3)} slivers, {len(short) - len(short3)} short edges"
+          + (f"; left: {len(small3)}/{len(slivers3)}/{len(short3)}" if small3 or slivers3 or short3 else ""))
+    return vols
 
-        vols = gmsh.model.occ.getEntities(3)
-        if not vols:
-            raise RuntimeError(
-                "STEP has no solid volume (needs closed solid B-Rep)."
-            )
-
-        # --------------- Wing bbox & reference length -------------------
-        Bs = [bb(3, v[1]) for v in vols]
-        xmin = min(b[0] for b in Bs)
-        ymin = min(b[1] for b in Bs)
-        zmin = min(b[2] for b in Bs)
-        xmax = max(b[3] for b in Bs)
-        ymax = max(b[4] for b in Bs)
-        zmax = max(b[5] for b in Bs)
-
-        xc = 0.5 * (xmin + xmax)
-        yc = 0.5 * (ymin + ymax)
-        zc = 0.5 * (zmin + zmax)
-
-        Lx = xmax - xmin
-        Ly = ymax - ymin
-        Lz = zmax - zmin
-        Lref = max(Lx, Ly, Lz, 1e-9)
-
-        P = PRESETS[PRESET]
-        up = P["UP"] * Lref
-        dn = P["DN"] * Lref
-        h1 = P["H1"] * Lref
-        h2 = P["H2"] * Lref
-
-        # --------------------- Farfield box -----------------------------
-        if FLOW_AXIS == "x":
-            X0, X1 = xmin - up, xmax + dn
-            Y0, Y1 = yc - h1, yc + h1
-            Z0, Z1 = zc - h2, zc + h2
-        elif FLOW_AXIS == "y":
-            Y0, Y1 = ymin - up, ymax + dn
-            X0, X1 = xc - h1, xc + h1
-            Z0, Z1 = zc - h2, zc + h2
-        elif FLOW_AXIS == "z":
-            Z0, Z1 = zmin - up, zmax + dn
-            X0, X1 = xc - h1, xc + h1
-            Y0, Y1 = yc - h2, yc + h2
+
+def refinement_zones(Lref) -> list:
+    """
+    Wake and tip-vortex zones behind the wings of the converter's outlines
+    (one per wing part, so also when the aircraft is one fused solid), as
+    Box / Cylinder field specs. The flow direction is FLOW_AXIS rotated by
+    the run.cfg AOA towards the lift axis; the wake sheet starts along the
+    trailing edges and follows it as a stair of WAKE_SEGMENTS boxes, the tip
+    vortices are cylinders from the tip trailing edges.
+    """
+    if not REFINEMENT_ZONES:
+        return []
+    wings = load_wings()
+    if wings is None:
+        print(f"WARNING: REFINEMENT_ZONES needs the converter's {COMPONENTS_PATH}; no zones.")
+        return []
+    from run_su2 import cfg_number
+
+    with open(RUN_CFG, "r") as f:
+        aoa = math.radians(cfg_number(f.read(), "AOA", 0.0))
+    fa = {"x": 0, "y": 1, "z": 2}[FLOW_AXIS]
+    la = 2 if fa != 2 else 0         # lift axis
+    sa = 3 - fa - la                 # span axis
+    direction = [0.0, 0.0, 0.0]
+    direction[fa], direction[la] = math.cos(aoa), math.sin(aoa)
+    length = WAKE_LENGTH_REL * Lref
+    step = length / WAKE_SEGMENTS
+    sym = {"x": 0, "y": 1, "z": 2}[SYM_AXIS]
+
+    zones = []
+    for w in wings:
+        if w["span_axis"] != "xyz"[sa]:
+            continue  # fin: no wake sheet along this span axis
+        ends = w["ends"]
+        te = [e["te"] for e in ends]
+        t = WAKE_THICKNESS_REL * sum(e["chord"] for e in ends) / len(ends)
+        x0, x1 = min(p[fa] for p in te), max(p[fa] for p in te)   # swept: root and tip TE differ
+        l0, l1 = min(p[la] for p in te), max(p[la] for p in te)   # dihedral
+        mid, half = 0.5 * (l0 + l1), 0.5 * (l1 - l0) + t
+
+        for k in range(WAKE_SEGMENTS):
+            box_lo, box_hi = [0.0] * 3, [0.0] * 3
+            box_lo[sa], box_hi[sa] = min(p[sa] for p in te), max(p[sa] for p in te)
+            box_lo[fa], box_hi[fa] = x1 + k * step, x1 + (k + 1) * step
+            if k == 0:
+                box_lo[fa] = x0 - t  # the whole trailing edge
+            shift = [math.tan(aoa) * k * step, math.tan(aoa) * (k + 1) * step]
+            box_lo[la], box_hi[la] = mid + min(shift) - half, mid + max(shift) + half
+            zones.append({"type": "Box", "min": box_lo, "max": box_hi, "thickness": t,
+                          "lc_near": WAKE_LC_NEAR})
+
+        for e in ends:
+            if not e["tip"] or (HALF_MODEL and sym == sa and e["te"][sa] < SYM_POS):
+                continue  # root, or the half outside the domain
+            zones.append({"type": "Cylinder",
+                          "center": [s + 0.5 * length * d for s, d in zip(e["te"], direction)],
+                          "axis": [0.5 * length * d for d in direction],  # gmsh: half-length vector
+                          "radius": TIP_RADIUS_REL * e["chord"], "lc_near": TIP_LC_NEAR})
+    return zones
+
+
+def add_zone_fields(zones, h_near, h_far, first_tag) -> list:
+    """Box / Cylinder fields for the refinement zones. Returns their tags."""
+    tags = []
+    for tag, z in enumerate(zones, start=first_tag):
+        gmsh.model.mesh.field.add(z["type"], tag)
+        gmsh.model.mesh.field.setNumber(tag, "VIn", min(z["lc_near"] * h_near, h_far))
+        gmsh.model.mesh.field.setNumber(tag, "VOut", h_far)
+        if z["type"] == "Box":
+            for c, lo, hi in zip("XYZ", z["min"], z["max"]):
+                gmsh.model.mesh.field.setNumber(tag, f"{c}Min", lo)
+                gmsh.model.mesh.field.setNumber(tag, f"{c}Max", hi)
+            gmsh.model.mesh.field.setNumber(tag, "Thickness", z["thickness"])
         else:
-            raise ValueError("FLOW_AXIS must be 'x', 'y' or 'z'.")
+            for c, p, a in zip("XYZ", z["center"], z["axis"]):
+                gmsh.model.mesh.field.setNumber(tag, f"{c}Center", p)
+                gmsh.model.mesh.field.setNumber(tag, f"{c}Axis", a)
+            gmsh.model.mesh.field.setNumber(tag, "Radius", z["radius"])
+        tags.append(tag)
+    return tags
+
+
+def set_size_fields(wall_faces, disk_faces, disks, h_near, h_far, d_near, d_far, background=None, zones=()):
+    """
+    Distance/Threshold sizing around the walls (and actuator disks) plus the
+    refinement zones, combined by a Min field, as background mesh.
+    With `background` (a .pos size view from mesh_adapt.py) that view is the
+    background mesh instead; it was derived from the previous mesh's sizes.
+    """
+    for tag in gmsh.model.mesh.field.list():
+        gmsh.model.mesh.field.remove(tag)
+
+    if background:
+        for tag in gmsh.view.getTags():
+            gmsh.view.remove(tag)
+        gmsh.merge(background)
+        gmsh.model.mesh.field.add("PostView", 6)
+        gmsh.model.mesh.field.setNumber(6, "ViewTag", gmsh.view.getTags()[-1])
+        gmsh.model.mesh.field.setAsBackgroundMesh(6)
+        return
+
+    gmsh.model.mesh.field.add("Distance", 1)
+    gmsh.model.mesh.field.setNumbers(1, "FacesList", wall_faces)
+    gmsh.model.mesh.field.setNumber(1, "Sampling", DISTANCE_SAMPLING)
+
+    gmsh.model.mesh.field.add("Threshold", 2)
+    gmsh.model.mesh.field.setNumber(2, "IField", 1)
+    gmsh.model.mesh.field.setNumber(2, "LcMin", h_near)
+    gmsh.model.mesh.field.setNumber(2, "LcMax", h_far)
+    gmsh.model.mesh.field.setNumber(2, "DistMin", d_near)
+    gmsh.model.mesh.field.setNumber(2, "DistMax", d_far)
+    sizes = [2]
+
+    if disk_faces:
+        # Refine around the disks as well; the finer of both sizes wins
+        r_min = min(d["radius"] for d in disks)
+        gmsh.model.mesh.field.add("Distance", 3)
+        gmsh.model.mesh.field.setNumbers(3, "FacesList", sorted(disk_faces))
+
+        gmsh.model.mesh.field.add("Threshold", 4)
+        gmsh.model.mesh.field.setNumber(4, "IField", 3)
+        gmsh.model.mesh.field.setNumber(4, "LcMin", min(DISK_LC_REL * r_min, h_far))
+        gmsh.model.mesh.field.setNumber(4, "LcMax", h_far)
+        gmsh.model.mesh.field.setNumber(4, "DistMin", max(d["thickness"] for d in disks))
+        gmsh.model.mesh.field.setNumber(4, "DistMax", r_min)
+        sizes.append(4)
+
+    sizes += add_zone_fields(zones, h_near, h_far, first_tag=10)
+
+    if len(sizes) > 1:
+        # the finest size wins
+        gmsh.model.mesh.field.add("Min", 5)
+        gmsh.model.mesh.field.setNumbers(5, "FieldsList", sizes)
+        gmsh.model.mesh.field.setAsBackgroundMesh(5)
+    else:
+        gmsh.model.mesh.field.setAsBackgroundMesh(2)
+
+
+def set_curvature_sizing(wall_faces, elements, h_min):
+    """
+    Curvature sizing on the wall faces and their edges only: a size callback
+    returning min(lc, 2*pi / (elements * curvature)), at least h_min. The
+    global Mesh.CharacteristicLengthFromCurvature would refine the box, the
+    disks and the aircraft interior too.
+    """
+    gmsh.model.mesh.removeSizeCallback()
+    if not elements or not wall_faces:
+        return
+    faces = set(wall_faces)
+    curves = {abs(t) for _, t in gmsh.model.getBoundary([(2, f) for f in faces], combined=False, oriented=False)}
+
+    def size(dim, tag, x, y, z, lc):
+        if not ((dim == 2 and tag in faces) or (dim == 1 and tag in curves)):
+            return lc
+        try:
+            uv = gmsh.model.getParametrization(dim, tag, [x, y, z])
+            if dim == 1:
+                k = abs(gmsh.model.getCurvature(1, tag, uv)[0])
+            else:
+                k_max, k_min, _, _ = gmsh.model.getPrincipalCurvatures(tag, uv)
+                k = max(abs(k_max[0]), abs(k_min[0]))
+        except Exception:  # discrete (boundary layer) surfaces: no parametrization
+            return lc
+        if k <= 0:
+            return lc
+        return min(lc, max(2.0 * math.pi / (elements * k), h_min))
+
+    gmsh.model.mesh.setSizeCallback(size)
+
+
+def first_cell_height() -> float:
+    """
+    Wall distance of the first cell for BL_YPLUS, flat plate estimate at the
+    run.cfg Reynolds number: Cf = 0.026 Re^(-1/7), y1 = y+ L sqrt(2/Cf) / Re.
+    """
+    from run_su2 import cfg_number
+
+    with open(RUN_CFG, "r") as f:
+        text = f.read()
+    re_l = cfg_number(text, "REYNOLDS_NUMBER", 5.0e6)
+    length = cfg_number(text, "REYNOLDS_LENGTH", 1.0)
+    cf = 0.026 * re_l ** (-1.0 / 7.0)
+    return BL_YPLUS * length * math.sqrt(2.0 / cf) / re_l
+
+
+def layer_heights(y1: float):
+    """Cumulative heights of BL_LAYERS layers growing by BL_GROWTH."""
+    heights, h, total = [], y1, 0.0
+    for _ in range(BL_LAYERS):
+        total += h
+        heights.append(total)
+        h *= BL_GROWTH
+    return heights
+
+
+class BoundaryLayerError(RuntimeError):
+    """Prism layer extrusion or the 3D mesh on top of it failed."""
+
+
+def add_boundary_layer(walls, other_faces, center, y1):
+    """
+    Replace the current model by its surface mesh, extrude prism layers from
+    the walls into the fluid and close the remaining tet region with the
+    layers' top surfaces and the other (box / disk) faces.
+    Returns the fluid volume tags (prism layers + inner tet volume).
+    """
+    tmp = os.path.join(tempfile.mkdtemp(prefix="bl_"), "surface.msh")
+    gmsh.option.setNumber("Mesh.MshFileVersion", 4.1)  # keeps entity tags and physical names
+    gmsh.option.setNumber("Mesh.SaveAll", 1)
+    gmsh.write(tmp)
+    gmsh.option.setNumber("Mesh.SaveAll", 0)
+    gmsh.option.setNumber("Mesh.MshFileVersion", 2.2)
+
+    gmsh.clear()
+    gmsh.model.add("wing_bl")
+    gmsh.merge(tmp)
+    os.remove(tmp)
+    gmsh.model.removePhysicalGroups(gmsh.model.getPhysicalGroups(3))
+    gmsh.model.removeEntities(gmsh.model.getEntities(3))
+
+    # Extrude along the wall normals that point into the fluid (away from the aircraft)
+    outward = 0.0
+    for w in walls:
+        _, node_tags = gmsh.model.mesh.getElementsByType(2, w)
+        if len(node_tags) == 0:
+            continue
+        tri = np.array([gmsh.model.mesh.getNode(int(t))[0] for t in node_tags[:3]])
+        n = np.cross(tri[1] - tri[0], tri[2] - tri[0])
+        outward += float(np.dot(n, tri.mean(axis=0) - np.asarray(center)))
+    sign = 1.0 if outward >= 0 else -1.0
+
+    heights = layer_heights(y1)
+    ext = gmsh.model.geo.extrudeBoundaryLayer(
+        [(2, w) for w in walls], [1] * len(heights), [sign * h for h in heights], True
+    )
+    bl_vols = [t for d, t in ext if d == 3]
+    top = [ext[i - 1][1] for i, (d, _) in enumerate(ext) if d == 3]
+
+    loop = gmsh.model.geo.addSurfaceLoop(top + list(other_faces))
+    inner = gmsh.model.geo.addVolume([loop])
+    gmsh.model.geo.synchronize()
+    print(f"Boundary layer: {len(heights)} prism layers, first cell {y1:.3g}, "
+          f"total {heights[-1]:.3g} (y+ {BL_YPLUS}, growth {BL_GROWTH})")
+    return bl_vols + [inner]
+
+
+def write_mesh(path: str) -> float:
+    """gmsh.write with timing; returns seconds."""
+    t0 = time.perf_counter()
+    gmsh.write(path)
+    dt = time.perf_counter() - t0
+    print(f"Mesh written to: {path} ({os.path.getsize(path) / 1e6:.1f} MB in {dt:.2f}s)")
+    return dt
+
+
+def level_path(path: str, level) -> str:
+    """plane.cgns -> plane_L1.cgns (level None: unchanged)."""
+    if level is None or not path:
+        return path
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_L{level}{ext}"
+
+
+def write_manifest(fmt: str, path: str, **info) -> None:
+    """Mesh file and format for run_su2.py, plus the half-model symmetry plane for SU2 and plot_wing_drag.py."""
+    sym = {"axis": SYM_AXIS, "pos": SYM_POS} if HALF_MODEL else None
+    with open(MESH_MANIFEST, "w", encoding="utf-8") as f:
+        json.dump({"format": fmt, "filename": path, "half_model": bool(HALF_MODEL), "symmetry": sym, **info},
+                  f, indent=2)
+
+
+def tet_quality(vols) -> dict:
+    """gamma, SICN (gmsh) and min/max dihedral angle [deg] of every tet in the volumes, as arrays."""
+    blocks = [gmsh.model.mesh.getElementsByType(4, v) for v in vols]
+    if not blocks or sum(len(t) for t, _ in blocks) == 0:
+        return {}
+    tags = np.concatenate([t for t, _ in blocks])
+    nodes = np.concatenate([n for _, n in blocks])
+    node_tags, coords, _ = gmsh.model.mesh.getNodes()
+    xyz = np.zeros((int(node_tags.max()) + 1, 3))
+    xyz[node_tags.astype(np.int64)] = coords.reshape(-1, 3)
+    p = xyz[nodes.astype(np.int64).reshape(-1, 4)]
+
+    # Face normals (face i opposite vertex i), oriented outwards
+    normals = []
+    for i in range(4):
+        a, b, c = (p[:, j] for j in range(4) if j != i)
+        n = np.cross(b - a, c - a)
+        inward = np.einsum("ij,ij->i", n, p[:, i] - a) > 0
+        n[inward] *= -1.0
+        normals.append(n / np.maximum(np.linalg.norm(n, axis=1), 1e-300)[:, None])
+    # Dihedral angle at the edge shared by faces i and j: pi - angle(n_i, n_j)
+    cos = np.stack([np.einsum("ij,ij->i", normals[i], normals[j])
+                    for i in range(4) for j in range(i + 1, 4)], axis=1)
+    dihedral = 180.0 - np.degrees(np.arccos(np.clip(cos, -1.0, 1.0)))
+
+    return {
+        "tags": tags,
+        "gamma": np.asarray(gmsh.model.mesh.getElementQualities(tags, "gamma")),
+        "sicn": np.asarray(gmsh.model.mesh.getElementQualities(tags, "minSICN")),
+        "min_dihedral": dihedral.min(axis=1),
+        "max_dihedral": dihedral.max(axis=1),
+    }
+
+
+def quality_summary(q: dict) -> dict:
+    """Min / mean / percentiles and a histogram per metric (JSON-ready)."""
+    out = {"tets": int(len(q.get("tags", [])))}
+    if OPTIMIZE_THRESHOLD and "gamma" in q:
+        out["gamma_below_threshold"] = int(np.sum(q["gamma"] < OPTIMIZE_THRESHOLD))
+    ranges = {"gamma": (0.0, 1.0), "sicn": (-1.0, 1.0), "min_dihedral": (0.0, 70.53), "max_dihedral": (70.53, 180.0)}
+    for name, rng in ranges.items():
+        if name not in q:
+            continue
+        v = q[name]
+        counts, edges = np.histogram(v, bins=20, range=rng)
+        out[name] = {
+            "min": float(v.min()), "max": float(v.max()), "mean": float(v.mean()),
+            "p01": float(np.percentile(v, 1)),
+            "histogram": {"edges": np.round(edges, 4).tolist(), "counts": counts.tolist()},
+        }
+    return out
+
+
+def optimize_bad_tets(q: dict, vols) -> dict:
+    """
+    gmsh's tet optimizer on the fluid volumes. It only touches tets whose
+    gamma (gmsh's quality measure for Mesh.OptimizeThreshold) is below
+    OPTIMIZE_THRESHOLD; the rest of the mesh is left untouched.
+    Returns the quality after optimization (q unchanged if nothing to do).
+    """
+    if not OPTIMIZE_THRESHOLD or not q:
+        return q
+    n_bad = int(np.sum(q["gamma"] < OPTIMIZE_THRESHOLD))
+    if n_bad == 0:
+        return q
+    t0 = time.perf_counter()
+    gmsh.option.setNumber("Mesh.OptimizeThreshold", OPTIMIZE_THRESHOLD)
+    gmsh.model.mesh.optimize("", dimTags=[(3, v) for v in vols])
+    q = tet_quality(vols)
+    n_left = int(np.sum(q["gamma"] < OPTIMIZE_THRESHOLD))
+    print(f"Tet optimizer ({time.perf_counter() - t0:.1f}s): {n_bad:,} tets with gamma < {OPTIMIZE_THRESHOLD} "
+          f"before, {n_left:,} after")
+    if n_left > 0.5 * n_bad:
+        print("  most low-gamma tets remain; check the sizing / surface mesh near them")
+    return q
+
 
-        box = gmsh.model.occ.addBox(X0, Y0, Z0, X1 - X0, Y1 - Y0, Z1 - Z0)
+def partition_mesh(n_parts: int, path: str) -> dict:
+    """
+    Partition the fluid tets into n_parts and write the load-balance report
+    (cells / interface faces per rank) to path. Only a preview for picking
+    the rank count: the mesh file is not reordered, SU2 partitions the mesh
+    itself (ParMETIS) when it starts.
+    """
+    t0 = time.perf_counter()
+    tets = []
+    for dim, group in gmsh.model.getPhysicalGroups(3):
+        for ent in gmsh.model.getEntitiesForPhysicalGroup(dim, group):
+            types = gmsh.model.mesh.getElementTypes(3, ent)
+            if any(t != 4 for t in types):
+                print("Partitioning skipped: not a pure tet mesh (prism layers)")
+                return {}
+            tets.append(gmsh.model.mesh.getElementsByType(4, ent)[1])
+    if not tets:
+        return {}
+    tets = np.concatenate(tets).astype(np.int64).reshape(-1, 4)
+
+    node_tags, coords, _ = gmsh.model.mesh.getNodes()
+    node_tags = node_tags.astype(np.int64)
+    xyz = np.zeros((int(node_tags.max()) + 1, 3))
+    xyz[node_tags] = coords.reshape(-1, 3)
+
+    parts, pairs, method = mesh_partition.partition(tets, xyz, n_parts)
+    report = {"method": method, **mesh_partition.balance_report(parts, pairs, n_parts)}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Partition preview for {n_parts} ranks ({method}) in {time.perf_counter() - t0:.1f}s: "
+          f"imbalance {report['imbalance']:.3f}, {report['cut_faces']:,} interface faces")
+    return report
+
+
+def surface_triangles(geom_path, rel_size):
+    """
+    Surface triangulation of the geometry (gmsh 2D mesh, element size
+    rel_size * Lref) as an (n, 3, 3) array, and Lref.
+    """
+    gmsh.initialize()
+    gmsh.model.add("morph_target")
+    try:
+        gmsh.model.occ.importShapes(geom_path)
         gmsh.model.occ.synchronize()
+        b = gmsh.model.getBoundingBox(-1, -1)
+        Lref = max(b[3] - b[0], b[4] - b[1], b[5] - b[2], 1e-9)
+        gmsh.option.setNumber("Mesh.MeshSizeMax", rel_size * Lref)
+        gmsh.option.setNumber("General.NumThreads", num_threads())
+        gmsh.model.mesh.generate(2)
+        node_tags, xyz, _ = gmsh.model.mesh.getNodes()
+        index = np.zeros(int(node_tags.max()) + 1, dtype=np.int64)
+        index[node_tags.astype(np.int64)] = np.arange(len(node_tags))
+        _, tri_nodes = gmsh.model.mesh.getElementsByType(2)
+        pts = np.asarray(xyz).reshape(-1, 3)
+        return pts[index[np.asarray(tri_nodes, dtype=np.int64)]].reshape(-1, 3, 3), Lref
+    finally:
+        gmsh.finalize()
+
+
+def morph_existing(geom_path) -> bool:
+    """Morph SU2_FILENAME onto geom_path in place. False if it must be remeshed."""
+    import mesh_morph
+
+    tris, Lref = surface_triangles(geom_path, PRESETS[PRESET]["LC_NEAR"])
+    sym_axis = {"x": 0, "y": 1, "z": 2}[SYM_AXIS] if HALF_MODEL else None
+    report = mesh_morph.morph(SU2_FILENAME, tris, SU2_FILENAME, Lref, sym_axis)
+    if not report["ok"]:
+        print(f"Morphing rejected ({report['reason']}), remeshing.")
+        return False
+    print(f"SU2 mesh morphed in place: {SU2_FILENAME} ({report['nodes']:,} nodes, "
+          f"max wall displacement {report['max_wall_disp']:.3g}, worst tet quality "
+          f"{report['min_quality_old']:.3f} -> {report['min_quality_new']:.3f}, {report['seconds']:.1f}s)")
+    write_manifest("SU2", SU2_FILENAME, morphed=True)
+    return True
+
+
+def set_options():
+    """Speed / memory options."""
+    gmsh.option.setNumber("General.NumThreads", num_threads())
+    gmsh.option.setNumber("Mesh.Algorithm3D", 10)  # HXT if available
+    gmsh.option.setNumber("Mesh.Optimize", 0)
+    gmsh.option.setNumber("Mesh.OptimizeNetgen", 0)
+    gmsh.option.setNumber("Mesh.ElementOrder", 1)
+    gmsh.option.setNumber("Mesh.CharacteristicLengthFromCurvature", 0)  # per wall face instead: set_curvature_sizing
+    gmsh.option.setNumber("Mesh.CharacteristicLengthFromPoints", 0)
+    gmsh.option.setNumber("Mesh.CharacteristicLengthExtendFromBoundary", 0)
+    gmsh.option.setNumber("Mesh.SaveAll", 0)
+    gmsh.option.setNumber("Mesh.MshFileVersion", 2.2)  # safer for converters
+
+
+def snap(lo, hi, unit):
+    """Widen [lo, hi] to multiples of unit (stable planes for small geometry changes)."""
+    return math.floor(lo / unit) * unit, math.ceil(hi / unit) * unit
+
+
+def build_domain(geom_path, near_field=False) -> dict:
+    """
+    Geometry pass: import, defeature, farfield box, boolean cut, face
+    classification and physical groups. Returns what the meshing needs.
+    near_field: snapped box planes and a separate near-field volume around
+    the aircraft (incremental remeshing).
+    """
+    # --------------------- Import wing solid ------------------------
+    gmsh.model.occ.importShapes(geom_path)
+    gmsh.model.occ.synchronize()
 
-        # ----------------- Boolean cut: fluid = box \ wing --------------
+    vols = gmsh.model.occ.getEntities(3)
+    if not vols:
+        raise RuntimeError(
+            f"{geom_path} has no solid volume (needs closed solid B-Rep)."
+        )
+
+    # --------------- Wing bbox & reference length -------------------
+    Bs = [bb(3, v[1]) for v in vols]
+    xmin = min(b[0] for b in Bs)
+    ymin = min(b[1] for b in Bs)
+    zmin = min(b[2] for b in Bs)
+    xmax = max(b[3] for b in Bs)
+    ymax = max(b[4] for b in Bs)
+    zmax = max(b[5] for b in Bs)
+
+    xc = 0.5 * (xmin + xmax)
+    yc = 0.5 * (ymin + ymax)
+    zc = 0.5 * (zmin + zmax)
+
+    Lx = xmax - xmin
+    Ly = ymax - ymin
+    Lz = zmax - zmin
+    Lref = max(Lx, Ly, Lz, 1e-9)
+
+    # -------------------------- Defeature ---------------------------
+    if DEFEATURE:
+        vols = defeature(vols, Lref)
+    zones = refinement_zones(Lref)
+
+    P = PRESETS[PRESET]
+    up = P["UP"] * Lref
+    dn = P["DN"] * Lref
+    h1 = P["H1"] * Lref
+    h2 = P["H2"] * Lref
+
+    # --------------------- Farfield box -----------------------------
+    if FLOW_AXIS == "x":
+        X0, X1 = xmin - up, xmax + dn
+        Y0, Y1 = yc - h1, yc + h1
+        Z0, Z1 = zc - h2, zc + h2
+    elif FLOW_AXIS == "y":
+        Y0, Y1 = ymin - up, ymax + dn
+        X0, X1 = xc - h1, xc + h1
+        Z0, Z1 = zc - h2, zc + h2
+    elif FLOW_AXIS == "z":
+        Z0, Z1 = zmin - up, zmax + dn
+        X0, X1 = xc - h1, xc + h1
+        Y0, Y1 = yc - h2, yc + h2
+    else:
+        raise ValueError("FLOW_AXIS must be 'x', 'y' or 'z'.")
+
+    if near_field:
+        unit = SNAP_REL * 10 ** math.floor(math.log10(Lref))
+        X0, X1 = snap(X0, X1, unit)
+        Y0, Y1 = snap(Y0, Y1, unit)
+        Z0, Z1 = snap(Z0, Z1, unit)
+
+    # Half model: the box starts at the symmetry plane; the geometry
+    # on the other side falls outside and is removed by the cut.
+    if HALF_MODEL:
+        if SYM_AXIS == FLOW_AXIS:
+            raise ValueError("SYM_AXIS must differ from FLOW_AXIS.")
+        if SYM_AXIS == "x":
+            X0 = SYM_POS
+        elif SYM_AXIS == "y":
+            Y0 = SYM_POS
+        else:
+            Z0 = SYM_POS
+
+    box = gmsh.model.occ.addBox(X0, Y0, Z0, X1 - X0, Y1 - Y0, Z1 - Z0)
+
+    # Rotors as thin actuator disks (cut out like the aircraft)
+    disks = load_disks()
+    disk_vols = [(3, add_disk(d)) for d in disks]
+    gmsh.model.occ.synchronize()
+
+    # ----------------- Boolean cut: fluid = box \ wing --------------
+    if near_field:
+        # near-field box \ wing and box \ near-field box, fragmented so
+        # that both share the interface faces
+        nb = [bb(*dt) for dt in vols + disk_vols]
+        margin = NEAR_MARGIN_REL * Lref
+        lo = [min(b[i] for b in nb) - margin for i in range(3)]
+        hi = [max(b[i + 3] for b in nb) + margin for i in range(3)]
+        for i, (b0, b1) in enumerate(((X0, X1), (Y0, Y1), (Z0, Z1))):
+            lo[i], hi[i] = snap(lo[i], hi[i], unit)
+            lo[i], hi[i] = max(lo[i], b0), min(hi[i], b1)
+        near = gmsh.model.occ.addBox(*lo, *(h - l for l, h in zip(lo, hi)))
+        hole = gmsh.model.occ.addBox(*lo, *(h - l for l, h in zip(lo, hi)))
+        inner, _ = gmsh.model.occ.cut(
+            [(3, near)], vols + disk_vols, removeObject=True, removeTool=False
+        )
+        outer, _ = gmsh.model.occ.cut([(3, box)], [(3, hole)])
+        fluid, _ = gmsh.model.occ.fragment(outer, inner)
+    else:
         fluid, _ = gmsh.model.occ.cut(
-            [(3, box)], vols, removeObject=True, removeTool=False
+            [(3, box)], vols + disk_vols, removeObject=True, removeTool=False
         )
-        gmsh.model.occ.synchronize()
+    gmsh.model.occ.synchronize()
 
-        if not fluid:
-            raise RuntimeError("Boolean cut failed (no fluid volume).")
-
-        # We expect a single fluid region:
-        fluid_vol = fluid[0][1]
-
-        # --------------------- Classify boundary faces ------------------
-        faces = [
-            tag for (dim, tag) in gmsh.model.getBoundary(
-                [(3, fluid_vol)], oriented=False, recursive=False
-            ) if dim == 2
-        ]
-
-        Ldom = max(abs(X1 - X0), abs(Y1 - Y0), abs(Z1 - Z0))
-        tol = 1e-8 * (Ldom if Ldom > 0 else 1.0)
-
-        inlet, outlet, far = [], [], []
-
-        for s in faces:
-            if FLOW_AXIS == "x" and on_plane(s, "x", X0, tol):
-                inlet.append(s)
-                continue
-            if FLOW_AXIS == "x" and on_plane(s, "x", X1, tol):
-                outlet.append(s)
-                continue
-
-            if FLOW_AXIS == "y" and on_plane(s, "y", Y0, tol):
-                inlet.append(s)
-                continue
-            if FLOW_AXIS == "y" and on_plane(s, "y", Y1, tol):
-                outlet.append(s)
-                continue
-
-            if FLOW_AXIS == "z" and on_plane(s, "z", Z0, tol):
-                inlet.append(s)
-                continue
-            if FLOW_AXIS == "z" and on_plane(s, "z", Z1, tol):
-                outlet.append(s)
-                continue
-
-            # remaining box planes = farfield (sides, top, bottom)
-            if (
-                on_plane(s, "x", X0, tol) or on_plane(s, "x", X1, tol) or
-                on_plane(s, "y", Y0, tol) or on_plane(s, "y", Y1, tol) or
-                on_plane(s, "z", Z0, tol) or on_plane(s, "z", Z1, tol)
-            ):
-                far.append(s)
-
-        in_ids = set(inlet)
-        out_ids = set(outlet)
-        far_ids = set(far)
-
-        # Everything else is a wall: these are the WING surfaces
-        walls = [s for s in faces if s not in (in_ids | out_ids | far_ids)]
-
-        # ---------------------- Physical groups -------------------------
-        gmsh.model.addPhysicalGroup(3, [fluid_vol], name="fluid")
-        if inlet:
-            gmsh.model.addPhysicalGroup(2, inlet, name="inlet")
-        if outlet:
-            gmsh.model.addPhysicalGroup(2, outlet, name="outlet")
-        if walls:
-            gmsh.model.addPhysicalGroup(2, walls, name="walls")
-        if far:
-            gmsh.model.addPhysicalGroup(2, far,   name="farfield")
-
-        # ------- Distance-based sizing using ORIGINAL wing surfaces -----
-        wing_faces = [
-            tag for (dim, tag) in gmsh.model.getBoundary(
-                vols, oriented=False, recursive=False
-            ) if dim == 2
-        ]
-
-        h_near = Lref * P["LC_NEAR"]
-        h_far  = Lref * P["LC_FAR"]
-        d_near = Lref * P["D_NEAR"]
-        d_far  = Lref * P["D_FAR"]
-
-        gmsh.model.mesh.field.add("Distance", 1)
-        gmsh.model.mesh.field.setNumbers(1, "FacesList", wing_faces)
-
-        gmsh.model.mesh.field.add("Threshold", 2)
-        gmsh.model.mesh.field.setNumber(2, "IField", 1)
-        gmsh.model.mesh.field.setNumber(2, "LcMin", h_near)
-        gmsh.model.mesh.field.setNumber(2, "LcMax", h_far)
-        gmsh.model.mesh.field.setNumber(2, "DistMin", d_near)
-        gmsh.model.mesh.field.setNumber(2, "DistMax", d_far)
-        gmsh.model.mesh.field.setAsBackgroundMesh(2)
+    if not fluid:
+        raise RuntimeError("Boolean cut failed (no fluid volume).")
+
+    # One fluid region (or near field + outer region):
+    fluid_vols = [tag for dim, tag in fluid if dim == 3]
+
+    # --------------------- Classify boundary faces ------------------
+    faces = [
+        tag for (dim, tag) in gmsh.model.getBoundary(
+            [(3, v) for v in fluid_vols], oriented=False, recursive=False
+        ) if dim == 2
+    ]
+
+    Ldom = max(abs(X1 - X0), abs(Y1 - Y0), abs(Z1 - Z0))
+    tol = 1e-8 * (Ldom if Ldom > 0 else 1.0)
+
+    inlet, outlet, far, sym = [], [], [], []
+    disk_groups = {}  # "<uid>_in" / "<uid>_out" / "<uid>_rim" -> faces
+    flow = {"x": 0, "y": 1, "z": 2}[FLOW_AXIS]
+
+    for s in faces:
+        if HALF_MODEL and on_plane(s, SYM_AXIS, SYM_POS, tol):
+            sym.append(s)
+            continue
+
+        hit = disk_face(s, disks, flow) if disks else None
+        if hit:
+            disk_groups.setdefault(f"{hit[0]}_{hit[1]}", []).append(s)
+            continue
 
-        # ------------------------- Mesh & export ------------------------
+        if FLOW_AXIS == "x" and on_plane(s, "x", X0, tol):
+            inlet.append(s)
+            continue
+        if FLOW_AXIS == "x" and on_plane(s, "x", X1, tol):
+            outlet.append(s)
+            continue
+
+        if FLOW_AXIS == "y" and on_plane(s, "y", Y0, tol):
+            inlet.append(s)
+            continue
+        if FLOW_AXIS == "y" and on_plane(s, "y", Y1, tol):
+            outlet.append(s)
+            continue
+
+        if FLOW_AXIS == "z" and on_plane(s, "z", Z0, tol):
+            inlet.append(s)
+            continue
+        if FLOW_AXIS == "z" and on_plane(s, "z", Z1, tol):
+            outlet.append(s)
+            continue
+
+        # remaining box planes = farfield (sides, top, bottom)
+        if (
+            on_plane(s, "x", X0, tol) or on_plane(s, "x", X1, tol) or
+            on_plane(s, "y", Y0, tol) or on_plane(s, "y", Y1, tol) or
+            on_plane(s, "z", Z0, tol) or on_plane(s, "z", Z1, tol)
+        ):
+            far.append(s)
+
+    in_ids = set(inlet)
+    out_ids = set(outlet)
+    far_ids = set(far)
+    sym_ids = set(sym)
+
+    disk_ids = {f for fs in disk_groups.values() for f in fs}
+
+    # Everything else is a wall: these are the WING surfaces
+    walls = [s for s in faces if s not in (in_ids | out_ids | far_ids | sym_ids | disk_ids)]
+
+    # ---------------------- Physical groups -------------------------
+    gmsh.model.addPhysicalGroup(3, fluid_vols, name="fluid")
+    if inlet:
+        gmsh.model.addPhysicalGroup(2, inlet, name="inlet")
+    if outlet:
+        gmsh.model.addPhysicalGroup(2, outlet, name="outlet")
+    if walls:
+        gmsh.model.addPhysicalGroup(2, walls, name="walls")
+    if far:
+        gmsh.model.addPhysicalGroup(2, far,   name="farfield")
+    if sym:
+        gmsh.model.addPhysicalGroup(2, sym,   name="symmetry")
+    for name, fs in disk_groups.items():
+        gmsh.model.addPhysicalGroup(2, fs, name=name)
+
+    # ------- Distance-based sizing using ORIGINAL wing surfaces -----
+    wing_faces = [
+        tag for (dim, tag) in gmsh.model.getBoundary(
+            vols, oriented=False, recursive=False
+        ) if dim == 2
+    ]
+
+    return {
+        "Lref": Lref, "center": (xc, yc, zc), "fluid_vols": fluid_vols, "tol": 1e-7 * Ldom,
+        "inlet": inlet, "outlet": outlet, "far": far, "sym": sym, "walls": walls,
+        "wing_faces": wing_faces, "disks": disks, "disk_ids": disk_ids, "zones": zones,
+        "wall_area": sum(gmsh.model.occ.getMass(2, s) for s in walls),
+        "sampling_gap": sampling_gap(wing_faces),
+        "fluid_volume": sum(gmsh.model.occ.getMass(3, v) for v in fluid_vols),
+    }
+
+
+def base_sizes(dom, factor):
+    """(h_near, h_far, d_near, d_far) of the preset, tuned to TARGET_CELLS if set."""
+    P = PRESETS[PRESET]
+    Lref = dom["Lref"]
+    h_near = Lref * P["LC_NEAR"]
+    h_far  = Lref * P["LC_FAR"]
+    d_near = Lref * P["D_NEAR"]
+    d_far  = Lref * P["D_FAR"]
+
+    # ------------- Tet count estimate / tuning to a budget ----------
+    if TARGET_CELLS and dom["wall_area"] > 0:
+        (h_near, h_far, d_near, d_far), scale = tune_sizing(
+            dom["wall_area"], dom["fluid_volume"], (h_near, h_far, d_near, d_far), TARGET_CELLS, factor,
+            dom["sampling_gap"]
+        )
+        print(f"Sizing tuned to {TARGET_CELLS:,} tets: preset sizes x {scale:.3f} "
+              f"(LC_NEAR={h_near / Lref:.3g}, LC_FAR={h_far / Lref:.3g}, "
+              f"D_NEAR={d_near / Lref:.3g}, D_FAR={d_far / Lref:.3g} Lref)")
+    return h_near, h_far, d_near, d_far
+
+
+def cache_signature(dom, sizes, curvature) -> str:
+    """Everything besides the geometry the cached meshes depend on: sizing settings, zones, disks."""
+    spec = {
+        "preset": PRESET, "sizes": [float(f"{v:.6g}") for v in sizes],
+        "curvature": [curvature, CURVATURE_MIN_REL], "distance_sampling": DISTANCE_SAMPLING,
+        "disk_lc_rel": DISK_LC_REL, "disks": dom["disks"], "zones": dom["zones"],
+    }
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()
+
+
+def mesh_level(dom, sizes, factor, level=None, boundary_layer=False, cache=None,
+               curvature=CURVATURE_ELEMENTS) -> dict:
+    """
+    Size fields, (boundary layer,) 3D mesh and export of one mesh; `level`
+    suffixes the output files (grid family); `cache` is the MESH_CACHE file
+    to restore unchanged entities from and update; `curvature` is the wall
+    elements per 2*pi of curvature. Returns {"filename", "tets", "write_s"}.
+    """
+    h_near, h_far, d_near, d_far = sizes
+    raw_estimate = (estimate_tets(dom["wall_area"], dom["fluid_volume"], h_near, h_far, d_near, d_far,
+                                  gap=dom["sampling_gap"]) if dom["wall_area"] > 0 else 0.0)
+    print(f"Predicted tets: {factor * raw_estimate:,.0f} (calibration x {factor:.2f})")
+
+    background = BACKGROUND_POS if BACKGROUND_POS and level is None and os.path.isfile(BACKGROUND_POS) else None
+    if background:
+        print(f"Sizing from the adapted background mesh {background}")
+    set_size_fields(dom["wing_faces"], dom["disk_ids"], dom["disks"], h_near, h_far, d_near, d_far,
+                    background, dom["zones"])
+    set_curvature_sizing(dom["walls"], curvature, CURVATURE_MIN_REL * h_near)
+
+    # ------------------ Prism boundary layer (opt.) -----------------
+    if boundary_layer:
+        # Prism extrusion of the surface mesh can fail on sharp edges / thin gaps
+        # ("Could not find extruded node"); main() then remeshes without layers.
+        try:
+            gmsh.model.mesh.generate(2)
+            fluid_vols = add_boundary_layer(dom["walls"],
+                                            dom["inlet"] + dom["outlet"] + dom["far"] + sorted(dom["disk_ids"]),
+                                            dom["center"], first_cell_height())
+            gmsh.model.addPhysicalGroup(3, fluid_vols, name="fluid")
+            dom = {**dom, "fluid_vols": fluid_vols}
+            set_size_fields(dom["walls"], dom["disk_ids"], dom["disks"], h_near, h_far, d_near, d_far,
+                            background, dom["zones"])
+            gmsh.model.mesh.generate(3)
+        except Exception as e:
+            raise BoundaryLayerError(str(e)) from e
+
+    # ------------------------- Mesh & export ------------------------
+    if cache:
+        t0 = time.perf_counter()
+        signature = cache_signature(dom, sizes, curvature)
+        restored = mesh_cache.restore(cache, signature, dom["tol"])
+        gmsh.option.setNumber("Mesh.MeshOnlyEmpty", 1)
+        if restored:
+            print(f"Mesh cache: restored {restored[1]} curves, {restored[2]} faces, {restored[3]} volumes "
+                  f"in {time.perf_counter() - t0:.1f}s")
+    if not boundary_layer:
         gmsh.model.mesh.generate(3)
 
-        gmsh.write(MSH_FILENAME)
-        print(f"Gmsh mesh (v2.2) written to: {MSH_FILENAME}")
+    q = tet_quality(dom["fluid_vols"])
+    if q:
+        before = quality_summary(q)
+        q = optimize_bad_tets(q, dom["fluid_vols"])
+        quality = quality_summary(q)
+        print(f"Tet quality (fluid): min gamma {before['gamma']['min']:.3f} -> {quality['gamma']['min']:.3f}, "
+              f"min SICN {quality['sicn']['min']:.3f}, "
+              f"dihedral {quality['min_dihedral']['min']:.1f}..{quality['max_dihedral']['max']:.1f} deg")
+        if QUALITY_FILE:
+            with open(level_path(QUALITY_FILE, level), "w", encoding="utf-8") as f:
+                json.dump({"before_optimization": before, "final": quality}, f, indent=2)
 
-        # Direct SU2 export
+    if cache:
+        mesh_cache.save(cache, signature, dom["tol"])
 
-        gmsh.write(SU2_FILENAME)
-        print(f"SU2 mesh written to: {SU2_FILENAME}")
+    n_tets = count_tets(dom["fluid_vols"])
+    if raw_estimate > 0:
+        print(f"Tets: predicted {factor * raw_estimate:,.0f}, actual {n_tets:,} "
+              f"({100.0 * (n_tets / (factor * raw_estimate) - 1.0):+.0f}%)")
+        update_calibration(raw_estimate, n_tets)
+
+    partitions = None
+    if PARTITIONS and PARTITIONS > 1:
+        partitions = level_path(PARTITION_FILE, level)
+        if not partition_mesh(PARTITIONS, partitions):
+            partitions = None
+
+    mesh_path = level_path(CGNS_FILENAME if MESH_FORMAT == "CGNS" else SU2_FILENAME, level)
+    write_s = {MESH_FORMAT: write_mesh(mesh_path)}
+    if MORPH and MESH_FORMAT != "SU2" and level is None:
+        write_s["SU2"] = write_mesh(SU2_FILENAME)  # the morphing base
+    if MSH_FILENAME:
+        write_s["MSH"] = write_mesh(level_path(MSH_FILENAME, level))
+    return {"filename": mesh_path, "tets": n_tets, "raw_estimate": raw_estimate, "write_s": write_s,
+            "partitions": partitions}
+
+
+def main():
+    global HALF_MODEL
+    configured, HALF_MODEL = HALF_MODEL, geometry_half_model()
+    try:
+        mesh_geometry()
+    finally:
+        HALF_MODEL = configured
+
+
+def mesh_geometry():
+    if PRESET not in PRESETS:
+        raise KeyError(f"Unknown PRESET={PRESET}. Valid: {list(PRESETS)}")
+    if MESH_FORMAT not in ("CGNS", "SU2"):
+        raise ValueError("MESH_FORMAT must be 'CGNS' or 'SU2'.")
+
+    geom_path = BREP_PATH if BREP_PATH and os.path.isfile(BREP_PATH) else STEP_PATH
+    if not os.path.isfile(geom_path):
+        raise FileNotFoundError(f"Neither BREP_PATH ({BREP_PATH}) nor STEP_PATH ({STEP_PATH}) found")
+
+    adapting = BACKGROUND_POS and os.path.isfile(BACKGROUND_POS)
+    if MORPH and GRID_LEVELS <= 1 and not adapting and os.path.isfile(SU2_FILENAME) and morph_existing(geom_path):
+        return
+
+    gmsh.initialize()
+    gmsh.model.add("wing_ext")
+
+    boundary_layer = BOUNDARY_LAYER and not HALF_MODEL and GRID_LEVELS <= 1
+    if BOUNDARY_LAYER and HALF_MODEL:
+        print("WARNING: BOUNDARY_LAYER ignored: not supported for half models (walls end on the symmetry plane).")
+    elif BOUNDARY_LAYER and GRID_LEVELS > 1:
+        print("WARNING: BOUNDARY_LAYER ignored for the grid family (layers would not be nested).")
+
+    incremental = INCREMENTAL and GRID_LEVELS <= 1 and not boundary_layer and not adapting
+    if INCREMENTAL and not incremental:
+        print("Incremental remeshing skipped (grid family, boundary layer or adaptation active).")
+
+    try:
+        set_options()
+        dom = build_domain(geom_path, near_field=incremental)
+        factor = load_calibration()
+        sizes = base_sizes(dom, factor)
+
+        if GRID_LEVELS > 1:
+            # Same geometry, fields and refinement zones; element sizes x GRID_RATIO per level
+            levels = []
+            for level in reversed(range(GRID_LEVELS)):  # coarsest first
+                scale = GRID_RATIO ** level
+                print(f"--- Level L{level}: element sizes x {scale:.3f}")
+                gmsh.model.mesh.clear()
+                info = mesh_level(dom, (sizes[0] * scale, sizes[1] * scale, sizes[2], sizes[3]),
+                                  factor, level=level, curvature=CURVATURE_ELEMENTS / scale)
+                levels.append({"level": level, "h_scale": scale, **info})
+            levels.sort(key=lambda lv: lv["level"])
+            write_manifest(MESH_FORMAT, levels[0]["filename"], tets=levels[0]["tets"],
+                           raw_estimate=levels[0]["raw_estimate"], partitions=levels[0]["partitions"],
+                           grid_ratio=GRID_RATIO, levels=levels)
+        else:
+            try:
+                info = mesh_level(dom, sizes, factor, boundary_layer=boundary_layer and bool(dom["walls"]),
+                                  cache=MESH_CACHE if incremental else None)
+            except BoundaryLayerError as e:
+                # add_boundary_layer replaced the CAD model by its surface mesh: rebuild it
+                print(f"WARNING: boundary layer failed ({e}); falling back to the mesh without prism layers.")
+                gmsh.clear()
+                gmsh.model.add("wing_ext")
+                dom = build_domain(geom_path)
+                info = mesh_level(dom, sizes, factor)
+            write_manifest(MESH_FORMAT, info["filename"], write_s=info["write_s"], tets=info["tets"],
+                           raw_estimate=info["raw_estimate"], partitions=info["partitions"])
 
         print(
-            f"Faces -> inlet: {len(inlet)}, outlet: {len(outlet)}, "
-            f"walls (wing): {len(walls)}, farfield: {len(far)}"
+            f"Faces -> inlet: {len(dom['inlet'])}, outlet: {len(dom['outlet'])}, "
+            f"walls (wing): {len(dom['walls'])}, farfield: {len(dom['far'])}"
+            + (f", symmetry: {len(dom['sym'])}" if HALF_MODEL else "")
+            + (f", actuator disks: {len(dom['disks'])} ({len(dom['disk_ids'])} faces)" if dom["disks"] else "")
+            + (f", refinement zones: {len(dom['zones'])}" if dom["zones"] else "")
         )
 
     finally:
@@ -1,19 +1,47 @@
 #!/usr/bin/env python3
 # cpacs_to_solid_step_debug.py
-# CPACS 3.x -> Solid STEP with robust symmetry (x/y/z & CPACS planes) + per-part debug export.
+# CPACS 3.x -> Solid BREP (+ optional STEP) with robust symmetry (x/y/z & CPACS planes) + per-part debug export.
 
 # ------------------ USER SETTINGS ------------------
 CPACS_FILE = "plane.cpacs.xml"   # Input CPACS
-STEP_OUT   = "plane.stp"    # Output (all parts)
+BREP_OUT   = "plane.brep"   # Output (all parts, native OCC; read by mesher and renderer)
+STEP_OUT   = None           # Optional STEP export of the same shapes, e.g. "plane.stp"
+DISKS_OUT  = "plane.disks.json"  # Rotor actuator disks for the mesher / SU2 (None = ignore rotors)
+COMPONENTS_OUT = "plane.components.json"  # Wing outlines + HALF_MODEL for the mesher (None = skip)
 CONFIG_UID = None                 # e.g. "PromptPlane_UID", or None to auto-pick first
+BUILD_CONFIGS = None              # main(): build several configurations in parallel: "all" or a list of uIDs
 SEW_TOL    = 1e-6                 # Sewing tolerance
 FUSE_ALL   = True                 # Fuse solids into one
+FUSE_FUZZY = 0.0                  # Fuzzy tolerance for the boolean fuse (0 = exact)
 EXPORT_OPEN_AS_SHELL = True       # Export shells when solid fails
-EXPORT_PARTS_DIR = "out_parts"    # Per-part STEP export (set None to disable)
+EXPORT_PARTS_DIR = None           # Per-part STEP debug export, e.g. "out_parts" (None = disabled)
+CAD_CACHE_DIR = ".cad_cache"      # Per-component BREP cache, shared by all converters (set None to disable)
+CAD_CACHE_MAX_MB = 500            # Least recently used cache entries are deleted beyond this size (None = no limit)
+WORKERS    = 1                    # Parallel component builds (1 = serial, None = all cores; callers need a __main__ guard)
+HALF_MODEL = False                # Half model for symmetric flight: skip x-z-plane mirroring
+GEOMETRY_LOD = "full"             # "coarse" | "medium" | "full" (screening runs: cheaper lofts and meshes)
+PREFLIGHT  = True                 # Watertight / self-intersection / overlap check before export
+PREFLIGHT_STRICT = False          # Raise on pre-flight errors instead of only logging them
 VERBOSE    = True
 # ---------------------------------------------------
 
+# Level of detail: keep guide curves? max points per profile point list (None = as in CPACS)
+LOD_LEVELS = {
+    "coarse": {"guide_curves": False, "profile_points": 31},
+    "medium": {"guide_curves": True,  "profile_points": 61},
+    "full":   {"guide_curves": True,  "profile_points": None},
+}
+
 import os
+import json
+import time
+import hashlib
+import tempfile
+import multiprocessing
+import copy
+import xml.etree.ElementTree as ET
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
 from lxml import etree
 
@@ -21,6 +49,9 @@ from tixi3 import tixi3wrapper as tixi3
 from tigl3 import tigl3wrapper as tigl3
 from tigl3.configuration import CCPACSConfigurationManager_get_instance
 
+import preflight
+import actuator_disk
+
 # pythonOCC
 from OCC.Core.BRepBuilderAPI import (
     BRepBuilderAPI_Sewing,
@@ -33,7 +64,11 @@ from OCC.Core.gp import gp_Trsf, gp_Pln, gp_Pnt, gp_Dir
 from OCC.Core.TopoDS import TopoDS_Shape, topods_Shell, TopoDS_Compound
 from OCC.Core.STEPControl import STEPControl_Writer, STEPControl_AsIs
 from OCC.Core.IFSelect import IFSelect_RetDone
-from OCC.Core.BRepAlgoAPI import BRepAlgoAPI_Fuse
+from OCC.Core.BRepAlgoAPI import BRepAlgoAPI_Fuse, BRepAlgoAPI_Section
+from OCC.Core.BRepTools import breptools_Write, breptools_Read
+from OCC.Core.Bnd import Bnd_Box
+from OCC.Core.BRepBndLib import brepbndlib_Add
+from OCC.Core.TopTools import TopTools_ListOfShape
 from OCC.Core.gp import gp_Trsf, gp_Pnt, gp_Dir, gp_Ax2
 
 
@@ -42,10 +77,117 @@ def log(msg):
         print(msg)
 
 
+# ---------- CPACS input (path, XML text or parsed tree) ----------
+def load_cpacs(cpacs):
+    """
+    Returns (root, xml_bytes) for a file path, an XML string/bytes, or an
+    already-parsed lxml / ElementTree tree or element. lxml input is used
+    as-is; only ElementTree input is re-parsed (TiXI needs the text anyway).
+    """
+    if isinstance(cpacs, (str, bytes)):
+        text = cpacs.encode("utf-8") if isinstance(cpacs, str) else cpacs
+        if not text.lstrip().startswith(b"<"):
+            text = Path(cpacs).read_bytes()  # a file path
+        return etree.fromstring(text), text
+
+    root = cpacs.getroot() if hasattr(cpacs, "getroot") else cpacs
+    if isinstance(root, etree._Element):
+        return root, etree.tostring(root, encoding="utf-8", xml_declaration=True)
+    text = ET.tostring(root, encoding="utf-8")
+    return etree.fromstring(text), text
+
+
+def _as_root(cpacs):
+    return cpacs if isinstance(cpacs, etree._Element) else load_cpacs(cpacs)[0]
+
+
+# ---------- Geometry level of detail ----------
+def _arc_length(points: np.ndarray) -> np.ndarray:
+    return np.concatenate([[0.0], np.cumsum(np.linalg.norm(np.diff(points, axis=0), axis=1))])
+
+
+def resample_point_list(points: np.ndarray, n: int) -> np.ndarray:
+    """
+    Resample an (m, 3) airfoil polyline (TE -> LE -> TE) to n points by arc
+    length, with cosine clustering towards both trailing edge and leading
+    edge (the point with minimal x), which is kept exactly.
+    """
+    if len(points) <= n:
+        return points
+    s = _arc_length(points)
+    i_le = int(np.argmin(points[:, 0]))
+    n1 = n // 2 + 1
+    n2 = n - n1 + 1
+    t1 = 0.5 * (1.0 - np.cos(np.linspace(0.0, np.pi, n1)))
+    t2 = 0.5 * (1.0 - np.cos(np.linspace(0.0, np.pi, n2)))
+    s_new = np.concatenate([s[i_le] * t1, s[i_le] + (s[-1] - s[i_le]) * t2[1:]])
+    return np.column_stack([np.interp(s_new, s, points[:, k]) for k in range(3)])
+
+
+def resample_arc_length(points: np.ndarray, n: int) -> np.ndarray:
+    """Resample an (m, 3) polyline to n points evenly spaced by arc length (fuselage profiles)."""
+    if len(points) <= n:
+        return points
+    s = _arc_length(points)
+    s_new = np.linspace(0.0, s[-1], n)
+    return np.column_stack([np.interp(s_new, s, points[:, k]) for k in range(3)])
+
+
+# profile point lists resampled by apply_lod: airfoils split at the LE, fuselage profiles plain
+LOD_PROFILES = (
+    ("./vehicles/profiles/wingAirfoils/wingAirfoil/pointList", resample_point_list),
+    ("./vehicles/profiles/rotorAirfoils/rotorAirfoil/pointList", resample_point_list),
+    ("./vehicles/profiles/fuselageProfiles/fuselageProfile/pointList", resample_arc_length),
+)
+
+
+def apply_lod(root, level: str):
+    """
+    Returns a simplified copy of the CPACS root for the given LOD level
+    (the root itself for "full"): segment guide curves are dropped and
+    profile point lists are resampled, following LOD_LEVELS.
+    """
+    if level not in LOD_LEVELS:
+        raise ValueError(f"Unknown GEOMETRY_LOD={level}. Valid: {list(LOD_LEVELS)}")
+    opts = LOD_LEVELS[level]
+    if opts["guide_curves"] and opts["profile_points"] is None:
+        return root
+
+    root = copy.deepcopy(root)
+    dropped = resampled = 0
+
+    if not opts["guide_curves"]:
+        for gc in list(root.iter("guideCurves")):
+            parent = gc.getparent()
+            if parent is not None and parent.tag == "segment":
+                parent.remove(gc)
+                dropped += 1
+
+    n = opts["profile_points"]
+    for path, resample in LOD_PROFILES:
+        for pl in root.findall(path) if n else ():
+            xyz = [pl.find(c) for c in ("x", "y", "z")]
+            if any(e is None for e in xyz):
+                continue
+            try:
+                pts = np.column_stack([[float(v) for v in e.text.split(";")] for e in xyz])
+            except (ValueError, AttributeError):
+                continue
+            if len(pts) <= n:
+                continue
+            new = resample(pts, n)
+            for k, e in enumerate(xyz):
+                e.text = ";".join(f"{v:.8g}" for v in new[:, k])
+            resampled += 1
+
+    log(f"Geometry LOD '{level}': dropped {dropped} guide curve set(s), resampled {resampled} profile(s)")
+    return root
+
+
 # ---------- Config UID detection ----------
-def find_config_uids(cpacs_path: str):
-    tree = etree.parse(cpacs_path)
-    root = tree.getroot()
+def find_config_uids(cpacs):
+    """Configuration uIDs of a CPACS root element (or anything load_cpacs accepts)."""
+    root = _as_root(cpacs)
     uids = []
     for m in root.findall("./vehicles/aircraft/model"):
         uid = m.get("uID")
@@ -58,34 +200,41 @@ def find_config_uids(cpacs_path: str):
     return uids
 
 
+def _find_model(root, cfg_uid: str):
+    for m in root.findall("./vehicles/aircraft/model"):
+        if m.get("uID") == cfg_uid:
+            return m
+    for m in root.findall("./vehicles/rotorcraft/model"):
+        if m.get("uID") == cfg_uid:
+            return m
+    return None
+
+
+def _model_components(base, kind: str):
+    """<wing>/<fuselage> elements of a model (with or without an <aircraftModel> wrapper)."""
+    elems = base.findall(f"./aircraftModel/{kind}s/{kind}")
+    if not elems:
+        elems = base.findall(f"./{kind}s/{kind}")
+    return elems
+
+
 # ---------- Wing symmetry lookup ----------
-def map_wing_symmetry(cpacs_path: str, cfg_uid: str):
+def map_wing_symmetry(cpacs, cfg_uid: str):
     """
     Returns {wing_uid: plane_string|None} under selected model.
+    cpacs is a CPACS root element (or anything load_cpacs accepts).
 
     plane_string can be:
         - simple: 'x', 'y', 'z'
         - CPACS style: 'x-y-plane', 'x-z-plane', 'y-z-plane', 'xy-plane', 'xz-plane', 'yz-plane'
     """
-    tree = etree.parse(cpacs_path)
-    root = tree.getroot()
+    root = _as_root(cpacs)
 
-    base = None
-    for m in root.findall("./vehicles/aircraft/model"):
-        if m.get("uID") == cfg_uid:
-            base = m
-            break
-    if base is None:
-        for m in root.findall("./vehicles/rotorcraft/model"):
-            if m.get("uID") == cfg_uid:
-                base = m
-                break
+    base = _find_model(root, cfg_uid)
     if base is None:
         return {}
 
-    wings = base.findall("./aircraftModel/wings/wing")
-    if not wings:
-        wings = base.findall("./wings/wing")
+    wings = _model_components(base, "wing")
 
     sym = {}
     for w in wings:
@@ -110,6 +259,82 @@ def map_wing_symmetry(cpacs_path: str, cfg_uid: str):
     return sym
 
 
+def list_components(root, cfg_uid: str):
+    """[(kind, uid), ...] for the wings and fuselages of the model, in document order."""
+    base = _find_model(root, cfg_uid)
+    if base is None:
+        return []
+    return [
+        (kind, comp.get("uID"))
+        for kind in ("wing", "fuselage")
+        for comp in _model_components(base, kind)
+        if comp.get("uID")
+    ]
+
+
+# ---------- Per-component change detection ----------
+# Settings process_component depends on. Spawned workers re-import this module
+# with its defaults, so they get these values explicitly (see _apply_settings).
+WORKER_SETTINGS = ("SEW_TOL", "HALF_MODEL", "EXPORT_OPEN_AS_SHELL", "EXPORT_PARTS_DIR", "VERBOSE")
+SHAPE_SETTINGS = ("SEW_TOL", "HALF_MODEL")  # the ones that change the cached parts (fingerprint)
+
+
+def current_settings(names=WORKER_SETTINGS) -> dict:
+    return {k: globals()[k] for k in names}
+
+
+def _apply_settings(settings: dict):
+    globals().update(settings)
+
+
+def component_fingerprints(root, cfg_uid: str):
+    """
+    Returns {component_uid: sha256} for every wing and fuselage of the model.
+
+    The hash covers the component subtree, every element it references by
+    *UID (airfoils, profiles, guide curves, ...) and the transformation chain
+    of its parents, so an unchanged hash means an unchanged loft.
+    """
+    base = _find_model(root, cfg_uid)
+    if base is None:
+        return {}
+
+    by_uid = {el.get("uID"): el for el in root.iter() if isinstance(el.tag, str) and el.get("uID")}
+
+    fps = {}
+    for kind in ("wing", "fuselage"):
+        for comp in _model_components(base, kind):
+            uid = comp.get("uID")
+            if not uid:
+                continue
+            h = hashlib.sha256(f"{kind}|{uid}|{json.dumps(current_settings(SHAPE_SETTINGS), sort_keys=True)}|".encode())
+            h.update(etree.tostring(comp, method="c14n"))
+
+            internal = {e.get("uID") for e in comp.iter() if isinstance(e.tag, str) and e.get("uID")}
+            refs = sorted({
+                (e.text or "").strip() for e in comp.iter()
+                if isinstance(e.tag, str) and e.tag.endswith("UID") and e.tag != "parentUID"
+            } - internal - {""})
+            for ref in refs:
+                target = by_uid.get(ref)
+                if target is not None:
+                    h.update(etree.tostring(target, method="c14n"))
+
+            # Parent placement (absLocal translations are relative to the parent)
+            parent_uid = (comp.findtext("parentUID") or "").strip()
+            seen = {uid}
+            while parent_uid and parent_uid not in seen and parent_uid in by_uid:
+                seen.add(parent_uid)
+                parent = by_uid[parent_uid]
+                trafo = parent.find("transformation")
+                if trafo is not None:
+                    h.update(etree.tostring(trafo, method="c14n"))
+                parent_uid = (parent.findtext("parentUID") or "").strip()
+
+            fps[uid] = h.hexdigest()
+    return fps
+
+
 # ---------- Geometry utils ----------
 def shape_is_valid(shape: TopoDS_Shape) -> bool:
     try:
@@ -143,6 +368,9 @@ def shell_to_solid(shell_or_shape: TopoDS_Shape):
     return shell_or_shape
 
 
+Y_SYMMETRY_PLANES = ("y", "x-z-plane", "xz-plane")
+
+
 def mirror(shape: TopoDS_Shape, plane: str) -> TopoDS_Shape:
     """
     plane:
@@ -167,19 +395,151 @@ def mirror(shape: TopoDS_Shape, plane: str) -> TopoDS_Shape:
 
 
 
-def fuse_all_solids(solids):
-    if not solids:
+def _bbox(shape, gap: float) -> Bnd_Box:
+    box = Bnd_Box()
+    brepbndlib_Add(shape, box)
+    box.Enlarge(gap)
+    return box
+
+
+def _section_box(shape, axis: int, pos: float):
+    """Bounding box (xmin, ymin, zmin, xmax, ymax, zmax) of the cut at coordinate[axis] = pos; None if empty."""
+    origin, normal = [0.0] * 3, [0.0] * 3
+    origin[axis], normal[axis] = pos, 1.0
+    section = BRepAlgoAPI_Section(shape, gp_Pln(gp_Pnt(*origin), gp_Dir(*normal)))
+    section.Build()
+    if not section.IsDone():
         return None
-    res = solids[0]
-    for s in solids[1:]:
-        try:
-            fu = BRepAlgoAPI_Fuse(res, s)
-            fu.Build()
-            if fu.IsDone():
-                res = fu.Shape()
-        except Exception:
-            pass
-    return res
+    box = Bnd_Box()
+    brepbndlib_Add(section.Shape(), box)
+    return None if box.IsVoid() else box.Get()
+
+
+def wing_outline(uid: str, shape):
+    """
+    Root / tip sections of one wing part (CPACS axes, x downstream) for the
+    mesher's wake and tip-vortex zones: span axis (the longer of y and z)
+    and per end the leading / trailing edge points and the chord. An end is
+    a tip unless it is the inner end of a part on one side of the center plane.
+    """
+    b = _bbox(shape, 0.0).Get()
+    ext = [b[3] - b[0], b[4] - b[1], b[5] - b[2]]
+    span = 1 if ext[1] >= ext[2] else 2
+    lift = 3 - span
+    lo, hi = b[span], b[span + 3]
+    ends = []
+    for pos, inset in ((lo, 0.01), (hi, -0.01)):
+        s = _section_box(shape, span, pos + inset * ext[span])
+        if s is None:
+            return None
+        le, te = [s[0], 0.0, 0.0], [s[3], 0.0, 0.0]
+        le[span] = te[span] = pos
+        le[lift] = te[lift] = 0.5 * (s[lift] + s[lift + 3])
+        ends.append({"le": le, "te": te, "chord": s[3] - s[0], "tip": True})
+    if lo >= -1e-6 * ext[span] or hi <= 1e-6 * ext[span]:
+        ends[0 if abs(lo) < abs(hi) else 1]["tip"] = False  # root
+    return {"uid": uid, "span_axis": "xyz"[span], "ends": ends}
+
+
+def overlap_clusters(solids, gap: float = 1e-6):
+    """
+    Group solid indices into clusters of transitively overlapping bounding boxes.
+    Solids in different clusters cannot intersect and never need a boolean.
+    """
+    boxes = [_bbox(s, gap) for s in solids]
+    parent = list(range(len(solids)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i in range(len(solids)):
+        for j in range(i + 1, len(solids)):
+            if not boxes[i].IsOut(boxes[j]):
+                parent[find(i)] = find(j)
+
+    clusters = {}
+    for i in range(len(solids)):
+        clusters.setdefault(find(i), []).append(i)
+    return list(clusters.values())
+
+
+def _fuse(args, tools):
+    """Multi-argument fuse with OCC's parallel mode. Returns the shape or None on failure."""
+    la, lt = TopTools_ListOfShape(), TopTools_ListOfShape()
+    for s in args:
+        la.Append(s)
+    for s in tools:
+        lt.Append(s)
+    fu = BRepAlgoAPI_Fuse()
+    fu.SetArguments(la)
+    fu.SetTools(lt)
+    fu.SetRunParallel(True)
+    if FUSE_FUZZY > 0:
+        fu.SetFuzzyValue(FUSE_FUZZY)
+    try:
+        fu.Build()
+    except Exception:
+        return None
+    if not fu.IsDone() or fu.HasErrors():
+        return None
+    return fu.Shape()
+
+
+def _fuse_balanced(items, report):
+    """
+    Balanced-tree pairwise reduction of [(name, shape), ...] (fallback when the
+    single general fuse fails). Failed pairs are kept side by side in a
+    compound and recorded in report["failed_pairs"].
+    """
+    while len(items) > 1:
+        nxt = []
+        for i in range(0, len(items) - 1, 2):
+            (na, a), (nb, b) = items[i], items[i + 1]
+            fused = _fuse([a], [b])
+            if fused is None:
+                report["failed_pairs"].append((na, nb))
+                fused = make_compound([a, b])
+            nxt.append((f"({na}+{nb})", fused))
+        if len(items) % 2:
+            nxt.append(items[-1])
+        items = nxt
+    return items[0][1]
+
+
+def fuse_all_solids(solids, names=None):
+    """
+    Fuse solids into one shape.
+
+    Solids are first split into clusters of overlapping bounding boxes. Each
+    cluster is fused with one multi-argument, parallel general fuse, or with
+    a balanced pairwise tree if that fails. Returns (shape, report).
+    report has "clusters", "failed_pairs" and "seconds".
+    """
+    report = {"clusters": [], "failed_pairs": [], "seconds": 0.0}
+    if not solids:
+        return None, report
+
+    t0 = time.perf_counter()
+    names = list(names) if names else [f"solid{i}" for i in range(len(solids))]
+
+    results = []
+    for idx in overlap_clusters(solids, gap=max(SEW_TOL, FUSE_FUZZY)):
+        report["clusters"].append([names[i] for i in idx])
+        if len(idx) == 1:
+            results.append(solids[idx[0]])
+            continue
+        fused = _fuse([solids[idx[0]]], [solids[i] for i in idx[1:]])
+        if fused is None:
+            log(f" ! General fuse failed for {[names[i] for i in idx]}; falling back to pairwise tree")
+            fused = _fuse_balanced([(names[i], solids[i]) for i in idx], report)
+        results.append(fused)
+
+    res = results[0] if len(results) == 1 else make_compound(results)
+    report["seconds"] = time.perf_counter() - t0
+    return res, report
 
 
 def make_compound(shapes):
@@ -219,9 +579,145 @@ def export_single_step(shape, out_path: str):
         raise RuntimeError(f"STEP export failed for {out_path}")
 
 
+# ---------- Component cache (serialized BREP) ----------
+def save_brep(shape, out_path: str):
+    if not breptools_Write(shape, out_path):
+        raise RuntimeError(f"BREP export failed for {out_path}")
+
+
+def load_brep(path: str) -> TopoDS_Shape:
+    shape = TopoDS_Shape()
+    if not breptools_Read(shape, path, BRep_Builder()):
+        raise RuntimeError(f"BREP import failed for {path}")
+    return shape
+
+
+def shape_to_brep_bytes(shape) -> bytes:
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "shape.brep")
+        save_brep(shape, path)
+        return Path(path).read_bytes()
+
+
+def shape_from_brep_bytes(data: bytes) -> TopoDS_Shape:
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "shape.brep")
+        Path(path).write_bytes(data)
+        return load_brep(path)
+
+
+def _cache_stem(uid: str, fingerprint: str) -> str:
+    return os.path.join(CAD_CACHE_DIR, f"{uid}_{fingerprint[:16]}")
+
+
+def cache_lookup(uid: str, fingerprint: str):
+    """Cached parts [(kind, uid, shape, is_solid), ...] of a component, or None on a miss."""
+    index = _cache_stem(uid, fingerprint) + ".json"
+    if not os.path.isfile(index):
+        return None
+    try:
+        with open(index, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        parts = [
+            (e["kind"], e["uid"], load_brep(os.path.join(CAD_CACHE_DIR, e["file"])), e["solid"])
+            for e in entries
+        ]
+        os.utime(index)  # last use, for cache_prune
+        return parts
+    except Exception as e:
+        log(f" ! Cache entry for {uid} unusable ({e}); rebuilding")
+        return None
+
+
+def cache_store(uid: str, fingerprint: str, parts):
+    Path(CAD_CACHE_DIR).mkdir(parents=True, exist_ok=True)
+    stem = _cache_stem(uid, fingerprint)
+    entries = []
+    for i, (k, u, shp, is_solid) in enumerate(parts):
+        fname = f"{os.path.basename(stem)}_{i}.brep"
+        save_brep(shp, os.path.join(CAD_CACHE_DIR, fname))
+        entries.append({"kind": k, "uid": u, "file": fname, "solid": is_solid})
+    with open(stem + ".json", "w", encoding="utf-8") as f:
+        json.dump(entries, f, indent=1)
+    if CAD_CACHE_MAX_MB:
+        cache_prune(CAD_CACHE_MAX_MB * 1e6, keep=stem + ".json")
+
+
+def cache_prune(max_bytes: float, keep=None) -> int:
+    """
+    Delete the least recently used cache entries (index .json + its BREPs)
+    until the cache is below max_bytes; `keep` is never deleted.
+    Returns the number of deleted entries.
+    """
+    entries = []
+    for index in Path(CAD_CACHE_DIR).glob("*.json"):
+        try:
+            with open(index, "r", encoding="utf-8") as f:
+                files = [Path(CAD_CACHE_DIR) / e["file"] for e in json.load(f)]
+            size = index.stat().st_size + sum(p.stat().st_size for p in files if p.is_file())
+            entries.append((index.stat().st_mtime, str(index), files, size))
+        except (OSError, ValueError, KeyError):
+            continue  # written or deleted by another converter right now
+    total = sum(e[3] for e in entries)
+    removed = 0
+    for _, index, files, size in sorted(entries):
+        if total <= max_bytes:
+            break
+        if keep and Path(index).resolve() == Path(keep).resolve():
+            continue
+        for p in [Path(index)] + files:
+            p.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+    if removed:
+        log(f"CAD cache: removed {removed} least recently used entr{'y' if removed == 1 else 'ies'}")
+    return removed
+
+
+# ---------- TiGL session (kept open across calls) ----------
+_SESSION = {"key": None, "tixi": None, "tigl": None, "aircraft": None}
+
+
+def _open_tixi(xml_bytes: bytes):
+    """Open TiXI from memory (no file round-trip)."""
+    tixi = tixi3.Tixi3()
+    tixi.openString(xml_bytes.decode("utf-8"))
+    return tixi
+
+
+def open_session(xml_bytes: bytes, cfg_uid: str, doc_hash: str):
+    """
+    Open TiXI/TiGL for (document, configuration) and return the TiGL
+    configuration. Handles stay open and are reused while the same document
+    content and configuration are requested again.
+    """
+    key = (doc_hash, cfg_uid)
+    if _SESSION["key"] == key:
+        return _SESSION["aircraft"]
+    close_session()
+
+    tixi = _open_tixi(xml_bytes)
+    tigl = tigl3.Tigl3()
+    tigl.open(tixi, cfg_uid)
+
+    mgr = CCPACSConfigurationManager_get_instance()
+    aircraft = mgr.get_configuration(tigl._handle.value)
+
+    _SESSION.update(key=key, tixi=tixi, tigl=tigl, aircraft=aircraft)
+    return aircraft
+
+
+def close_session():
+    if _SESSION["tigl"] is not None:
+        _SESSION["tigl"].close()
+    if _SESSION["tixi"] is not None:
+        _SESSION["tixi"].close()
+    _SESSION.update(key=None, tixi=None, tigl=None, aircraft=None)
+
+
 # ---------- TiGL component collection ----------
-def collect_components(aircraft):
-    """Yield (kind, uid, topo_shape) for wings and fuselages (base shapes only)."""
+def collect_components(aircraft, skip=()):
+    """Yield (kind, uid, topo_shape) for wings and fuselages (base shapes only), except uids in skip."""
     # Wings
     try:
         nw = aircraft.get_wing_count()
@@ -229,6 +725,8 @@ def collect_components(aircraft):
         for i in range(1, nw + 1):
             w = aircraft.get_wing(i)
             uid = w.get_uid()
+            if uid in skip:
+                continue
             try:
                 shape = w.get_loft().shape()
                 yield ("wing", uid, shape)
@@ -244,6 +742,8 @@ def collect_components(aircraft):
         for i in range(1, nf + 1):
             f = aircraft.get_fuselage(i)
             uid = f.get_uid()
+            if uid in skip:
+                continue
             try:
                 shape = f.get_loft().shape()
                 yield ("fuselage", uid, shape)
@@ -253,93 +753,328 @@ def collect_components(aircraft):
         log(f" ! Fuselage enumeration failed: {e}")
 
 
-def main():
+def process_component(kind, uid, base_shape, sym):
+    """
+    Mirror (if symmetric), sew and solidify one lofted component.
+    Returns [(kind, uid, shape, is_solid), ...] for the base and mirrored parts.
+    """
+    to_process = [(kind, uid, base_shape)]
+
+    # Add mirrored variant(s) if symmetry declared for this wing
+    if sym:
+        mir = mirror(base_shape, sym)
+        to_process.append((f"{kind}_mirror_{sym}", f"{uid}_mirror", mir))
+
+    parts = []
+    for k, u, shp in to_process:
+        # A valid base solid mirrors into a valid solid: skip sewing the mirrored half again
+        if parts and parts[0][3]:
+            mirrored = mirror(parts[0][2], sym)
+            if shape_is_valid(mirrored):
+                log(f"- {k} {u}: mirrored solid")
+                parts.append((k, u, mirrored, True))
+                if EXPORT_PARTS_DIR:
+                    export_single_step(mirrored, os.path.join(EXPORT_PARTS_DIR, f"{k}_{u}_solid.stp"))
+                continue
+
+        log(f"- {k} {u}: sew (tol={SEW_TOL})")
+        sewed, was_shell = sew_to_shell(shp, SEW_TOL)
+
+        solid = shell_to_solid(sewed)
+        if shape_is_valid(solid):
+            log("  ✓ solid")
+            parts.append((k, u, solid, True))
+            if EXPORT_PARTS_DIR:
+                export_single_step(solid, os.path.join(EXPORT_PARTS_DIR, f"{k}_{u}_solid.stp"))
+        else:
+            msg = "  ⚠ solid failed; keeping shell" if was_shell else "  ⚠ solid failed; keeping shape"
+            log(msg)
+            parts.append((k, u, sewed, False))
+            if EXPORT_OPEN_AS_SHELL and EXPORT_PARTS_DIR:
+                export_single_step(sewed, os.path.join(EXPORT_PARTS_DIR, f"{k}_{u}_shell.stp"))
+    return parts
+
+
+# ---------- Parallel component builds ----------
+def _build_component_worker(xml_bytes: bytes, cfg_uid: str, kind: str, uid: str, sym, settings: dict):
+    """
+    Process-pool task: open the CPACS, loft one component and run
+    process_component on it with the caller's settings. Shapes go back to
+    the parent as BREP bytes.
+    """
+    _apply_settings(settings)
+    tixi = _open_tixi(xml_bytes)
+    tigl = tigl3.Tigl3()
+    tigl.open(tixi, cfg_uid)
+    try:
+        aircraft = CCPACSConfigurationManager_get_instance().get_configuration(tigl._handle.value)
+        comp = aircraft.get_wing(uid) if kind == "wing" else aircraft.get_fuselage(uid)
+        base_shape = comp.get_loft().shape()
+        return [
+            (k, u, shape_to_brep_bytes(shp), is_solid)
+            for k, u, shp, is_solid in process_component(kind, uid, base_shape, sym)
+        ]
+    finally:
+        tigl.close()
+        tixi.close()
+
+
+def build_components_parallel(xml_bytes: bytes, cfg_uid: str, specs, workers: int):
+    """
+    Build [(kind, uid, sym), ...] in a process pool.
+    Yields (uid, parts) per finished component; failed components are logged and skipped.
+    """
+    settings = current_settings()
+    ctx = multiprocessing.get_context("spawn")  # TiGL/OCC state must not be forked
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {
+            pool.submit(_build_component_worker, xml_bytes, cfg_uid, kind, uid, sym, settings): (kind, uid)
+            for kind, uid, sym in specs
+        }
+        for fut in as_completed(futures):
+            kind, uid = futures[fut]
+            try:
+                raw = fut.result()
+            except Exception as e:
+                log(f" ! {kind.capitalize()} {uid} build failed: {e}")
+                continue
+            yield uid, [(k, u, shape_from_brep_bytes(b), is_solid) for k, u, b, is_solid in raw]
+
+
+def convert(cpacs, config_uid=None, lod=None):
+    """
+    Convert a CPACS document and return the exported shape (a compound if
+    there are several), so callers in the same process can use it without
+    re-reading BREP_OUT/STEP_OUT.
+
+    cpacs: file path, XML string/bytes, or a parsed lxml/ElementTree tree.
+    The document is parsed once; TiXI is opened from memory.
+    config_uid: configuration to build (default: CONFIG_UID or the first one).
+    lod: geometry level of detail (default: GEOMETRY_LOD), see LOD_LEVELS.
+    """
     # --- Open CPACS ---
-    log(f"Opening CPACS: {CPACS_FILE}")
-    tixi = tixi3.Tixi3()
-    tixi.open(CPACS_FILE)
+    log("Opening CPACS: " + (cpacs if isinstance(cpacs, str) and not cpacs.lstrip().startswith("<")
+                             else "<in-memory document>"))
+    root, xml_bytes = load_cpacs(cpacs)
+    level = lod or GEOMETRY_LOD
+    if level != "full":
+        root = apply_lod(root, level)
+        xml_bytes = etree.tostring(root, encoding="utf-8", xml_declaration=True)
+    doc_hash = hashlib.sha256(xml_bytes).hexdigest()
 
     # --- Pick configuration ---
-    uids = find_config_uids(CPACS_FILE)
+    uids = find_config_uids(root)
     if not uids:
         raise RuntimeError("No configurations found at /cpacs/vehicles/(aircraft|rotorcraft)/model[@uID].")
-    cfg_uid = CONFIG_UID or uids[0]
-    if CONFIG_UID and CONFIG_UID not in uids:
-        raise RuntimeError(f'CONFIG_UID="{CONFIG_UID}" not in CPACS. Available: {uids}')
+    wanted = config_uid or CONFIG_UID
+    cfg_uid = wanted or uids[0]
+    if wanted and wanted not in uids:
+        raise RuntimeError(f'CONFIG_UID="{wanted}" not in CPACS. Available: {uids}')
     log(f"Using configuration UID: {cfg_uid}")
 
-    tigl = tigl3.Tigl3()
-    tigl.open(tixi, cfg_uid)
-
-    mgr = CCPACSConfigurationManager_get_instance()
-    aircraft = mgr.get_configuration(tigl._handle.value)
-
     # symmetry map for wings
-    wing_sym = map_wing_symmetry(CPACS_FILE, cfg_uid)
+    wing_sym = map_wing_symmetry(root, cfg_uid)
+    if HALF_MODEL:
+        # Only the y >= 0 half is meshed; the mesher cuts the rest at the symmetry plane
+        wing_sym = {k: (None if v in Y_SYMMETRY_PLANES else v) for k, v in wing_sym.items()}
     if wing_sym:
         log("Wing symmetry map: " + ", ".join([f"{k}:{v}" for k, v in wing_sym.items()]))
 
-    # --- Build shapes ---
+    # --- Reuse unchanged components from the cache ---
+    fingerprints = component_fingerprints(root, cfg_uid)
+    parts, cached = [], set()
+    if CAD_CACHE_DIR:
+        for uid, fp in fingerprints.items():
+            hit = cache_lookup(uid, fp)
+            if hit is not None:
+                parts.extend(hit)
+                cached.add(uid)
+        log(f"Cached components: {len(cached)}/{len(fingerprints)}"
+            + (f" ({', '.join(sorted(cached))})" if cached else ""))
+
+    # --- Build shapes (only components that changed) ---
     if EXPORT_PARTS_DIR:
         Path(EXPORT_PARTS_DIR).mkdir(parents=True, exist_ok=True)
 
-    solids, shells = [], []
-    made = 0
-
-    for kind, uid, base_shape in collect_components(aircraft):
-        to_process = [(kind, uid, base_shape)]
+    specs = [
+        (kind, uid, wing_sym.get(uid) if kind == "wing" else None)
+        for kind, uid in list_components(root, cfg_uid)
+        if uid not in cached
+    ]
+    workers = min(WORKERS or os.cpu_count() or 1, len(specs))
 
-        # Add mirrored variant(s) if symmetry declared for this wing
-        sym = wing_sym.get(uid) if kind == "wing" else None
-        if sym:
-            mir = mirror(base_shape, sym)
-            to_process.append((f"{kind}_mirror_{sym}", f"{uid}_mirror", mir))
+    if workers > 1:
+        log(f"Building {len(specs)} component(s) on {workers} worker processes")
+        results = dict(build_components_parallel(xml_bytes, cfg_uid, specs, workers))
+        for _, uid, _ in specs:  # keep document order so fusion is deterministic
+            if uid not in results:
+                continue
+            parts.extend(results[uid])
+            if CAD_CACHE_DIR and uid in fingerprints:
+                cache_store(uid, fingerprints[uid], results[uid])
+    elif specs or not fingerprints:
+        aircraft = open_session(xml_bytes, cfg_uid, doc_hash)
+        for kind, uid, base_shape in collect_components(aircraft, skip=cached):
+            sym = wing_sym.get(uid) if kind == "wing" else None
+            built = process_component(kind, uid, base_shape, sym)
+            parts.extend(built)
+            if CAD_CACHE_DIR and uid in fingerprints:
+                cache_store(uid, fingerprints[uid], built)
 
-        for k, u, shp in to_process:
-            made += 1
-            log(f"- {k} {u}: sew (tol={SEW_TOL})")
-            sewed, was_shell = sew_to_shell(shp, SEW_TOL)
-
-            solid = shell_to_solid(sewed)
-            if shape_is_valid(solid):
-                log("  ✓ solid")
-                solids.append(solid)
-                if EXPORT_PARTS_DIR:
-                    export_single_step(solid, os.path.join(EXPORT_PARTS_DIR, f"{k}_{u}_solid.stp"))
-            else:
-                msg = "  ⚠ solid failed; keeping shell" if was_shell else "  ⚠ solid failed; keeping shape"
-                log(msg)
-                if EXPORT_OPEN_AS_SHELL:
-                    shells.append(sewed)
-                    if EXPORT_PARTS_DIR:
-                        export_single_step(sewed, os.path.join(EXPORT_PARTS_DIR, f"{k}_{u}_shell.stp"))
-
-    if made == 0:
+    if not parts:
         raise RuntimeError("No loftable components found (wings/fuselages).")
 
+    solids = [shp for _, _, shp, is_solid in parts if is_solid]
+    solid_names = [u for _, u, _, is_solid in parts if is_solid]
+    shells = [shp for _, _, shp, is_solid in parts if not is_solid]
+
     # --- Prepare export set ---
-    export_shapes = []
+    export_shapes, export_names = [], []
     if FUSE_ALL and len(solids) > 1:
         log("Fusing all solids into one (may take time)…")
-        fused = fuse_all_solids(solids)
+        fused, report = fuse_all_solids(solids, names=solid_names)
+        log(f"  fused {len(solids)} solid(s) in {len(report['clusters'])} cluster(s) "
+            f"in {report['seconds']:.2f}s")
+        for a, b in report["failed_pairs"]:
+            log(f"  ⚠ fuse failed: {a} + {b} (kept unfused)")
         export_shapes = [fused] if fused else solids[:]
+        export_names = ["fused"] if fused else solid_names[:]
     else:
         export_shapes = solids[:]
+        export_names = solid_names[:]
 
     if EXPORT_OPEN_AS_SHELL and shells:
         export_shapes.extend(shells)
+        export_names.extend(u for _, u, _, is_solid in parts if not is_solid)
 
     if not export_shapes:
         raise RuntimeError("Nothing to export (no solids and shells disabled).")
 
-    # --- Export combined STEP ---
-    log(f"Exporting combined STEP: {STEP_OUT} ({len(export_shapes)} shape(s))")
-    n = export_step_shapes(export_shapes, STEP_OUT)
-    log(f"✓ Wrote {n} shape(s) to {STEP_OUT}")
+    # --- Pre-flight: catch broken geometry before it reaches the mesher ---
+    if PREFLIGHT:
+        check = preflight.check_shapes(export_shapes, export_names)
+        log(f"Pre-flight: {len(check['errors'])} error(s), {len(check['warnings'])} warning(s) "
+            f"in {check['seconds']:.2f}s")
+        for msg in check["errors"]:
+            log(f"  ✗ {msg}")
+        for msg in check["warnings"]:
+            log(f"  ⚠ {msg}")
+        if check["errors"] and PREFLIGHT_STRICT:
+            raise RuntimeError("Pre-flight failed: " + "; ".join(check["errors"]))
 
-    tigl.close()
-    tixi.close()
+    result = export_shapes[0] if len(export_shapes) == 1 else make_compound(export_shapes)
+
+    # --- Export combined BREP (+ optional STEP) ---
+    if BREP_OUT:
+        save_brep(result, BREP_OUT)
+        log(f"✓ Wrote {len(export_shapes)} shape(s) to {BREP_OUT}")
+    if STEP_OUT:
+        log(f"Exporting combined STEP: {STEP_OUT} ({len(export_shapes)} shape(s))")
+        n = export_step_shapes(export_shapes, STEP_OUT)
+        log(f"✓ Wrote {n} shape(s) to {STEP_OUT}")
+
+    # --- Wing outlines per part (the export may be one fused solid) ---
+    if COMPONENTS_OUT:
+        wings = [w for w in (wing_outline(u, shp) for k, u, shp, _ in parts if k.startswith("wing")) if w]
+        with open(COMPONENTS_OUT, "w", encoding="utf-8") as f:
+            json.dump({"flow_axis": "x", "half_model": HALF_MODEL, "wings": wings}, f, indent=2)
+        log(f"✓ Wrote {len(wings)} wing outline(s) to {COMPONENTS_OUT}")
+
+    # --- Rotors of this configuration are not lofted: export them as actuator disks ---
+    if DISKS_OUT:
+        disks = actuator_disk.rotor_disks(root, cfg_uid, half_model=HALF_MODEL)
+        actuator_disk.write_disks(disks, DISKS_OUT)
+        if disks:
+            log(f"✓ Wrote {len(disks)} actuator disk(s) to {DISKS_OUT}: "
+                + ", ".join(d["uid"] for d in disks))
+
+    return result
+
+
+# ---------- Several configurations from one document ----------
+def _config_output(path, cfg_uid: str):
+    """plane.brep -> plane_<uid>.brep, plane.disks.json -> plane_<uid>.disks.json"""
+    if not path:
+        return path
+    folder, name = os.path.split(path)
+    stem, dot, ext = name.partition(".")
+    return os.path.join(folder, f"{stem}_{cfg_uid}{dot}{ext}")
+
+
+# Settings convert() depends on besides the per-configuration outputs
+CONFIG_SETTINGS = WORKER_SETTINGS + ("FUSE_ALL", "FUSE_FUZZY", "CAD_CACHE_DIR", "CAD_CACHE_MAX_MB",
+                                     "PREFLIGHT", "PREFLIGHT_STRICT")
+
+
+def _build_configuration_worker(xml_bytes: bytes, cfg_uid: str, lod: str, half_model: bool,
+                                outputs: dict, settings: dict):
+    """
+    Process-pool task: convert one configuration with the caller's settings,
+    level of detail, half-model flag and output paths; return its shape as
+    BREP bytes.
+    """
+    _apply_settings({**settings, **outputs, "HALF_MODEL": half_model,
+                     "WORKERS": 1})  # one process per configuration; no nested pools
+    return shape_to_brep_bytes(convert(xml_bytes, cfg_uid, lod=lod))
+
+
+def build_configurations(cpacs, config_uids=None, workers=None, lod=None, half_model=None):
+    """
+    Build several configurations of one CPACS document concurrently, one
+    worker process per configuration. Each writes BREP_OUT/STEP_OUT/DISKS_OUT/
+    COMPONENTS_OUT with the configuration uID appended (plane_<uid>.brep).
+
+    config_uids: list of uIDs, or None for every model under aircraft and rotorcraft.
+    lod, half_model: default GEOMETRY_LOD, HALF_MODEL.
+    Returns {cfg_uid: shape}; configurations that fail are logged and left out.
+    """
+    root, xml_bytes = load_cpacs(cpacs)
+    available = find_config_uids(root)
+    uids = list(config_uids) if config_uids else available
+    missing = [u for u in uids if u not in available]
+    if missing:
+        raise RuntimeError(f"Configurations {missing} not in CPACS. Available: {available}")
+
+    workers = min(workers or WORKERS or os.cpu_count() or 1, len(uids))
+    log(f"Building {len(uids)} configuration(s) on {workers} worker processes: {uids}")
+
+    lod = lod or GEOMETRY_LOD
+    half_model = HALF_MODEL if half_model is None else half_model
+    settings = current_settings(CONFIG_SETTINGS)
+
+    def outputs(u):
+        return {
+            "BREP_OUT": _config_output(BREP_OUT, u),
+            "STEP_OUT": _config_output(STEP_OUT, u),
+            "DISKS_OUT": _config_output(DISKS_OUT, u),
+            "COMPONENTS_OUT": _config_output(COMPONENTS_OUT, u),
+            "EXPORT_PARTS_DIR": EXPORT_PARTS_DIR and os.path.join(EXPORT_PARTS_DIR, u),
+        }
+
+    shapes = {}
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        futures = {
+            pool.submit(_build_configuration_worker, xml_bytes, u, lod, half_model, outputs(u), settings): u
+            for u in uids
+        }
+        for fut in as_completed(futures):
+            u = futures[fut]
+            try:
+                shapes[u] = shape_from_brep_bytes(fut.result())
+                log(f"✓ Configuration {u} built")
+            except Exception as e:
+                log(f" ! Configuration {u} failed: {e}")
+    return {u: shapes[u] for u in uids if u in shapes}
+
+
+def main():
+    """Convert CPACS_FILE (see convert), or every BUILD_CONFIGS configuration (see build_configurations)."""
+    if BUILD_CONFIGS:
+        return build_configurations(CPACS_FILE, None if BUILD_CONFIGS == "all" else BUILD_CONFIGS)
+    return convert(CPACS_FILE)
 
 
 if __name__ == "__main__":
     main()
+    close_session()
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+CST (class-shape transformation) airfoil parameterization for CPACS profiles.
+
+A wingAirfoil pointList (TE -> lower -> LE -> upper -> TE, or the other way
+round) is fitted per surface with
+
+    z(psi) = psi^N1 (1 - psi)^N2 * sum_i B_i K_i psi^i (1 - psi)^(n-i)  +/- psi * dz_TE / 2
+
+by one linear least-squares solve with a small penalty on the second
+differences of B (smooth coefficients: editing one of them gives a smooth
+surface change), and stored as a CPACS <cst2D> element (7 coefficients per
+surface instead of hundreds of points). TiGL lofts cst2D profiles
+directly; point lists can be regenerated at any resolution.
+
+    python cst_airfoil.py in.cpacs.xml out.cpacs.xml            # pointList -> cst2D
+    python cst_airfoil.py in.cpacs.xml out.cpacs.xml --expand 121
+"""
+
+import argparse
+from math import comb
+
+import numpy as np
+
+# ------------------ USER SETTINGS ------------------
+ORDER = 6             # Bernstein order -> ORDER + 1 coefficients per surface
+SMOOTHING = 1e-5      # penalty on second differences of B (0 = plain least squares, oscillating B)
+N1, N2 = 0.5, 1.0     # class function exponents (round LE, sharp TE)
+PSI_POINTS = 41       # psi samples stored in cst2D (TiGL evaluates the curve there)
+POINTS = 121          # default resolution when regenerating point lists
+MAX_FIT_RMS = 5e-4    # keep the pointList if the fit is worse (in chord units)
+# ---------------------------------------------------
+
+
+def cosine_spacing(n: int) -> np.ndarray:
+    return 0.5 * (1.0 - np.cos(np.linspace(0.0, np.pi, n)))
+
+
+def shape_matrix(psi: np.ndarray, order: int = ORDER, n1: float = N1, n2: float = N2) -> np.ndarray:
+    """(len(psi), order+1) matrix: class function times Bernstein polynomials."""
+    psi = np.asarray(psi, dtype=float)[:, None]
+    i = np.arange(order + 1)[None, :]
+    k = np.array([comb(order, j) for j in range(order + 1)], dtype=float)[None, :]
+    return psi ** n1 * (1.0 - psi) ** n2 * k * psi ** i * (1.0 - psi) ** (order - i)
+
+
+def cst_surface(psi, b, dz: float = 0.0, n1: float = N1, n2: float = N2) -> np.ndarray:
+    return shape_matrix(psi, len(b) - 1, n1, n2) @ np.asarray(b, dtype=float) + np.asarray(psi) * dz
+
+
+def split_surfaces(x: np.ndarray, z: np.ndarray):
+    """
+    Split a closed profile at the leading edge (minimal x).
+    Returns ((psi_u, z_u), (psi_l, z_l), lower_first) with psi running LE -> TE.
+    """
+    i_le = int(np.argmin(x))
+    first = (x[:i_le + 1][::-1], z[:i_le + 1][::-1])
+    second = (x[i_le:], z[i_le:])
+    lower_first = np.mean(first[1]) < np.mean(second[1])
+    upper, lower = (second, first) if lower_first else (first, second)
+    return upper, lower, lower_first
+
+
+def fit_cst(x, z, order: int = ORDER, n1: float = N1, n2: float = N2, smoothing: float = SMOOTHING) -> dict:
+    """
+    Smoothed least-squares CST fit of a profile given in chord-normalized
+    coordinates (LE at x=0, TE at x=1). Returns {"upper", "lower",
+    "te_thickness", "n1", "n2", "rms", "lower_first"}.
+    """
+    x = np.asarray(x, dtype=float)
+    z = np.asarray(z, dtype=float)
+    (pu, zu), (pl, zl), lower_first = split_surfaces(x, z)
+    te = float(zu[-1] - zl[-1]) if pu[-1] >= pl[-1] - 1e-9 else 0.0
+
+    D = np.diff(np.eye(order + 1), 2, axis=0)  # second differences of B
+    coeffs, residuals = {}, []
+    for name, p, zz, dz in (("upper", pu, zu, 0.5 * te), ("lower", pl, zl, -0.5 * te)):
+        A = shape_matrix(p, order, n1, n2)
+        M = np.vstack([A, np.sqrt(smoothing * len(p)) * D])
+        rhs = np.concatenate([zz - p * dz, np.zeros(len(D))])
+        b, *_ = np.linalg.lstsq(M, rhs, rcond=None)
+        coeffs[name] = b
+        residuals.append(A @ b + p * dz - zz)
+
+    rms = float(np.sqrt(np.mean(np.concatenate(residuals) ** 2)))
+    return {**coeffs, "te_thickness": te, "n1": n1, "n2": n2, "rms": rms, "lower_first": bool(lower_first)}
+
+
+def cst_points(cst: dict, n_points: int = POINTS):
+    """Point list (x, z) of a CST profile: TE -> lower -> LE -> upper -> TE (or reversed)."""
+    n_half = n_points // 2 + 1
+    psi = cosine_spacing(n_half)
+    dz = 0.5 * cst["te_thickness"]
+    zu = cst_surface(psi, cst["upper"], dz, cst["n1"], cst["n2"])
+    zl = cst_surface(psi, cst["lower"], -dz, cst["n1"], cst["n2"])
+    first, second = (zl, zu) if cst.get("lower_first", True) else (zu, zl)
+    x = np.concatenate([psi[::-1], psi[1:]])
+    z = np.concatenate([first[::-1], second[1:]])
+    return x, z
+
+
+# ------------------------------ CPACS I/O -------------------------------------
+
+
+def _vector(values) -> str:
+    return ";".join(f"{v:.8g}" for v in values)
+
+
+def _numbers(text) -> np.ndarray:
+    return np.array([float(t) for t in (text or "").replace(",", ";").split(";") if t.strip()])
+
+
+def _sub(parent, tag: str, text=None, **attrib):
+    el = parent.makeelement(tag, attrib)
+    if text is not None:
+        el.text = text
+    parent.append(el)
+    return el
+
+
+def read_cst2d(airfoil) -> dict:
+    """
+    CST profile of a wingAirfoil's cst2D element. Point order as recorded by
+    to_cst2d (pointOrder attribute), else the CPACS convention (lower first).
+    """
+    c = airfoil.find("cst2D")
+    return {
+        "upper": _numbers(c.findtext("upperB")),
+        "lower": _numbers(c.findtext("lowerB")),
+        "te_thickness": float(c.findtext("trailingEdgeThickness") or 0.0),
+        "n1": float(c.findtext("upperN1") or N1),
+        "n2": float(c.findtext("upperN2") or N2),
+        "lower_first": c.get("pointOrder", "lowerFirst") != "upperFirst",
+    }
+
+
+def to_cst2d(airfoil, order: int = ORDER, max_rms: float = MAX_FIT_RMS):
+    """
+    Replace the pointList of a wingAirfoil by a fitted cst2D element in place.
+    Returns the fit RMS, or None if the profile was kept (not normalized / poor fit).
+    """
+    pl = airfoil.find("pointList")
+    if pl is None:
+        return None
+    x, z = _numbers(pl.findtext("x")), _numbers(pl.findtext("z"))
+    if len(x) < 2 * (order + 1) or len(x) != len(z):
+        return None
+    if abs(x.min()) > 1e-6 or abs(x.max() - 1.0) > 1e-6 or abs(z[np.argmin(x)]) > 1e-6:
+        return None  # cst2D assumes LE at (0, 0) and unit chord
+
+    cst = fit_cst(x, z, order)
+    if cst["rms"] > max_rms:
+        return None
+
+    # CPACS order is TE -> lower -> LE -> upper -> TE; remember other orders for from_cst2d
+    c = pl.makeelement("cst2D", {} if cst["lower_first"] else {"pointOrder": "upperFirst"})
+    _sub(c, "psi", _vector(cosine_spacing(PSI_POINTS)), mapType="vector")
+    _sub(c, "upperN1", f"{cst['n1']:g}")
+    _sub(c, "upperN2", f"{cst['n2']:g}")
+    _sub(c, "upperB", _vector(cst["upper"]), mapType="vector")
+    _sub(c, "lowerN1", f"{cst['n1']:g}")
+    _sub(c, "lowerN2", f"{cst['n2']:g}")
+    _sub(c, "lowerB", _vector(cst["lower"]), mapType="vector")
+    _sub(c, "trailingEdgeThickness", f"{cst['te_thickness']:.8g}")
+    c.tail = pl.tail
+
+    idx = list(airfoil).index(pl)
+    airfoil.remove(pl)
+    airfoil.insert(idx, c)
+    return cst["rms"]
+
+
+def from_cst2d(airfoil, n_points: int = POINTS) -> bool:
+    """Replace the cst2D element of a wingAirfoil by a regenerated pointList in place."""
+    c = airfoil.find("cst2D")
+    if c is None:
+        return False
+    x, z = cst_points(read_cst2d(airfoil), n_points)
+
+    pl = c.makeelement("pointList", {})
+    _sub(pl, "x", _vector(x), mapType="vector")
+    _sub(pl, "y", _vector(np.zeros_like(x)), mapType="vector")
+    _sub(pl, "z", _vector(z), mapType="vector")
+    pl.tail = c.tail
+
+    idx = list(airfoil).index(c)
+    airfoil.remove(c)
+    airfoil.insert(idx, pl)
+    return True
+
+
+def _airfoils(root):
+    return root.findall("./vehicles/profiles/wingAirfoils/wingAirfoil") + \
+        root.findall("./vehicles/profiles/rotorAirfoils/rotorAirfoil")
+
+
+def compact_profiles(root, order: int = ORDER, max_rms: float = MAX_FIT_RMS) -> dict:
+    """pointList -> cst2D for every airfoil that fits. Returns {uid: rms} of the converted ones."""
+    done = {}
+    for a in _airfoils(root):
+        rms = to_cst2d(a, order, max_rms)
+        if rms is not None:
+            done[a.get("uID")] = rms
+    return done
+
+
+def expand_profiles(root, n_points: int = POINTS) -> int:
+    """cst2D -> pointList for every airfoil. Returns the number of expanded profiles."""
+    return sum(from_cst2d(a, n_points) for a in _airfoils(root))
+
+
+# ----- tiny CLI -----
+if __name__ == "__main__":
+    from lxml import etree
+
+    ap = argparse.ArgumentParser(description="Convert CPACS airfoil point lists to CST (cst2D) and back.")
+    ap.add_argument("input")
+    ap.add_argument("output")
+    ap.add_argument("--expand", type=int, default=None, metavar="N",
+                    help="regenerate point lists with N points instead of compacting")
+    args = ap.parse_args()
+
+    tree = etree.parse(args.input)
+    if args.expand:
+        print(f"Expanded {expand_profiles(tree.getroot(), args.expand)} profile(s)")
+    else:
+        for uid, rms in compact_profiles(tree.getroot()).items():
+            print(f"{uid}: rms {rms:.2e} chord")
+    tree.write(args.output, encoding="utf-8", xml_declaration=True)
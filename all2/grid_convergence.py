@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Grid-convergence study on the mesh family of build_wing_domain_fast3.py
+(GRID_LEVELS > 1, L0 = finest):
+
+  - runs SU2 once per level (history_L<k>.csv, su2_out_L<k>.log)
+  - reads the final CD of each level
+  - observed order p, Richardson-extrapolated CD and the fine-grid
+    convergence index (Roache/Celik) from the three finest levels
+
+    python grid_convergence.py            # run SU2 on every level, then evaluate
+    python grid_convergence.py --no-run   # only evaluate existing histories
+
+The refinement ratio between levels is taken from the tet counts in the
+mesh manifest, r = (N_fine / N_coarse)^(1/3), falling back to GRID_RATIO.
+"""
+
+import json
+import math
+import argparse
+
+import run_su2
+from plot_wing_drag import read_drag_from_history
+
+# ------------------ USER SETTINGS ------------------
+MESH_MANIFEST = run_su2.MESH_MANIFEST   # lists the levels of the family
+GRID_RATIO    = 1.5                     # fallback refinement ratio (build_wing_domain_fast3.GRID_RATIO)
+FORMAL_ORDER  = 2.0                     # used when the observed order is not defined
+SAFETY_FACTOR = 1.25                    # GCI factor for three or more grids (3.0 for two)
+# ---------------------------------------------------
+
+
+def load_levels():
+    """Levels of the mesh family from the manifest, finest first."""
+    if not MESH_MANIFEST.is_file():
+        raise FileNotFoundError(f"{MESH_MANIFEST} not found (run build_wing_domain_fast3.py first)")
+    manifest = json.loads(MESH_MANIFEST.read_text())
+    levels = sorted(manifest.get("levels", []), key=lambda lv: lv["level"])
+    if len(levels) < 2:
+        raise ValueError(f"{MESH_MANIFEST} has no grid family (set GRID_LEVELS >= 2 in the mesher)")
+    return manifest, levels
+
+
+def history_file(level: int):
+    return run_su2.CASE_DIR / f"history_L{level}.csv"
+
+
+def run_level(manifest: dict, level: dict) -> None:
+    """SU2 on one level: run.cfg with this level's history file, a manifest with its mesh."""
+    k = level["level"]
+    text = run_su2.CFG_FILE.read_text()
+    text = run_su2.set_cfg_option(text, "CONV_FILENAME", history_file(k).stem)
+    cfg = run_su2.CASE_DIR / f"{run_su2.CFG_FILE.stem}_L{k}.cfg"
+    cfg.write_text(text)
+    level_manifest = MESH_MANIFEST.with_name(f"{MESH_MANIFEST.stem}_L{k}.json")
+    level_manifest.write_text(json.dumps({
+        "format": manifest["format"], "filename": level["filename"], "partitions": level.get("partitions"),
+        "half_model": manifest.get("half_model", False), "symmetry": manifest.get("symmetry"),
+    }, indent=2))
+
+    # run_su2 reads its module settings; point them at this level
+    saved = run_su2.CFG_FILE, run_su2.MESH_MANIFEST, run_su2.SU2_LOG
+    run_su2.CFG_FILE = cfg
+    run_su2.MESH_MANIFEST = level_manifest
+    run_su2.SU2_LOG = run_su2.CASE_DIR / f"su2_out_L{k}.log"
+    try:
+        print(f"--- Level L{k}: {level['filename']}")
+        run_su2.run_su2()
+    finally:
+        run_su2.CFG_FILE, run_su2.MESH_MANIFEST, run_su2.SU2_LOG = saved
+
+
+def refinement_ratio(fine: dict, coarse: dict) -> float:
+    if fine.get("tets") and coarse.get("tets"):
+        return (fine["tets"] / coarse["tets"]) ** (1.0 / 3.0)
+    return GRID_RATIO ** (coarse["level"] - fine["level"])
+
+
+def richardson(f1: float, f2: float, f3: float = None, r21: float = GRID_RATIO, r32: float = GRID_RATIO) -> dict:
+    """
+    Observed order, extrapolated value and GCI from the fine (f1), medium (f2)
+    and coarse (f3) solutions. Without f3, or for oscillatory convergence, the
+    formal order is assumed.
+    """
+    p, note = FORMAL_ORDER, "formal order assumed"
+    if f3 is not None and f2 != f1:
+        ratio = (f3 - f2) / (f2 - f1)
+        if ratio > 0:
+            # Celik et al. (2008): fixed-point iteration for non-constant r
+            s = math.copysign(1.0, ratio)
+            p = abs(math.log(abs(ratio))) / math.log(r21)
+            for _ in range(50):
+                q = math.log((r21 ** p - s) / (r32 ** p - s))
+                p = abs(math.log(abs(ratio)) + q) / math.log(r21)
+            note = "observed order"
+        else:
+            note = "oscillatory convergence, formal order assumed"
+
+    denom = r21 ** p - 1.0
+    f_ext = f1 + (f1 - f2) / denom
+    fs = SAFETY_FACTOR if f3 is not None else 3.0
+    gci = fs * abs((f2 - f1) / f1) / denom if f1 else float("nan")
+    return {"p": p, "note": note, "extrapolated": f_ext, "gci_fine": gci}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Grid-convergence study (Richardson extrapolation, GCI) of CD.")
+    ap.add_argument("--no-run", action="store_true", help="only evaluate existing history_L<k>.csv files")
+    args = ap.parse_args()
+
+    manifest, levels = load_levels()
+    if not args.no_run:
+        for level in reversed(levels):  # coarsest first
+            run_level(manifest, level)
+
+    # half model: full-aircraft CD (same REF_AREA, half the force)
+    scale = 2.0 if manifest.get("half_model") else 1.0
+    cds = [scale * read_drag_from_history(history_file(lv["level"]))[0] for lv in levels]
+    for lv, cd in zip(levels, cds):
+        print(f"L{lv['level']}: {lv.get('tets', 0):>12,} tets  CD = {cd:.6f}")
+
+    r21 = refinement_ratio(levels[0], levels[1])
+    r32 = refinement_ratio(levels[1], levels[2]) if len(levels) > 2 else r21
+    res = richardson(cds[0], cds[1], cds[2] if len(levels) > 2 else None, r21, r32)
+    print(f"\nRefinement ratios: r21 = {r21:.3f}" + (f", r32 = {r32:.3f}" if len(levels) > 2 else ""))
+    print(f"Order p = {res['p']:.3f} ({res['note']})")
+    print(f"CD extrapolated = {res['extrapolated']:.6f}")
+    print(f"GCI fine = {100.0 * res['gci_fine']:.2f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Append-only ledger of LLM calls + a small percentile report.
+
+Every call routed through `timed_call` is appended as one JSON line to
+LEDGER_PATH with model, stage, token counts, cache hits, retries, latency
+and estimated cost. Retries are the OpenAI SDK's own (backoff, Retry-After);
+the ledger only counts them. Shared by all2/ and llm/. Print the aggregated
+report with:
+
+    python llm_ledger.py [--ledger llm_ledger.jsonl] [--stage app2.call_openai_for_patch]
+"""
+
+import os
+import json
+import time
+import argparse
+from datetime import datetime, timezone
+
+# ------------------ USER SETTINGS ------------------
+LEDGER_PATH = os.getenv("FLYAI_LLM_LEDGER", "llm_ledger.jsonl")
+
+# USD per 1M tokens: (input, cached input, output). Unknown models get cost None.
+PRICES_PER_MTOK = {
+    "gpt-5":       (1.25, 0.125, 10.00),
+    "gpt-4.1":     (2.00, 0.50,   8.00),
+    "gpt-4o-mini": (0.15, 0.075,  0.60),
+}
+# ---------------------------------------------------
+
+def _get(obj, name, default=None):
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def usage_counts(response) -> dict:
+    """
+    Token counts from a Responses API or Chat Completions API response.
+    Returns {"input_tokens", "cached_tokens", "output_tokens"} (None if unknown).
+    """
+    usage = _get(response, "usage")
+    tin = _get(usage, "input_tokens", _get(usage, "prompt_tokens"))
+    tout = _get(usage, "output_tokens", _get(usage, "completion_tokens"))
+    details = _get(usage, "input_tokens_details", _get(usage, "prompt_tokens_details"))
+    cached = _get(details, "cached_tokens", 0 if usage is not None else None)
+    return {"input_tokens": tin, "cached_tokens": cached, "output_tokens": tout}
+
+
+def estimate_cost(model: str, input_tokens, cached_tokens, output_tokens):
+    """Estimated USD cost of one call, or None if the model/tokens are unknown."""
+    prices = PRICES_PER_MTOK.get(model)
+    if prices is None or input_tokens is None or output_tokens is None:
+        return None
+    p_in, p_cached, p_out = prices
+    cached = cached_tokens or 0
+    return ((input_tokens - cached) * p_in + cached * p_cached + output_tokens * p_out) / 1e6
+
+
+def record(entry: dict, ledger_path: str = None) -> None:
+    """Append one entry to the ledger (one JSON object per line)."""
+    path = ledger_path or LEDGER_PATH
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, default=str) + "\n")
+
+
+def timed_call(stage: str, model: str, fn, *, extra: dict = None, **kwargs):
+    """
+    Call `fn(model=model, **kwargs)` and record the call in the ledger.
+    Returns the parsed response.
+
+    fn: an OpenAI `with_raw_response.create` method, so the retries the SDK
+    took (`retries_taken`) can be recorded; a plain `create` works too
+    (retries unknown). The calls are not streamed, so there is no
+    time-to-first-token: ttft_s is recorded as None.
+    """
+    started = datetime.now(timezone.utc).isoformat()
+    t0 = time.perf_counter()
+    retries = None
+    error = None
+    failure = None
+    response = None
+
+    try:
+        raw = fn(model=model, **kwargs)
+        retries = getattr(raw, "retries_taken", None)
+        response = raw.parse() if hasattr(raw, "retries_taken") else raw
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        failure = e
+
+    latency = time.perf_counter() - t0
+    counts = usage_counts(response)
+    entry = {
+        "ts": started,
+        "stage": stage,
+        "model": model,
+        **counts,
+        "cache_hit": bool(counts["cached_tokens"]),
+        "ttft_s": None,  # not streamed
+        "latency_s": latency,
+        "retries": retries,
+        "cost_usd": estimate_cost(model, counts["input_tokens"], counts["cached_tokens"], counts["output_tokens"]),
+        "error": error,
+    }
+    if extra:
+        entry.update(extra)
+
+    try:
+        record(entry)
+    except OSError as e:
+        print(f"Warning: could not write LLM ledger: {e}")
+
+    if failure is not None:
+        raise failure
+    return response
+
+
+# ------------------------------- REPORT ---------------------------------------
+
+
+def load_entries(ledger_path: str = None):
+    path = ledger_path or LEDGER_PATH
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entries.append(json.loads(line))
+    return entries
+
+
+def _percentile(values, q: float):
+    """Linear-interpolated percentile (q in 0..100) of a list, None if empty."""
+    vals = sorted(v for v in values if v is not None)
+    if not vals:
+        return None
+    k = (len(vals) - 1) * q / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(vals) - 1)
+    return vals[lo] + (vals[hi] - vals[lo]) * (k - lo)
+
+
+def summarize(entries) -> dict:
+    """Aggregate entries per stage: counts, latency/token/cost percentiles, cache and retry stats."""
+    by_stage = {}
+    for e in entries:
+        by_stage.setdefault(e.get("stage", "?"), []).append(e)
+
+    summary = {}
+    for stage, rows in sorted(by_stage.items()):
+        col = lambda key: [r.get(key) for r in rows]
+        costs = [c for c in col("cost_usd") if c is not None]
+        summary[stage] = {
+            "calls": len(rows),
+            "errors": sum(1 for r in rows if r.get("error")),
+            "retries": sum(r.get("retries") or 0 for r in rows),
+            "cache_hit_rate": sum(1 for r in rows if r.get("cache_hit")) / len(rows),
+            "latency_s": {q: _percentile(col("latency_s"), q) for q in (50, 90, 99)},
+            "ttft_s": {q: _percentile(col("ttft_s"), q) for q in (50, 99)},
+            "input_tokens": {q: _percentile(col("input_tokens"), q) for q in (50, 99)},
+            "output_tokens": {q: _percentile(col("output_tokens"), q) for q in (50, 99)},
+            "cost_usd": {q: _percentile(costs, q) for q in (50, 99)},
+            "cost_usd_total": sum(costs),
+        }
+    return summary
+
+
+def _fmt(v, spec=".2f"):
+    return "-" if v is None else format(v, spec)
+
+
+def print_report(summary: dict) -> None:
+    for stage, s in summary.items():
+        print(f"== {stage}")
+        print(f"   calls {s['calls']}  errors {s['errors']}  retries {s['retries']}  "
+              f"cache hits {100 * s['cache_hit_rate']:.0f}%")
+        lat, ttft = s["latency_s"], s["ttft_s"]
+        print(f"   latency  p50 {_fmt(lat[50])}s  p90 {_fmt(lat[90])}s  p99 {_fmt(lat[99])}s  "
+              f"| ttft p50 {_fmt(ttft[50])}s  p99 {_fmt(ttft[99])}s")
+        tin, tout = s["input_tokens"], s["output_tokens"]
+        print(f"   tokens   in p50 {_fmt(tin[50], '.0f')}  p99 {_fmt(tin[99], '.0f')}  "
+              f"| out p50 {_fmt(tout[50], '.0f')}  p99 {_fmt(tout[99], '.0f')}")
+        cost = s["cost_usd"]
+        print(f"   cost     p50 ${_fmt(cost[50], '.4f')}  p99 ${_fmt(cost[99], '.4f')}  "
+              f"total ${s['cost_usd_total']:.4f}")
+
+
+# ----- tiny CLI -----
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Aggregate the LLM call ledger (p50/p90/p99 per stage).")
+    ap.add_argument("--ledger", default=LEDGER_PATH)
+    ap.add_argument("--stage", default=None, help="only report this stage")
+    ap.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = ap.parse_args()
+
+    rows = load_entries(args.ledger)
+    if args.stage:
+        rows = [r for r in rows if r.get("stage") == args.stage]
+    if not rows:
+        raise SystemExit(f"No ledger entries in {args.ledger}")
+
+    result = summarize(rows)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print_report(result)
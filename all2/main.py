@@ -23,11 +23,11 @@ def _run_gmsh_domain_in_subprocess():
     subprocess.run([sys.executable, "-c", code], check=True)
 
 def gen_from_prompt(_prompt: str) -> str:
-    app2.main("simpleAircraft.xml", "plane.cpacs.xml", _prompt)
-    cpacs_to_step3.main()
+    cpacs_xml = app2.main("simpleAircraft.xml", "plane.cpacs.xml", _prompt)
+    shape = cpacs_to_step3.convert(cpacs_xml)
 
-    visualize.step_to_png_smooth(
-        "plane.stp", "plane1.png",
+    visualize.shape_to_png_smooth(
+        shape, "plane1.png",
         view_elev_azim=(10, 160),
         background=(0.08, 0.08, 0.10),
         add_ground=False,
@@ -54,11 +54,11 @@ def run_optimize():
 
     prompt = optimize.suggest_change_from_local_image("plane_drag.png")
 
-    app2.main("simpleAircraft.xml", "plane2.cpacs.xml", prompt)
-    cpacs_to_step4.main()
+    cpacs_xml = app2.main("simpleAircraft.xml", "plane2.cpacs.xml", prompt)
+    shape = cpacs_to_step4.convert(cpacs_xml)
 
-    visualize.step_to_png_smooth(
-        "plane2.stp", "plane2.png",
+    visualize.shape_to_png_smooth(
+        shape, "plane2.png",
         view_elev_azim=(10, 160),
         background=(0.08, 0.08, 0.10),
         add_ground=False,
@@ -78,26 +78,29 @@ def run_optimize():
         gr.update(value=FIXED_OPT_IMG2, visible=True),
     )
 
-with gr.Blocks(title="FlyAI") as demo:
-    gr.Markdown("# FlyAI - efficient design made simple")
+def build_ui():
+    """Gradio app; built on demand so spawned converter workers that import main do not rebuild it."""
+    with gr.Blocks(title="FlyAI") as demo:
+        gr.Markdown("# FlyAI - efficient design made simple")
 
-    with gr.Tab("Workflow"):
-        prompt = gr.Textbox(label="Prompt", placeholder="input prompt")
+        with gr.Tab("Workflow"):
+            prompt = gr.Textbox(label="Prompt", placeholder="input prompt")
 
-        with gr.Row():
-            btn_gen = gr.Button("Generate", variant="primary")
-            btn_opt = gr.Button("Optimize", interactive=False)
+            with gr.Row():
+                btn_gen = gr.Button("Generate", variant="primary")
+                btn_opt = gr.Button("Optimize", interactive=False)
 
-        # Smaller images via explicit height (width auto)
-        out1 = gr.Image(label="Generate-Resultat (fixed path)", type="filepath", height=320)
+            # Smaller images via explicit height (width auto)
+            out1 = gr.Image(label="Generate-Resultat (fixed path)", type="filepath", height=320)
 
-        with gr.Row():
-            out_opt1 = gr.Image(label="Optimized Bild 1 (fixed)", type="filepath", visible=False, height=320)
-            out_opt2 = gr.Image(label="Optimized Bild 2 (fixed)", type="filepath", visible=False, height=320)
+            with gr.Row():
+                out_opt1 = gr.Image(label="Optimized Bild 1 (fixed)", type="filepath", visible=False, height=320)
+                out_opt2 = gr.Image(label="Optimized Bild 2 (fixed)", type="filepath", visible=False, height=320)
 
-        evt = btn_gen.click(gen_from_prompt, inputs=prompt, outputs=out1)
-        evt.then(enable_opt_button, outputs=btn_opt)
-        btn_opt.click(run_optimize, outputs=[out_opt1, out_opt2])
+            evt = btn_gen.click(gen_from_prompt, inputs=prompt, outputs=out1)
+            evt.then(enable_opt_button, outputs=btn_opt)
+            btn_opt.click(run_optimize, outputs=[out_opt1, out_opt2])
+    return demo
 
 if __name__ == "__main__":
-    demo.launch(server_name="0.0.0.0", server_port=8080)
+    build_ui().launch(server_name="0.0.0.0", server_port=8080)
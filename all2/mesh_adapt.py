@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Solution-adaptive remeshing driven by the previous SU2 result.
+
+  flow_plane.vtu (pressure, velocity on the current mesh)
+  -> nodal gradients / Hessians of the linear tet fields (numpy)
+  -> isotropic size h = c / sqrt(max |eigenvalue|), c chosen so that the new
+     mesh has ADAPT_GROWTH x the current tet count, limited to
+     [h_old / MAX_REFINE, h_old * MAX_COARSEN]
+  -> plane.adapt.pos (gmsh background size view)
+  -> build_wing_domain_fast3 (BACKGROUND_POS) -> run_su2 -> repeat
+
+Cells go where the interpolation error of p and |u| is large (wake,
+stagnation regions, shocks) instead of uniformly around every surface.
+
+    python mesh_adapt.py               # ADAPT_CYCLES x (size field, remesh, SU2)
+    python mesh_adapt.py --cycles 0    # only write the size field from flow_plane.vtu
+
+Requires: numpy, pyvista
+"""
+
+import time
+import argparse
+import pathlib
+
+import numpy as np
+import pyvista as pv
+
+# ------------------ USER SETTINGS ------------------
+CASE_DIR     = pathlib.Path(".")
+VOLUME_FILE  = CASE_DIR / "flow_plane.vtu"     # VOLUME_FILENAME in run.cfg
+POS_FILE     = CASE_DIR / "plane.adapt.pos"    # build_wing_domain_fast3.BACKGROUND_POS
+FIELDS       = ("Pressure", "Velocity")        # scalars / vectors (magnitude) driving the indicator
+ADAPT_GROWTH = 1.0          # new tet count / current tet count (1.0: redistribute only)
+MAX_REFINE   = 4.0          # h_new >= h_old / MAX_REFINE
+MAX_COARSEN  = 2.0          # h_new <= h_old * MAX_COARSEN
+ADAPT_CYCLES = 2
+# ---------------------------------------------------
+
+TET_VOLUME = 1.0 / (6.0 * np.sqrt(2.0))  # regular tet of edge h: 0.1179 h^3
+_EDGES = ((0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3))
+
+
+def read_volume(path) -> tuple:
+    """(points, tets, {field: nodal values}) of an SU2 ParaView volume file; other cells are split into tets."""
+    grid = pv.read(str(path))
+    if not isinstance(grid, pv.UnstructuredGrid):
+        grid = grid.cast_to_unstructured_grid()
+    grid = grid.triangulate()
+    tets = grid.cells_dict.get(pv.CellType.TETRA)
+    if tets is None:
+        raise RuntimeError(f"{path}: no volume cells")
+
+    fields = {}
+    for name in FIELDS:
+        if name in grid.point_data:
+            v = np.asarray(grid.point_data[name], dtype=float)
+            fields[name] = np.linalg.norm(v, axis=1) if v.ndim == 2 else v
+    if not fields:
+        raise KeyError(f"{path}: none of {FIELDS} in {list(grid.point_data.keys())}")
+    return np.asarray(grid.points, dtype=float), np.asarray(tets, dtype=np.int64), fields
+
+
+def tet_geometry(points, tets):
+    """Edge matrices (n, 3, 3), signed volumes and mean edge lengths of the tets."""
+    p = points[tets]
+    D = np.stack([p[:, 1] - p[:, 0], p[:, 2] - p[:, 0], p[:, 3] - p[:, 0]], axis=1)
+    vol = np.linalg.det(D) / 6.0
+    h = sum(np.linalg.norm(p[:, a] - p[:, b], axis=1) for a, b in _EDGES) / 6.0
+    return D, vol, h
+
+
+def nodal_average(tets, values, weights, n_nodes) -> np.ndarray:
+    """Weighted average of per-tet values (n, ...) onto the nodes."""
+    flat = values.reshape(len(values), -1)
+    idx = tets.ravel()
+    w = np.repeat(weights, 4)
+    wsum = np.bincount(idx, weights=w, minlength=n_nodes)
+    out = np.stack([np.bincount(idx, weights=w * np.repeat(flat[:, k], 4), minlength=n_nodes)
+                    for k in range(flat.shape[1])], axis=1)
+    out /= np.maximum(wsum, 1e-300)[:, None]
+    return out.reshape((n_nodes,) + values.shape[1:])
+
+
+def nodal_gradient(D, tets, f, weights, ok) -> np.ndarray:
+    """Gradient of the linear tet interpolant of nodal values f (n_nodes, ...), volume-averaged to the nodes."""
+    fl = f.reshape(len(f), -1)
+    df = fl[tets[:, 1:]] - fl[tets[:, :1]]                # (n_tets, 3, k)
+    g = np.zeros((len(tets), 3, fl.shape[1]))
+    g[ok] = np.linalg.solve(D[ok], df[ok])                # D g = df
+    g = np.moveaxis(g, 1, -1).reshape((len(tets),) + f.shape[1:] + (3,))
+    return nodal_average(tets, g, weights, len(f))
+
+
+def hessian_indicator(points, tets, fields) -> tuple:
+    """
+    Max |eigenvalue| of the (range-normalized) Hessians over all fields per
+    node, plus the nodal volume share and current size.
+    """
+    D, vol, h_tet = tet_geometry(points, tets)
+    w = np.abs(vol)
+    ok = w > 1e-14 * max(w.max(), 1e-300)
+    n = len(points)
+
+    indicator = np.zeros(n)
+    for f in fields.values():
+        scale = max(float(f.max() - f.min()), 1e-300)
+        grad = nodal_gradient(D, tets, f / scale, w, ok)
+        hess = nodal_gradient(D, tets, grad, w, ok)
+        hess = 0.5 * (hess + np.swapaxes(hess, 1, 2))
+        indicator = np.maximum(indicator, np.abs(np.linalg.eigvalsh(hess)).max(axis=1))
+
+    node_volume = np.bincount(tets.ravel(), weights=np.repeat(w / 4.0, 4), minlength=n)
+    h_old = nodal_average(tets, h_tet, w, n)
+    return indicator, node_volume, h_old
+
+
+def target_sizes(indicator, node_volume, h_old, n_target) -> np.ndarray:
+    """h = c / sqrt(indicator), clamped around h_old, with c set (bisection) for n_target tets."""
+    lo_h, hi_h = h_old / MAX_REFINE, h_old * MAX_COARSEN
+    lam = np.maximum(indicator, 1e-300)
+
+    def sizes(c):
+        return np.clip(c / np.sqrt(lam), lo_h, hi_h)
+
+    def count(c):
+        return float(np.sum(node_volume / (TET_VOLUME * sizes(c) ** 3)))
+
+    lo_c, hi_c = 1e-12, 1e12
+    for _ in range(200):
+        c = np.sqrt(lo_c * hi_c)
+        if count(c) > n_target:
+            lo_c = c
+        else:
+            hi_c = c
+    return sizes(np.sqrt(lo_c * hi_c))
+
+
+def write_pos(path, points, tets, h) -> None:
+    """gmsh post-processing view of the nodal sizes on the tets (SS = scalar tetrahedron)."""
+    data = np.concatenate([points[tets].reshape(-1, 12), h[tets]], axis=1)
+    fmt = "SS(" + ",".join(["%.6g"] * 12) + "){" + ",".join(["%.5g"] * 4) + "};"
+    with open(path, "w") as f:
+        f.write('View "adapt_size" {\n')
+        np.savetxt(f, data, fmt=fmt)
+        f.write("};\n")
+
+
+def write_background(volume_file=VOLUME_FILE, pos_file=POS_FILE, growth=ADAPT_GROWTH) -> dict:
+    """Size field for the next mesh from the current solution. Returns a short report."""
+    t0 = time.perf_counter()
+    points, tets, fields = read_volume(volume_file)
+    indicator, node_volume, h_old = hessian_indicator(points, tets, fields)
+    h = target_sizes(indicator, node_volume, h_old, growth * len(tets))
+    write_pos(pos_file, points, tets, h)
+    ratio = h / np.maximum(h_old, 1e-300)
+    return {
+        "tets": len(tets), "fields": list(fields),
+        "refined": float(np.mean(ratio < 0.9)), "coarsened": float(np.mean(ratio > 1.1)),
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Solution-adaptive remeshing loop (Hessian of p and |u|).")
+    ap.add_argument("--cycles", type=int, default=ADAPT_CYCLES, help="remesh + SU2 cycles (0: size field only)")
+    ap.add_argument("--growth", type=float, default=ADAPT_GROWTH, help="tet count growth per cycle")
+    args = ap.parse_args()
+
+    if args.cycles <= 0:
+        rep = write_background(growth=args.growth)
+        print(f"{POS_FILE}: {rep['tets']:,} tets, {100 * rep['refined']:.0f}% of nodes refined, "
+              f"{100 * rep['coarsened']:.0f}% coarsened ({rep['seconds']:.1f}s)")
+        return
+
+    import build_wing_domain_fast3 as mesher
+    import run_su2
+    from plot_wing_drag import read_drag_from_history
+
+    history = []
+    for k in range(args.cycles):
+        print(f"=== Adaptation cycle {k + 1}/{args.cycles}")
+        rep = write_background(growth=args.growth)
+        print(f"Size field from {', '.join(rep['fields'])}: {100 * rep['refined']:.0f}% of nodes refined, "
+              f"{100 * rep['coarsened']:.0f}% coarsened ({rep['seconds']:.1f}s)")
+        mesher.BACKGROUND_POS = str(POS_FILE)
+        mesher.main()
+        run_su2.run_su2()
+        cd, _ = read_drag_from_history()
+        history.append((k + 1, rep["tets"], cd))
+
+    print("cycle  tets(before)  CD")
+    for k, n, cd in history:
+        print(f"{k:5d}  {n:12,}  {cd:.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Per-entity mesh cache for incremental remeshing in gmsh.
+
+After meshing, the mesh of every curve, surface and volume is stored with a
+descriptor of its geometry (bounding box, center of mass, length / area /
+volume). Before the next run, entities whose descriptor matches a cached one
+within KEY_REL of their own size get their old mesh back (new node tags,
+boundary nodes matched by position), and gmsh is run with Mesh.MeshOnlyEmpty
+so that only the changed entities are meshed, attached to the restored
+boundary meshes. The signature (sizing settings, refinement zones, disks)
+must match as well, otherwise everything is remeshed.
+
+A volume is only restored if all its boundary surfaces were, so its tets stay
+conformal. build_wing_domain_fast3.py (INCREMENTAL) splits the fluid into a
+near-field box around the aircraft and a fixed outer region; small design
+changes only touch the near field.
+
+Requires: gmsh-python, numpy, scipy
+"""
+
+import os
+
+import gmsh
+import numpy as np
+from scipy.spatial import cKDTree
+
+KEY_REL = 1e-6   # same entity: bbox / center within KEY_REL x its bbox diagonal, mass within KEY_REL
+FORMAT = 2       # cache file layout
+
+
+def entity_descriptor(dim: int, tag: int) -> np.ndarray:
+    """Bounding box, center of mass and length / area / volume of an OCC entity."""
+    b = gmsh.model.occ.getBoundingBox(dim, tag)
+    c = gmsh.model.occ.getCenterOfMass(dim, tag)
+    m = gmsh.model.occ.getMass(dim, tag)
+    return np.array([*b, *c, m], dtype=float)
+
+
+def match_entity(desc: np.ndarray, cached: np.ndarray, rel: float = KEY_REL) -> int:
+    """Row of `cached` (n, 10) describing the same entity as `desc`, -1 if none."""
+    if len(cached) == 0:
+        return -1
+    diag = np.linalg.norm(desc[3:6] - desc[:3])
+    ok = np.all(np.abs(cached[:, :9] - desc[:9]) <= rel * diag, axis=1)
+    ok &= np.abs(cached[:, 9] - desc[9]) <= rel * abs(desc[9])
+    hits = np.flatnonzero(ok)
+    return int(hits[0]) if len(hits) else -1
+
+
+def _all_coords() -> np.ndarray:
+    tags, coords, _ = gmsh.model.mesh.getNodes()
+    xyz = np.zeros((int(tags.max()) + 1, 3))
+    xyz[tags.astype(np.int64)] = coords.reshape(-1, 3)
+    return xyz
+
+
+def save(path: str, signature: str, tol: float) -> int:
+    """Store the mesh of every meshed curve / surface / volume. Returns the number of entities."""
+    xyz = _all_coords()
+    data = {"format": np.array(FORMAT), "signature": np.array(signature)}
+    for dim in (1, 2, 3):
+        descriptors = []
+        for _, tag in gmsh.model.getEntities(dim):
+            types, elem_tags, elem_nodes = gmsh.model.mesh.getElements(dim, tag)
+            if len(types) != 1 or len(elem_tags[0]) == 0:
+                continue  # unmeshed, or mixed elements (prism layers): not cached
+            conn = elem_nodes[0].astype(np.int64).reshape(len(elem_tags[0]), -1)
+            used, local = np.unique(conn, return_inverse=True)
+            own_tags = gmsh.model.mesh.getNodes(dim, tag)[0]
+            key = f"{dim}.{len(descriptors)}"
+            descriptors.append(entity_descriptor(dim, tag))
+            data[f"{key}.type"] = np.array(types[0])
+            data[f"{key}.xyz"] = xyz[used]
+            data[f"{key}.own"] = np.isin(used, own_tags.astype(np.int64))
+            data[f"{key}.conn"] = local.reshape(conn.shape)
+        data[f"{dim}.descriptors"] = np.array(descriptors).reshape(-1, 10)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **data)
+    os.replace(tmp, path)
+    return sum(1 for k in data if k.endswith(".type"))
+
+
+def restore(path: str, signature: str, tol: float) -> dict:
+    """
+    Put cached meshes back onto the matching entities of the current model.
+    Returns {dim: restored entities}; {} if there is no usable cache.
+    """
+    if not path or not os.path.isfile(path):
+        return {}
+    cache = np.load(path)
+    if "format" not in cache.files or int(cache["format"]) != FORMAT:
+        print("Mesh cache: old file layout, remeshing everything")
+        return {}
+    if str(cache["signature"]) != signature:
+        print("Mesh cache: sizing changed, remeshing everything")
+        return {}
+
+    gmsh.model.mesh.generate(0)  # point nodes: the ends of the restored curves
+    done = {(0, t) for _, t in gmsh.model.getEntities(0)}
+    restored = {1: 0, 2: 0, 3: 0}
+    next_node = int(gmsh.model.mesh.getMaxNodeTag()) + 1
+    next_elem = int(gmsh.model.mesh.getMaxElementTag()) + 1
+
+    for dim in (1, 2, 3):
+        descriptors = cache[f"{dim}.descriptors"].copy()
+        for _, tag in gmsh.model.getEntities(dim):
+            row = match_entity(entity_descriptor(dim, tag), descriptors)
+            if row < 0:
+                continue
+            key = f"{dim}.{row}"
+            boundary = gmsh.model.getBoundary([(dim, tag)], combined=False, oriented=False)
+            if any((d, abs(t)) not in done for d, t in boundary):
+                continue  # a boundary entity changed: remesh this one too
+            xyz, own, conn = cache[f"{key}.xyz"], cache[f"{key}.own"], cache[f"{key}.conn"]
+
+            node_tags = np.empty(len(xyz), dtype=np.int64)
+            if np.any(~own):
+                ntags, ncoords, _ = gmsh.model.mesh.getNodes(dim, tag, includeBoundary=True)
+                if len(ntags) == 0:
+                    continue
+                dist, idx = cKDTree(ncoords.reshape(-1, 3)).query(xyz[~own])
+                if dist.max() > tol:
+                    continue
+                node_tags[~own] = ntags[idx]
+            n_own = int(own.sum())
+            node_tags[own] = np.arange(next_node, next_node + n_own)
+            next_node += n_own
+
+            descriptors[row] = np.nan  # each cached mesh is used once
+            gmsh.model.mesh.addNodes(dim, tag, node_tags[own], xyz[own].ravel())
+            gmsh.model.mesh.addElementsByType(tag, int(cache[f"{key}.type"]),
+                                              np.arange(next_elem, next_elem + len(conn)),
+                                              node_tags[conn].ravel())
+            next_elem += len(conn)
+            done.add((dim, tag))
+            restored[dim] += 1
+    return restored
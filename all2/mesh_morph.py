@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Volume-mesh morphing of an existing SU2 mesh onto a slightly changed geometry.
+
+  old .su2 (walls marker) + new surface triangles
+  -> wall node displacement (closest point on the new surface)
+  -> volume displacement by inverse-distance weighting of the k nearest wall
+     nodes, decaying to zero MORPH_RADIUS_REL * Lref away from the walls
+  -> tet inversion / quality check -> morphed .su2 (same topology)
+
+The topology (and so node/element numbering) is unchanged, so SU2 can be
+restarted from the previous solution. build_wing_domain_fast3.py uses this
+when MORPH is set and falls back to remeshing if the check fails.
+
+Requires: numpy, scipy
+"""
+
+import time
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+# ------------------ USER SETTINGS ------------------
+MORPH_RADIUS_REL = 0.5     # displacement decays to zero at this wall distance (x Lref)
+IDW_NEIGHBOURS = 16        # wall nodes per interpolation
+IDW_POWER = 2.0
+MAX_DISP_REL = 0.05        # larger wall displacements (x Lref) are not morphed
+MIN_QUALITY_RATIO = 0.3    # worst tet quality must stay above this fraction of the original
+WALL_MARKER = "walls"
+FIXED_MARKERS = ("inlet", "outlet", "farfield")
+SYM_MARKER = "symmetry"
+# ---------------------------------------------------
+
+_NODES_PER_TYPE = {3: 2, 5: 3, 9: 4, 10: 4, 12: 8, 13: 6, 14: 5}  # VTK ids used by SU2
+
+
+def read_su2(path: str) -> dict:
+    """
+    Minimal SU2 (ASCII) reader: keeps the file lines for writing back and
+    parses coordinates, tetrahedra and marker node ids.
+    """
+    with open(path, "r") as f:
+        lines = f.read().splitlines()
+
+    mesh = {"lines": lines, "tets": None, "markers": {}}
+    i = 0
+    n = len(lines)
+    while i < n:
+        line = lines[i].strip()
+        if line.startswith("NELEM="):
+            count = int(line.split("=")[1].split()[0])
+            tets = [ln.split()[1:5] for ln in lines[i + 1:i + 1 + count] if ln.split()[0] == "10"]
+            mesh["tets"] = np.array(tets, dtype=np.int64).reshape(-1, 4)
+            i += count + 1
+        elif line.startswith("NPOIN="):
+            count = int(line.split("=")[1].split()[0])
+            block = np.loadtxt(lines[i + 1:i + 1 + count], ndmin=2)
+            mesh["coord_line0"] = i + 1
+            mesh["coords"] = block[:, :3]
+            mesh["has_index"] = block.shape[1] > 3
+            i += count + 1
+        elif line.startswith("MARKER_TAG="):
+            tag = line.split("=")[1].strip()
+            count = int(lines[i + 1].split("=")[1])
+            ids = set()
+            for ln in lines[i + 2:i + 2 + count]:
+                parts = ln.split()
+                ids.update(int(v) for v in parts[1:1 + _NODES_PER_TYPE[int(parts[0])]])
+            mesh["markers"][tag] = np.array(sorted(ids), dtype=np.int64)
+            i += count + 2
+        else:
+            i += 1
+    if "coords" not in mesh or mesh["tets"] is None:
+        raise RuntimeError(f"{path}: no NPOIN/NELEM block (not an SU2 mesh?)")
+    return mesh
+
+
+def write_su2(mesh: dict, coords: np.ndarray, path: str) -> None:
+    """Write the mesh back with new coordinates (everything else unchanged)."""
+    lines = list(mesh["lines"])
+    i0 = mesh["coord_line0"]
+    if mesh["has_index"]:
+        block = [f"{x:.15g}\t{y:.15g}\t{z:.15g}\t{k}" for k, (x, y, z) in enumerate(coords)]
+    else:
+        block = [f"{x:.15g}\t{y:.15g}\t{z:.15g}" for x, y, z in coords]
+    lines[i0:i0 + len(block)] = block
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def closest_points_on_triangles(p, a, b, c) -> np.ndarray:
+    """Row-wise closest point to p on triangle (a, b, c) (Ericson, vectorized)."""
+    dot = lambda u, v: np.einsum("ij,ij->i", u, v)
+    ab, ac, ap = b - a, c - a, p - a
+    d1, d2 = dot(ab, ap), dot(ac, ap)
+    bp = p - b
+    d3, d4 = dot(ab, bp), dot(ac, bp)
+    cp = p - c
+    d5, d6 = dot(ab, cp), dot(ac, cp)
+    va, vb, vc = d3 * d6 - d5 * d4, d5 * d2 - d1 * d6, d1 * d4 - d3 * d2
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_ab = (d1 / (d1 - d3))[:, None]
+        t_ac = (d2 / (d2 - d6))[:, None]
+        t_bc = ((d4 - d3) / ((d4 - d3) + (d5 - d6)))[:, None]
+        denom = 1.0 / (va + vb + vc)
+        v, w = (vb * denom)[:, None], (vc * denom)[:, None]
+
+    conds = [
+        (d1 <= 0) & (d2 <= 0),
+        (d3 >= 0) & (d4 <= d3),
+        (vc <= 0) & (d1 >= 0) & (d3 <= 0),
+        (d6 >= 0) & (d5 <= d6),
+        (vb <= 0) & (d2 >= 0) & (d6 <= 0),
+        (va <= 0) & (d4 - d3 >= 0) & (d5 - d6 >= 0),
+    ]
+    choices = [a, b, a + t_ab * ab, c, a + t_ac * ac, b + t_bc * (c - b)]
+    out = a + v * ab + w * ac
+    for cond, val in zip(reversed(conds), reversed(choices)):
+        out = np.where(cond[:, None], val, out)
+    return out
+
+
+def project_to_surface(points: np.ndarray, tris: np.ndarray, k: int = 8) -> np.ndarray:
+    """Closest points on a triangle soup (n, 3, 3), searching the k nearest triangles by centroid."""
+    k = min(k, len(tris))
+    _, idx = cKDTree(tris.mean(axis=1)).query(points, k=k)
+    idx = idx.reshape(len(points), k)
+    best = np.empty_like(points)
+    best_d = np.full(len(points), np.inf)
+    for j in range(k):
+        t = tris[idx[:, j]]
+        q = closest_points_on_triangles(points, t[:, 0], t[:, 1], t[:, 2])
+        d = np.einsum("ij,ij->i", q - points, q - points)
+        better = d < best_d
+        best[better], best_d[better] = q[better], d[better]
+    return best
+
+
+def tet_volumes(coords: np.ndarray, tets: np.ndarray) -> np.ndarray:
+    p = coords[tets]
+    return np.einsum("ij,ij->i", p[:, 1] - p[:, 0], np.cross(p[:, 2] - p[:, 0], p[:, 3] - p[:, 0])) / 6.0
+
+
+def tet_quality(coords: np.ndarray, tets: np.ndarray) -> np.ndarray:
+    """Mean-ratio style quality 12 (3|V|)^(2/3) / sum(edge^2): 1 for a regular tet, 0 if flat."""
+    p = coords[tets]
+    l2 = sum(np.einsum("ij,ij->i", p[:, a] - p[:, b], p[:, a] - p[:, b])
+             for a, b in ((0, 1), (0, 2), (0, 3), (1, 2), (1, 3), (2, 3)))
+    return 12.0 * (3.0 * np.abs(tet_volumes(coords, tets))) ** (2.0 / 3.0) / np.maximum(l2, 1e-300)
+
+
+def morph(su2_in: str, surface_tris: np.ndarray, su2_out: str, Lref: float, sym_axis: int = None) -> dict:
+    """
+    Morph su2_in onto the surface given as triangles (n, 3, 3) and write su2_out
+    if the result is valid. Returns a report with "ok" and the reason if not.
+    """
+    t0 = time.perf_counter()
+    mesh = read_su2(su2_in)
+    coords = mesh["coords"]
+    wall = mesh["markers"].get(WALL_MARKER)
+    if wall is None or len(wall) == 0:
+        return {"ok": False, "reason": f"no '{WALL_MARKER}' marker in {su2_in}"}
+
+    # Wall displacement: old wall nodes -> closest point on the new surface
+    wall_xyz = coords[wall]
+    wall_disp = project_to_surface(wall_xyz, surface_tris) - wall_xyz
+    if sym_axis is not None and SYM_MARKER in mesh["markers"]:
+        on_sym = np.isin(wall, mesh["markers"][SYM_MARKER])
+        wall_disp[on_sym, sym_axis] = 0.0
+    max_disp = float(np.linalg.norm(wall_disp, axis=1).max())
+    report = {"ok": False, "nodes": len(coords), "wall_nodes": len(wall), "max_wall_disp": max_disp}
+    if max_disp > MAX_DISP_REL * Lref:
+        report["reason"] = f"wall displacement {max_disp:.3g} > {MAX_DISP_REL} Lref"
+        return report
+
+    # Volume displacement: k-nearest IDW, Wendland C2 decay away from the walls
+    radius = MORPH_RADIUS_REL * Lref
+    dist, idx = cKDTree(wall_xyz).query(coords, k=min(IDW_NEIGHBOURS, len(wall)),
+                                        distance_upper_bound=radius, workers=-1)
+    dist, idx = dist.reshape(len(coords), -1), idx.reshape(len(coords), -1)
+    found = np.isfinite(dist)
+    w = np.where(found, 1.0 / (np.where(found, dist, 1.0) ** IDW_POWER + 1e-30), 0.0)
+    wsum = w.sum(axis=1)
+    moving = wsum > 0
+    disp = np.zeros_like(coords)
+    idx_safe = np.where(found, idx, 0)
+    disp[moving] = np.einsum("ij,ijk->ik", w[moving], wall_disp[idx_safe[moving]]) / wsum[moving, None]
+    t = np.clip(dist[:, 0] / radius, 0.0, 1.0)
+    disp *= ((1.0 - t) ** 4 * (4.0 * t + 1.0))[:, None]
+
+    disp[wall] = wall_disp
+    for tag in FIXED_MARKERS:
+        if tag in mesh["markers"]:
+            disp[mesh["markers"][tag]] = 0.0
+    if sym_axis is not None and SYM_MARKER in mesh["markers"]:
+        disp[mesh["markers"][SYM_MARKER], sym_axis] = 0.0
+
+    new_coords = coords + disp
+
+    # Quality check
+    tets = mesh["tets"]
+    v_old, v_new = tet_volumes(coords, tets), tet_volumes(new_coords, tets)
+    inverted = int(np.sum((v_old * v_new <= 0) & (v_old != 0)))
+    q_old, q_new = tet_quality(coords, tets).min(), tet_quality(new_coords, tets).min()
+    report.update(inverted=inverted, min_quality_old=float(q_old), min_quality_new=float(q_new))
+    if inverted:
+        report["reason"] = f"{inverted} inverted tets"
+    elif q_new < MIN_QUALITY_RATIO * q_old:
+        report["reason"] = f"worst tet quality {q_new:.3g} < {MIN_QUALITY_RATIO} x {q_old:.3g}"
+    else:
+        write_su2(mesh, new_coords, su2_out)
+        report["ok"] = True
+    report["seconds"] = time.perf_counter() - t0
+    return report
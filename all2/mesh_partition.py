@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Graph partitioning of a tet mesh for MPI runs.
+
+  tets -> dual graph (tets sharing a face)
+       -> METIS (pymetis, if installed) or recursive coordinate bisection (numpy)
+       -> part per tet + load-balance report (cells / interface faces per rank)
+
+build_wing_domain_fast3.py (PARTITIONS) uses it to preview the load balance
+and the interface faces of a rank count before the run; the mesh file is
+not reordered, SU2 partitions the mesh itself (ParMETIS) at startup.
+run_su2.py starts mpirun with that rank count.
+
+Requires: numpy (pymetis optional)
+"""
+
+import numpy as np
+
+try:
+    import pymetis
+except ImportError:  # numpy fallback
+    pymetis = None
+
+_TET_FACES = np.array([[1, 2, 3], [0, 2, 3], [0, 1, 3], [0, 1, 2]])
+
+
+def dual_graph(tets: np.ndarray) -> np.ndarray:
+    """(m, 2) pairs of tets sharing a face."""
+    faces = np.sort(tets[:, _TET_FACES].reshape(-1, 3), axis=1)
+    owner = np.repeat(np.arange(len(tets)), 4)
+    order = np.lexsort(faces.T[::-1])
+    faces, owner = faces[order], owner[order]
+    same = np.all(faces[1:] == faces[:-1], axis=1)
+    return np.column_stack([owner[:-1][same], owner[1:][same]])
+
+
+def rcb(points: np.ndarray, n_parts: int) -> np.ndarray:
+    """Recursive coordinate bisection: split at the (weighted) median of the longest axis."""
+    parts = np.zeros(len(points), dtype=np.int64)
+
+    def split(idx, n, first):
+        if n == 1 or len(idx) == 0:
+            parts[idx] = first
+            return
+        n_lo = n // 2
+        p = points[idx]
+        axis = int(np.argmax(p.max(axis=0) - p.min(axis=0)))
+        k = len(idx) * n_lo // n
+        order = np.argpartition(p[:, axis], k) if 0 < k < len(idx) else np.arange(len(idx))
+        split(idx[order[:k]], n_lo, first)
+        split(idx[order[k:]], n - n_lo, first + n_lo)
+
+    split(np.arange(len(points)), n_parts, 0)
+    return parts
+
+
+def metis(pairs: np.ndarray, n_cells: int, n_parts: int) -> np.ndarray:
+    both = np.concatenate([pairs, pairs[:, ::-1]])
+    both = both[np.argsort(both[:, 0], kind="stable")]
+    xadj = np.concatenate([[0], np.cumsum(np.bincount(both[:, 0], minlength=n_cells))])
+    _, membership = pymetis.part_graph(n_parts, xadj=xadj, adjncy=both[:, 1])
+    return np.asarray(membership, dtype=np.int64)
+
+
+def partition(tets: np.ndarray, xyz: np.ndarray, n_parts: int):
+    """Part of every tet, the dual graph and the method used ("metis" | "rcb")."""
+    pairs = dual_graph(tets)
+    if pymetis is not None:
+        return metis(pairs, len(tets), n_parts), pairs, "metis"
+    return rcb(xyz[tets].mean(axis=1), n_parts), pairs, "rcb"
+
+
+def balance_report(parts: np.ndarray, pairs: np.ndarray, n_parts: int) -> dict:
+    """Cells and interface faces per rank, imbalance (max / mean cells) and total cut faces."""
+    cells = np.bincount(parts, minlength=n_parts)
+    cut = parts[pairs[:, 0]] != parts[pairs[:, 1]]
+    iface = (np.bincount(parts[pairs[cut, 0]], minlength=n_parts)
+             + np.bincount(parts[pairs[cut, 1]], minlength=n_parts))
+    return {
+        "ranks": n_parts,
+        "cells": cells.tolist(),
+        "interface_faces": iface.tolist(),
+        "imbalance": float(cells.max() / max(cells.mean(), 1e-300)),
+        "cut_faces": int(cut.sum()),
+    }
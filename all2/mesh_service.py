@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Mesh several designs at once within one core budget.
+
+  inputs (BREP / STEP) -> tet count estimate per design (preset sizing)
+  -> cores split by estimated size -> one spawned process per design,
+     build_wing_domain_fast3 with NUM_THREADS = its share, outputs in
+     <out>/<design>/
+  -> per-job wall time, CPU time and CPU efficiency (cpu / (wall * threads))
+
+Every job runs in its own spawned process (gmsh keeps global state; a fresh
+one per job on Python 3.11+), so jobs do not share gmsh sessions. Without a budget, each concurrent mesher would take
+all cores and the machine would be oversubscribed. Each job learns into its
+own copy of the sizing calibration; the copies' observations are merged into
+the shared file after all jobs are done.
+
+    python mesh_service.py a/plane.brep b/plane.brep c/plane.stp --cores 16
+
+Requires: gmsh-python
+"""
+
+import os
+import sys
+import json
+import shutil
+import time
+import argparse
+import resource
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# ------------------ USER SETTINGS ------------------
+CORE_BUDGET  = None          # cores for all jobs together (None = all cores)
+MAX_PARALLEL = None          # concurrent jobs (None = as many as the budget allows)
+OUT_DIR      = "meshes"      # one sub-directory per design
+REPORT_FILE  = "mesh_service.json"
+# ---------------------------------------------------
+
+
+def estimate_job(geom_path: str) -> float:
+    """Predicted tets of one design with the mesher's preset sizing (or TARGET_CELLS)."""
+    import gmsh
+    import build_wing_domain_fast3 as mesher
+
+    if mesher.TARGET_CELLS:
+        return float(mesher.TARGET_CELLS)
+    P = mesher.PRESETS[mesher.PRESET]
+    gmsh.initialize()
+    gmsh.option.setNumber("General.Terminal", 0)
+    try:
+        gmsh.model.occ.importShapes(geom_path)
+        gmsh.model.occ.synchronize()
+        b = gmsh.model.getBoundingBox(-1, -1)
+        ext = [b[3] - b[0], b[4] - b[1], b[5] - b[2]]
+        Lref = max(max(ext), 1e-9)
+        faces = [t for _, t in gmsh.model.occ.getEntities(2)]
+        area = sum(gmsh.model.occ.getMass(2, t) for t in faces)
+        gap = mesher.sampling_gap(faces)
+    finally:
+        gmsh.finalize()
+    flow = {"x": 0, "y": 1, "z": 2}[mesher.FLOW_AXIS]
+    volume = (ext[flow] + (P["UP"] + P["DN"]) * Lref) * (2.0 * P["H1"] * Lref) * (2.0 * P["H2"] * Lref)
+    components = os.path.splitext(geom_path)[0] + ".components.json"
+    saved = mesher.COMPONENTS_PATH
+    mesher.COMPONENTS_PATH = components if os.path.isfile(components) else None
+    try:
+        half_model = mesher.geometry_half_model()
+    finally:
+        mesher.COMPONENTS_PATH = saved
+    if half_model:
+        sym = {"x": 0, "y": 1, "z": 2}[mesher.SYM_AXIS]
+        volume *= 0.5
+        if b[sym] < mesher.SYM_POS - 1e-6 * Lref:
+            area *= 0.5  # full geometry, cut by the mesher (a half model from the converter is one side only)
+    raw = mesher.estimate_tets(area, volume, Lref * P["LC_NEAR"], Lref * P["LC_FAR"],
+                               Lref * P["D_NEAR"], Lref * P["D_FAR"], gap=gap)
+    return mesher.load_calibration() * raw
+
+
+def split_cores(estimates, budget: int):
+    """Threads per job: at least 1, proportional to the estimated size, summing to <= budget."""
+    total = sum(estimates) or 1.0
+    spare = max(budget - len(estimates), 0)
+    shares = [spare * e / total for e in estimates]
+    threads = [1 + int(s) for s in shares]
+    left = budget - sum(threads)
+    for i in sorted(range(len(shares)), key=lambda i: shares[i] - int(shares[i]), reverse=True)[:max(left, 0)]:
+        threads[i] += 1
+    return threads
+
+
+def run_job(job: dict) -> dict:
+    """One mesher run in this (spawned) process; returns timings."""
+    os.makedirs(job["workdir"], exist_ok=True)
+    os.chdir(job["workdir"])
+    if job["code_dir"] not in sys.path:
+        sys.path.insert(0, job["code_dir"])
+    import build_wing_domain_fast3 as mesher
+
+    geom = job["geometry"]
+    if geom.lower().endswith(".brep"):
+        mesher.BREP_PATH = geom
+    else:
+        mesher.BREP_PATH, mesher.STEP_PATH = None, geom
+    disks = os.path.splitext(geom)[0] + ".disks.json"
+    mesher.DISKS_PATH = disks if os.path.isfile(disks) else None
+    components = os.path.splitext(geom)[0] + ".components.json"
+    mesher.COMPONENTS_PATH = components if os.path.isfile(components) else None
+    mesher.RUN_CFG = job["run_cfg"]
+    mesher.SIZING_CALIBRATION = job["calibration"]
+    mesher.NUM_THREADS = job["threads"]
+
+    r0 = resource.getrusage(resource.RUSAGE_SELF)
+    t0 = time.perf_counter()
+    error = None
+    try:
+        mesher.main()
+    except Exception as e:  # report, keep the other jobs going
+        error = f"{type(e).__name__}: {e}"
+    wall = time.perf_counter() - t0
+    r1 = resource.getrusage(resource.RUSAGE_SELF)
+    cpu = (r1.ru_utime - r0.ru_utime) + (r1.ru_stime - r0.ru_stime)
+
+    tets, samples = None, []
+    if error is None and os.path.isfile(mesher.MESH_MANIFEST):
+        with open(mesher.MESH_MANIFEST, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        tets = manifest.get("tets")
+        # (raw estimate, fluid tets) per mesh, for the shared calibration
+        samples = [(m["raw_estimate"], m["tets"]) for m in manifest.get("levels") or [manifest]
+                   if m.get("raw_estimate") and m.get("tets")]
+    return {**job, "wall_s": wall, "cpu_s": cpu, "efficiency": cpu / max(wall * job["threads"], 1e-9),
+            "tets": tets, "samples": samples, "error": error}
+
+
+def merge_calibration(results, path: str) -> int:
+    """Fold the jobs' (raw estimate, tets) samples into the shared calibration file, one after another."""
+    import build_wing_domain_fast3 as mesher
+
+    saved = mesher.SIZING_CALIBRATION
+    mesher.SIZING_CALIBRATION = path
+    n = 0
+    try:
+        for r in results:
+            for raw, tets in r["samples"]:
+                mesher.update_calibration(raw, tets)
+                n += 1
+    finally:
+        mesher.SIZING_CALIBRATION = saved
+    return n
+
+
+def mesh_designs(geometries, budget=None, max_parallel=None, out_dir=OUT_DIR):
+    budget = budget or CORE_BUDGET or multiprocessing.cpu_count()
+    workers = max(1, min(len(geometries), max_parallel or MAX_PARALLEL or budget, budget))
+    code_dir = os.path.dirname(os.path.abspath(__file__))
+    import build_wing_domain_fast3 as mesher
+    calibration = os.path.abspath(mesher.SIZING_CALIBRATION) if mesher.SIZING_CALIBRATION else None
+
+    estimates = [estimate_job(g) for g in geometries]
+    if len(geometries) <= workers:
+        threads = split_cores(estimates, budget)
+    else:
+        threads = [max(1, budget // workers)] * len(geometries)  # runs in waves
+
+    jobs = []
+    for g, est, n in zip(geometries, estimates, threads):
+        stem = os.path.splitext(os.path.basename(g))[0]
+        parent = os.path.basename(os.path.dirname(os.path.abspath(g)))
+        name = f"{parent}_{stem}" if parent else stem
+        workdir = os.path.abspath(os.path.join(out_dir, name))
+        job_calibration = None
+        if calibration:
+            # private copy: concurrent jobs must not read-modify-write one file
+            os.makedirs(workdir, exist_ok=True)
+            job_calibration = os.path.join(workdir, os.path.basename(calibration))
+            if os.path.isfile(calibration):
+                shutil.copyfile(calibration, job_calibration)
+            elif os.path.isfile(job_calibration):
+                os.remove(job_calibration)
+        jobs.append({
+            "name": name,
+            "geometry": os.path.abspath(g),
+            "workdir": workdir,
+            "code_dir": code_dir,
+            "run_cfg": os.path.abspath("run.cfg"),
+            "calibration": job_calibration,
+            "estimate": est,
+            "threads": n,
+        })
+    for j in jobs:
+        print(f"{j['name']}: ~{j['estimate']:,.0f} tets -> {j['threads']} threads")
+
+    t0 = time.perf_counter()
+    ctx = multiprocessing.get_context("spawn")
+    # fresh process per job (Python 3.11+); before, workers are reused and
+    # run_job sets every mesher setting it depends on for each job anyway
+    fresh = {"max_tasks_per_child": 1} if sys.version_info >= (3, 11) else {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, **fresh) as pool:
+        results = list(pool.map(run_job, jobs))
+    total = time.perf_counter() - t0
+    if calibration:
+        n = merge_calibration(results, calibration)
+        if n:
+            print(f"Sizing calibration: {n} new sample(s) merged into {calibration}")
+
+    print(f"\n{'job':<24} {'threads':>7} {'tets':>12} {'wall [s]':>9} {'cpu [s]':>9} {'eff':>6}")
+    for r in results:
+        tets = f"{r['tets']:,}" if r["tets"] else "-"
+        print(f"{r['name']:<24} {r['threads']:>7} {tets:>12} {r['wall_s']:>9.1f} {r['cpu_s']:>9.1f} "
+              f"{100 * r['efficiency']:>5.0f}%" + (f"  FAILED {r['error']}" if r["error"] else ""))
+    cpu = sum(r["cpu_s"] for r in results)
+    print(f"Total wall {total:.1f}s for {len(results)} designs on {budget} cores "
+          f"(CPU efficiency {100 * cpu / max(total * budget, 1e-9):.0f}%)")
+
+    with open(REPORT_FILE, "w", encoding="utf-8") as f:
+        json.dump({"cores": budget, "workers": workers, "wall_s": total, "jobs": results}, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Mesh several designs in parallel within a core budget.")
+    ap.add_argument("geometries", nargs="+", help="BREP / STEP files")
+    ap.add_argument("--cores", type=int, default=None, help="core budget (default: all cores)")
+    ap.add_argument("--parallel", type=int, default=None, help="max concurrent jobs")
+    ap.add_argument("--out", default=OUT_DIR, help="output directory (one sub-directory per design)")
+    args = ap.parse_args()
+    results = mesh_designs(args.geometries, args.cores, args.parallel, args.out)
+    sys.exit(1 if any(r["error"] for r in results) else 0)
@@ -5,6 +5,8 @@ from pathlib import Path
 from dotenv import load_dotenv
 from openai import OpenAI
 
+import llm_ledger
+
 
 def _guess_mime_type(image_path: str) -> str:
     ext = Path(image_path).suffix.lower()
@@ -67,8 +69,10 @@ def suggest_change_from_local_image(image_path: str) -> str:
 
     user_text = "Suggest one concrete geometric or shape improvement for this object the best would be making the nose more pointed. And nothing complex at all"
 
-    response = client.responses.create(
-        model="gpt-4o-mini",  # vision-capable model
+    response = llm_ledger.timed_call(
+        "optimize.suggest_change_from_local_image",
+        "gpt-4o-mini",  # vision-capable model
+        client.responses.with_raw_response.create,  # raw: llm_ledger records the SDK's retries
         instructions=instructions,
         input=[
             {
@@ -11,6 +11,7 @@ Requirements:
     pip install pyvista pandas
 """
 
+import json
 import pathlib
 
 import numpy as np
@@ -24,18 +25,32 @@ CASE_DIR     = pathlib.Path(".")
 HISTORY_FILE = CASE_DIR / "history.csv"
 SURFACE_GLOB = "surface_flow*.vtu"
 OUTPUT_IMAGE = CASE_DIR / "plane_drag.png"
+MESH_MANIFEST = CASE_DIR / "plane.mesh.json"  # half model + symmetry plane (build_wing_domain_fast3)
+MIRROR_HALF  = True    # half model: also render the mirrored half
+
+
+def symmetry_plane():
+    """(axis index, position) of the half model's symmetry plane from the mesh manifest, None for full models."""
+    if not MESH_MANIFEST.is_file():
+        return None
+    manifest = json.loads(MESH_MANIFEST.read_text())
+    sym = manifest.get("symmetry")
+    if not manifest.get("half_model") or not sym:
+        return None
+    return {"x": 0, "y": 1, "z": 2}[sym["axis"]], float(sym["pos"])
 
 
 # ----------------------- DRAG / LIFT FROM history.csv ------------------------
 
 
-def read_drag_from_history():
+def read_drag_from_history(history_file=None):
     """Get CD and CL from history.csv, robust to spacing/quotes in headers."""
-    if not HISTORY_FILE.exists():
-        raise FileNotFoundError(f"{HISTORY_FILE} not found")
+    history_file = pathlib.Path(history_file or HISTORY_FILE)
+    if not history_file.exists():
+        raise FileNotFoundError(f"{history_file} not found")
 
-    df = pd.read_csv(HISTORY_FILE)
-    print("history.csv columns:", list(df.columns))
+    df = pd.read_csv(history_file)
+    print(f"{history_file.name} columns:", list(df.columns))
 
     def norm(name: str) -> str:
         return name.strip().strip('"').strip().upper()
@@ -112,11 +127,15 @@ def load_surface_polydata():
     return surface
 
 
-def strip_farfield_box_cells(mesh: pv.PolyData, margin_ratio: float = 1e-3) -> pv.PolyData:
+def strip_farfield_box_cells(mesh: pv.PolyData, margin_ratio: float = 1e-3,
+                             sym_axis=None) -> pv.PolyData:
     """
     Keep only cells whose centers are strictly inside the global bounding box
     by a small margin. "Box" faces have centers exactly on the bbox planes, so
     they get removed. The wing (inside the box) is kept.
+
+    sym_axis: for half models, the lower bound along this axis is the
+    symmetry plane, where the wing root sits; it is not trimmed.
     """
     xmin, xmax, ymin, ymax, zmin, zmax = mesh.bounds
     Lx = xmax - xmin
@@ -130,10 +149,14 @@ def strip_farfield_box_cells(mesh: pv.PolyData, margin_ratio: float = 1e-3) -> p
 
     centers = mesh.cell_centers().points  # shape (n_cells, 3)
 
+    lo = np.array([xmin + mx, ymin + my, zmin + mz])
+    if sym_axis is not None:
+        lo[sym_axis] = -np.inf
+
     inside = (
-        (centers[:, 0] > xmin + mx) & (centers[:, 0] < xmax - mx) &
-        (centers[:, 1] > ymin + my) & (centers[:, 1] < ymax - my) &
-        (centers[:, 2] > zmin + mz) & (centers[:, 2] < zmax - mz)
+        (centers[:, 0] > lo[0]) & (centers[:, 0] < xmax - mx) &
+        (centers[:, 1] > lo[1]) & (centers[:, 1] < ymax - my) &
+        (centers[:, 2] > lo[2]) & (centers[:, 2] < zmax - mz)
     )
 
     keep_ids = np.where(inside)[0]
@@ -174,9 +197,15 @@ def pick_drag_field(mesh: pv.PolyData) -> str:
 
 def plot_wing_only(cd: float, output_image: pathlib.Path):
     full_surface = load_surface_polydata()
-    wing = strip_farfield_box_cells(full_surface)
+    sym = symmetry_plane()
+    wing = strip_farfield_box_cells(full_surface, sym_axis=sym[0] if sym else None)
     field = pick_drag_field(wing)
 
+    if sym and MIRROR_HALF:
+        normal, point = [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]
+        normal[sym[0]], point[sym[0]] = 1.0, sym[1]
+        wing = wing.merge(wing.reflect(normal, point=point))
+
     print(f"Coloring wing by field: {field}")
 
     values = np.asarray(wing[field])
@@ -227,6 +256,12 @@ def plot_wing_only(cd: float, output_image: pathlib.Path):
 
 def main():
     cd, cl = read_drag_from_history()
+    if symmetry_plane():
+        # Half the force on the same REF_AREA: full-aircraft coefficients are twice as large
+        cd = 2.0 * cd
+        cl = 2.0 * cl if cl is not None else None
+        print(f"Half model -> full aircraft CD = {cd:.6f}"
+              + (f", CL = {cl:.6f}" if cl is not None else ""))
     plot_wing_only(cd, OUTPUT_IMAGE)
 
 
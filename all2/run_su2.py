@@ -6,14 +6,24 @@ Use this once per CFD run. Then use plot_wing_drag.py as many times
 as you like without rerunning SU2.
 """
 
+import re
+import json
+import time
 import subprocess
 import pathlib
 from collections import deque
 
+import actuator_disk
+
 CASE_DIR   = pathlib.Path(".")
 CFG_FILE   = CASE_DIR / "run.cfg"
 SU2_BINARY = "SU2_CFD"          # or absolute path if needed
 SU2_LOG    = CASE_DIR / "su2_out.log"
+DISKS_JSON = CASE_DIR / "plane.disks.json"  # actuator disks meshed by build_wing_domain_fast3 (if present)
+MESH_MANIFEST = CASE_DIR / "plane.mesh.json"  # mesh format/file, half model, partitions (build_wing_domain_fast3)
+MPI_RANKS  = None               # None: the rank count of the mesher's partition preview (1 if none)
+MPI_LAUNCHER = "mpirun"
+THRUST_COEFFICIENT = 0.08       # CT = T / (rho n^2 D^4), CPACS has no rotor loading
 
 
 def tail(filename, n=80):
@@ -24,19 +34,129 @@ def tail(filename, n=80):
     return list(dq)
 
 
+def cfg_number(text: str, key: str, default: float) -> float:
+    m = re.search(rf"^\s*{key}\s*=\s*([-+0-9.eE]+)", text, re.MULTILINE)
+    return float(m.group(1)) if m else default
+
+
+def set_cfg_option(text: str, key: str, value: str) -> str:
+    """Replace `key= ...` in a cfg text (SU2 rejects options given twice), or append it."""
+    line = f"{key}= {value}"
+    pattern = rf"^\s*{key}\s*=.*$"
+    if re.search(pattern, text, re.MULTILINE):
+        return re.sub(pattern, line, text, count=1, flags=re.MULTILINE)
+    return text + f"\n{line}\n"
+
+
+def mesh_manifest() -> dict:
+    """The mesher's manifest, {} if there is none."""
+    if not MESH_MANIFEST or not MESH_MANIFEST.is_file():
+        return {}
+    return json.loads(MESH_MANIFEST.read_text())
+
+
+def mesh_overrides(cfg_text: str) -> str:
+    """MESH_FORMAT / MESH_FILENAME from the mesher's manifest (e.g. after morphing to SU2)."""
+    manifest = mesh_manifest()
+    if not manifest:
+        return cfg_text
+    text = set_cfg_option(cfg_text, "MESH_FORMAT", manifest["format"])
+    return set_cfg_option(text, "MESH_FILENAME", manifest["filename"])
+
+
+def actdisk_lines(cfg_text: str):
+    """ACTDISK_TYPE / MARKER_ACTDISK / MARKER_EULER lines for the disks in DISKS_JSON."""
+    if not DISKS_JSON or not DISKS_JSON.is_file():
+        return []
+    disks = actuator_disk.load_disks(DISKS_JSON)
+    if not disks:
+        return []
+    rho = cfg_number(cfg_text, "FREESTREAM_PRESSURE", 101325.0) / (
+        cfg_number(cfg_text, "GAS_CONSTANT", 287.058) * cfg_number(cfg_text, "FREESTREAM_TEMPERATURE", 288.15)
+    )
+    entries = []
+    for d in disks:
+        dp = actuator_disk.pressure_jump(d, THRUST_COEFFICIENT, rho)
+        # (in, out, takeoff dp, dT, rpm, cruise dp, dT, rpm): same loading for both
+        entries.append(f"{d['uid']}_in, {d['uid']}_out, {dp:.6g}, 0.0, {d['rpm']:.6g}, "
+                       f"{dp:.6g}, 0.0, {d['rpm']:.6g}")
+    return [
+        "ACTDISK_TYPE= VARIABLES_JUMP",
+        "MARKER_ACTDISK= ( " + ", ".join(entries) + " )",
+        "MARKER_EULER= ( " + ", ".join(f"{d['uid']}_rim" for d in disks) + " )",
+    ]
+
+
+def effective_cfg() -> pathlib.Path:
+    """
+    CFG_FILE plus the options that depend on how the mesh was built.
+    Returns CFG_FILE itself when nothing has to be added.
+    """
+    original = CFG_FILE.read_text()
+    text = mesh_overrides(original)
+    extra = []
+    if mesh_manifest().get("half_model"):  # the mesh has a 'symmetry' marker
+        extra.append("MARKER_SYM= ( symmetry )")
+    extra.extend(actdisk_lines(text))
+
+    if not extra and text == original:
+        return CFG_FILE
+
+    cfg = CASE_DIR / f"{CFG_FILE.stem}_effective.cfg"
+    if extra:
+        text += "\n% ---- added by run_su2.py ----\n" + "\n".join(extra) + "\n"
+    cfg.write_text(text)
+    return cfg
+
+
+def mpi_ranks() -> int:
+    """
+    MPI_RANKS, else the rank count the mesher previewed a partitioning for,
+    else 1. Prints the previewed balance (SU2 partitions the mesh itself).
+    """
+    report = None
+    part = mesh_manifest().get("partitions")
+    if part and (CASE_DIR / part).is_file():
+        report = json.loads((CASE_DIR / part).read_text())
+    ranks = MPI_RANKS or (report["ranks"] if report else 1)
+    if report and report["ranks"] != ranks:
+        print(f"[WARN] Partition preview for {report['ranks']} ranks, running on {ranks}")
+    elif report:
+        print(f"Partition preview ({report['method']}): imbalance {report['imbalance']:.3f}")
+        for r, (n, f) in enumerate(zip(report["cells"], report["interface_faces"])):
+            print(f"  rank {r:3d}: {n:>10,} cells, {f:>8,} interface faces")
+    return ranks
+
+
 def run_su2():
-    print(f"Running {SU2_BINARY} {CFG_FILE} ...")
+    cfg = effective_cfg()
+    ranks = mpi_ranks()
+    cmd = [SU2_BINARY, cfg.name]
+    if ranks > 1:
+        cmd = [MPI_LAUNCHER, "-n", str(ranks)] + cmd
+    print(f"Running {' '.join(cmd)} ...")
+    t0 = time.perf_counter()
+    t_read = None
     with open(SU2_LOG, "w") as log:
-        result = subprocess.run(
-            [SU2_BINARY, str(CFG_FILE)],
+        proc = subprocess.Popen(
+            cmd,
             cwd=CASE_DIR,
-            stdout=log,
+            stdout=subprocess.PIPE,
             stderr=subprocess.STDOUT,
+            text=True,
         )
+        for line in proc.stdout:
+            log.write(line)
+            if t_read is None and "Begin Solver" in line:
+                # everything before the solver loop: mesh read, partitioning, geometry
+                t_read = time.perf_counter() - t0
+                print(f"Mesh read + preprocessing: {t_read:.1f}s")
+        returncode = proc.wait()
+    print(f"SU2 wall time: {time.perf_counter() - t0:.1f}s")
 
-    if result.returncode != 0:
+    if returncode != 0:
         print("\n[ERROR] SU2_CFD returned non-zero exit status.")
-        print(f"Return code: {result.returncode}")
+        print(f"Return code: {returncode}")
         print(f"Full SU2 output is in: {SU2_LOG}")
         print("\n--- Last 80 lines of SU2 output ---")
         for line in tail(SU2_LOG, n=80):
@@ -0,0 +1,49 @@
+"""apply_lod: resampled airfoil and fuselage profiles keep distinct points.  python -m pytest test_geometry_lod.py"""
+
+import numpy as np
+import pytest
+from lxml import etree
+
+pytest.importorskip("tigl3")
+pytest.importorskip("OCC")
+import cpacs_to_step3 as conv  # noqa: E402
+
+
+def _point_list(parent, pts):
+    pl = etree.SubElement(parent, "pointList")
+    for k, c in enumerate("xyz"):
+        etree.SubElement(pl, c, mapType="vector").text = ";".join(f"{v:.10g}" for v in pts[:, k])
+
+
+def _cpacs(airfoil, fuselage):
+    root = etree.Element("cpacs")
+    profiles = etree.SubElement(etree.SubElement(root, "vehicles"), "profiles")
+    wing = etree.SubElement(etree.SubElement(profiles, "wingAirfoils"), "wingAirfoil", uID="af")
+    _point_list(wing, airfoil)
+    fus = etree.SubElement(etree.SubElement(profiles, "fuselageProfiles"), "fuselageProfile", uID="fp")
+    _point_list(fus, fuselage)
+    return root
+
+
+def _points(root, path):
+    pl = root.find(path)
+    return np.column_stack([[float(v) for v in pl.findtext(c).split(";")] for c in "xyz"])
+
+
+def test_lod_profiles_have_no_duplicate_points():
+    # NACA0012-like airfoil TE -> lower -> LE -> upper -> TE, fuselage circle at x = 0
+    psi = 0.5 * (1.0 - np.cos(np.linspace(0.0, np.pi, 65)))
+    t = 0.6 * (0.2969 * np.sqrt(psi) - 0.126 * psi - 0.3516 * psi ** 2 + 0.2843 * psi ** 3 - 0.1036 * psi ** 4)
+    x = np.concatenate([psi[::-1], psi[1:]])
+    z = np.concatenate([-t[::-1], t[1:]])
+    airfoil = np.column_stack([x, np.zeros_like(x), z])
+    phi = np.linspace(0.0, 2.0 * np.pi, 64)
+    circle = np.column_stack([np.zeros_like(phi), np.sin(phi), np.cos(phi)])
+
+    n = conv.LOD_LEVELS["coarse"]["profile_points"]
+    root = conv.apply_lod(_cpacs(airfoil, circle), "coarse")
+    for path in ("./vehicles/profiles/wingAirfoils/wingAirfoil/pointList",
+                 "./vehicles/profiles/fuselageProfiles/fuselageProfile/pointList"):
+        pts = _points(root, path)
+        assert len(pts) == n
+        assert np.all(np.linalg.norm(np.diff(pts, axis=0), axis=1) > 1e-6), path
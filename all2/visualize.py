@@ -3,9 +3,12 @@ import os, math
 from typing import Optional, Tuple, Iterable, List
 import numpy as np
 
-# --- OCC (STEP reader) ---
+# --- OCC (STEP / BREP readers) ---
 from OCC.Core.STEPControl import STEPControl_Reader
 from OCC.Core.IFSelect import IFSelect_RetDone
+from OCC.Core.BRepTools import breptools_Read
+from OCC.Core.BRep import BRep_Builder
+from OCC.Core.TopoDS import TopoDS_Shape
 from OCC.Core.BRepMesh import BRepMesh_IncrementalMesh
 from OCC.Core.TopExp import TopExp_Explorer
 from OCC.Core.TopAbs import TopAbs_FACE
@@ -83,6 +86,21 @@ def _shape_bbox(shape) -> Tuple[np.ndarray, np.ndarray]:
     xmin, ymin, zmin, xmax, ymax, zmax = box.Get()
     return np.array([xmin, ymin, zmin]), np.array([xmax, ymax, zmax])
 
+def load_shape(path: str):
+    """Read a .brep (native, fast) or STEP file into a TopoDS_Shape."""
+    if os.path.splitext(path)[1].lower() == ".brep":
+        shape = TopoDS_Shape()
+        if not breptools_Read(shape, path, BRep_Builder()):
+            raise RuntimeError(f"Failed to read BREP: {path}")
+        return shape
+
+    reader = STEPControl_Reader()
+    if reader.ReadFile(path) != IFSelect_RetDone:
+        raise RuntimeError(f"Failed to read STEP: {path}")
+    if not reader.TransferRoots():
+        raise RuntimeError("Failed to transfer STEP contents.")
+    return reader.OneShape()
+
 def _elev_azim_to_dir(elev_deg: float, azim_deg: float):
     er, ar = math.radians(elev_deg), math.radians(azim_deg)
     return np.array([math.cos(er)*math.cos(ar),
@@ -98,9 +116,16 @@ def _look_at(eye, target, up=(0,0,1)):
     return T
 
 # ---------- Main smooth renderer with shadowed PBR ----------
-def step_to_png_smooth(
-    step_path: str,
-    out_path: Optional[str] = None,
+def step_to_png_smooth(step_path: str, out_path: Optional[str] = None, **kwargs) -> str:
+    """Render a .brep or STEP file; see shape_to_png_smooth for the options."""
+    if out_path is None:
+        out_path = os.path.splitext(step_path)[0] + "_smooth.png"
+    return shape_to_png_smooth(load_shape(step_path), out_path, **kwargs)
+
+
+def shape_to_png_smooth(
+    shape,
+    out_path: str,
     *,
     img_size: Tuple[int, int] = (1600, 1200),
     fov_deg: float = 35.0,
@@ -128,20 +153,8 @@ def step_to_png_smooth(
     ground_scale: float = 3.0,
 ) -> str:
     import numpy as np, math, imageio, trimesh, pyrender
-    from OCC.Core.STEPControl import STEPControl_Reader
-    from OCC.Core.IFSelect import IFSelect_RetDone
-
-    if out_path is None:
-        out_path = os.path.splitext(step_path)[0] + "_smooth.png"
-
-    # --- STEP load + mesh (same as before) ---
-    reader = STEPControl_Reader()
-    if reader.ReadFile(step_path) != IFSelect_RetDone:
-        raise RuntimeError(f"Failed to read STEP: {step_path}")
-    if not reader.TransferRoots():
-        raise RuntimeError("Failed to transfer STEP contents.")
-    shape = reader.OneShape()
 
+    # --- mesh the shape (passed in memory or loaded by step_to_png_smooth) ---
     if mesh_deflection is None or angular_deflection is None:
         q_lin, q_ang = _QUALITY_TO_DEFLECTIONS.get(quality, _QUALITY_TO_DEFLECTIONS["fine"])
         mesh_deflection = q_lin if mesh_deflection is None else mesh_deflection
@@ -238,7 +251,7 @@ def step_to_png_smooth(
 # ----- tiny CLI -----
 if __name__ == "__main__":
     import argparse
-    ap = argparse.ArgumentParser(description="STEP → PNG (smooth, shadows; no Aspose).")
+    ap = argparse.ArgumentParser(description="STEP/BREP → PNG (smooth, shadows; no Aspose).")
     ap.add_argument("step")
     ap.add_argument("--out", default=None)
     ap.add_argument("--orient", default="iso", choices=list(_ORIENT_ELEV_AZIM.keys()))
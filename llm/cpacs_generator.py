@@ -28,6 +28,7 @@ Usage from your own main/app:
 from __future__ import annotations
 
 import os
+import sys
 from typing import List, Tuple, Optional
 
 from xml.etree import ElementTree as ET
@@ -36,6 +37,9 @@ from openai import OpenAI
 
 from dotenv import load_dotenv
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "all2"))
+import llm_ledger  # one copy, in all2/
+
 load_dotenv()
 
 # Official CPACS 3.5 schema URL
@@ -140,8 +144,11 @@ def call_openai_for_cpacs_xml(
             "Do not explain anything; output only the XML."
         )
 
-    response = client.chat.completions.create(
-        model=model,
+    response = llm_ledger.timed_call(
+        "cpacs_generator.call_openai_for_cpacs_xml",
+        model,
+        client.chat.completions.with_raw_response.create,  # raw: llm_ledger records the SDK's retries
+        extra={"repair": previous_xml is not None},
         temperature=0.2,
         messages=[
             {"role": "system", "content": system_prompt},